@@ -1,181 +1,1099 @@
 import atexit
-from datetime import datetime
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
 
 from apscheduler.schedulers.background import BackgroundScheduler
-from flask import Flask, jsonify, render_template
+from flask import Flask, Response, jsonify, render_template, stream_with_context
 
+from config.config import (
+    DEPLOY_CONFIG,
+    DETAIL_CACHE_CONFIG,
+    INDEX_ADVISOR_CONFIG,
+    LIVE_CONFIG,
+    LOG_TAIL_CONFIG,
+)
+from utils import exporter, requeue
+from utils.binlog_ingest import BinlogIngest
+from utils.certificate_sync import CertificateSync
+from utils.counters import CounterEngine
+from utils.detail_cache import DetailCache
+from utils.failure_clusters import cluster_failures
+from utils.health import HealthMonitor
+from utils.index_advisor import IndexAdvisor
+from utils.instrumentation import Histogram, PrometheusWriter
+from utils.live_updates import (
+    Broadcaster,
+    dashboard_diff,
+    dashboard_state,
+    format_event,
+)
+from utils.log_tail import LogTailer
+from utils.metrics_store import MetricsStore, snapshot_metrics
 from utils.mysql_monitor import MySQLMonitor
+from utils.refresh_executor import ParallelRefresh, RefreshStage
+from utils.search_index import CertificateSearchIndex
+from utils.shared_state import (
+    SharedPickle,
+    SharedSnapshotStore,
+    SharedStatus,
+    SharedTunnel,
+)
+from utils.snapshot import MonitoringSnapshot, SnapshotStore
+from utils.stats_api import choose_encoding
+
+# all: refresh and serve in one process. refresher: the same, and share the
+# snapshot. web: serve the refresher's snapshot, without refreshing.
+ROLE = DEPLOY_CONFIG["role"]
+if ROLE not in ("all", "refresher", "web"):
+    raise ValueError(f"APP_ROLE must be all, refresher or web, not {ROLE!r}")
 
 app = Flask(__name__)
-monitor = MySQLMonitor()
+shared_status = (
+    SharedStatus(DEPLOY_CONFIG["shared_path"], 3 * DEPLOY_CONFIG["status_interval"])
+    if ROLE != "all"
+    else None
+)
+if ROLE == "web":
+    # One SSH tunnel per host: web workers go through the refresher's.
+    monitor = MySQLMonitor(tunnel=SharedTunnel(shared_status))
+    certificate_sync = None
+    counters = None
+else:
+    monitor = MySQLMonitor()
+    certificate_sync = CertificateSync(monitor)
+    counters = CounterEngine(monitor, certificate_sync)
 scheduler = BackgroundScheduler()
+refresh_executor = ParallelRefresh()
+metrics_store = MetricsStore()
+health = HealthMonitor(monitor)
+index_advisor = IndexAdvisor(monitor)
+binlog_ingest = BinlogIngest(monitor)
+log_tailer = LogTailer()
+requeuer = requeue.Requeuer(monitor)
+# Log events parsed by the refresher, for the web workers.
+shared_logs = (
+    SharedPickle(DEPLOY_CONFIG["shared_path"], "log_events") if ROLE != "all" else None
+)
+live_updates = Broadcaster(LIVE_CONFIG["max_clients"], LIVE_CONFIG["queue_size"])
+certificate_details_cache = DetailCache(**DETAIL_CACHE_CONFIG)
+failure_details_cache = DetailCache(**DETAIL_CACHE_CONFIG)
+refresh_durations = Histogram(buckets=(1, 2.5, 5, 10, 20, 30, 60, 120, 300))
+# Follows the replica where there is one; web workers index the shared
+# certificates section when it changes.
+search_index = CertificateSearchIndex()
+search_lock = threading.Lock()
+if certificate_sync is not None:
+    search_index.rebuild(certificate_sync.replica.ordered())
 
-# Cache for monitoring data.
-monitoring_data = {
+# Values used for sections that have never been loaded successfully.
+EMPTY_SECTIONS = {
+    "total_counts": {},
+    "table_stats": [],
+    "certificate_usage": [],
     "integrity_checks": {},
-    "last_update": "Never",
-    "status": "error",
+    "recent_activity": [],
+    "certificates": [],
+    "recent_certificates": [],
+    "failed_tasks": [],
+    "failure_clusters": [],
+    "certificates_by_day": [],
 }
 
+# Monitoring data, replaced as a whole by each refresh.
+initial_snapshot = MonitoringSnapshot.initial(EMPTY_SECTIONS, app.json.dumps)
+if ROLE == "all":
+    snapshots = SnapshotStore(initial_snapshot)
+else:
+    snapshots = SharedSnapshotStore(
+        initial_snapshot,
+        DEPLOY_CONFIG["shared_path"],
+        writer=ROLE == "refresher",
+        poll_interval=DEPLOY_CONFIG["poll_interval"],
+        on_change=lambda previous, snapshot: on_shared_snapshot(previous, snapshot),
+    )
+# Scheduled and binlog-triggered refreshes must not interleave.
+update_lock = threading.Lock()
+# Dashboard HTML rendered for one snapshot version.
+dashboard_html = (None, None)
+
+
+def sync_certificates(**options):
+    """Sync the certificates replica and return its rows"""
+    result = counters.sync_certificates(**options)
+    invalidate_certificate_details(result["changed"] + result["removed"])
+    index_certificates(result)
+    return certificate_sync.rows()
+
+
+def index_certificates(result):
+    """Fold a sync into the search index; full resyncs rebuild it"""
+    if result["changes"] is None:
+        search_index.rebuild(certificate_sync.replica.ordered())
+    else:
+        search_index.apply(result["changes"])
+
+
+def search_certificates(snapshot, **criteria):
+    """(rows, total) of the certificates matching the search criteria"""
+    if certificate_sync is not None:
+        lookup = certificate_sync.replica.get
+    else:
+        certificates = snapshot.get("certificates")
+        if not hasattr(certificates, "get"):
+            # Not loaded by the refresher yet.
+            return [], 0
+        generation = (
+            snapshot.epoch,
+            snapshot.section_generations.get("certificates", 0),
+        )
+        with search_lock:
+            if search_index.generation != generation:
+                search_index.rebuild(certificates, generation)
+        lookup = certificates.get
+
+    cert_ids, total = search_index.search(**criteria)
+    rows = [lookup(cert_id) for cert_id in cert_ids]
+    # Ids removed from the replica between the search and the lookup.
+    return [row for row in rows if row is not None], total
+
+
+def invalidate_certificate_details(cert_ids):
+    """Drop cached details that show any of the given certificates"""
+    if not cert_ids:
+        return
+    certificate_details_cache.invalidate(cert_ids)
+    cert_ids = set(cert_ids)
+    failure_details_cache.invalidate_where(
+        lambda details: (details.get("certificate") or {}).get("id") in cert_ids
+    )
+
+
+def invalidate_failure_details(previous_tasks, failed_tasks):
+    """Drop cached details of failed tasks that were added, changed or resolved"""
+    previous = {task["id"]: task["updated_at"] for task in previous_tasks or []}
+    current = {task["id"]: task["updated_at"] for task in failed_tasks or []}
+
+    changed = [
+        task_id
+        for task_id in previous.keys() | current.keys()
+        if previous.get(task_id) != current.get(task_id)
+    ]
+    failure_details_cache.invalidate(changed)
+
+
+def get_failed_tasks():
+    """Fetch failed tasks and drop cached details of tasks that changed"""
+    previous = snapshots.current.get("failed_tasks")
+    failed_tasks = monitor.get_failed_queue_tasks()
+    invalidate_failure_details(previous, failed_tasks)
+    return failed_tasks
+
+
+def refresh_stages():
+    """Independent stages of a refresh, keyed by their snapshot section"""
+    return [
+        RefreshStage("table_counts", counters.refresh_tables),
+        RefreshStage("table_stats", monitor.get_table_stats),
+        RefreshStage("integrity_checks", health.refresh),
+        RefreshStage("certificates", sync_certificates),
+        RefreshStage(
+            "recent_certificates", lambda: monitor.get_recent_certificates(7)
+        ),
+        RefreshStage("failed_tasks", get_failed_tasks),
+    ]
+
+
+def binlog_stages(changes):
+    """Stages refreshing only the sections of tables changed in the binlog"""
+    stages = []
+    if "certificates" in changes:
+        removed_ids = changes["certificates"]["deleted"]
+        stages.append(
+            RefreshStage(
+                "certificates",
+                lambda: sync_certificates(removed_ids=removed_ids, check_drift=False),
+            )
+        )
+        stages.append(
+            RefreshStage(
+                "recent_certificates", lambda: monitor.get_recent_certificates(7)
+            )
+        )
+    if "tasks_queue" in changes:
+        stages.append(RefreshStage("failed_tasks", get_failed_tasks))
+    if "certificate_templates" in changes:
+        stages.append(RefreshStage("recent_templates", counters.refresh_templates))
+    return stages
+
+
+def apply_binlog_changes(changes):
+    """Called by the binlog ingest with the rows changed since the last call"""
+    update_monitoring_data(binlog_stages(changes))
+
+
+def counter_sections(results, errors):
+    """Sections computed in memory by the counter engine once the stages ran.
+
+    They depend on the certificates and table_counts stages; when those
+    fail, the sections keep their last good values.
+    """
+    sections = {}
+    if "certificates" not in errors:
+        sections["certificate_usage"] = counters.certificate_usage(30)
+        sections["certificates_by_day"] = counters.certificates_by_day(7)
+        if "table_counts" not in errors and counters.table_totals:
+            failed_tasks = results.get(
+                "failed_tasks", snapshots.current.get("failed_tasks")
+            )
+            sections["total_counts"] = counters.total_counts(
+                len(failed_tasks) if failed_tasks is not None else None
+            )
+            sections["recent_activity"] = counters.recent_activity(24)
+    return sections
+
+
+def update_monitoring_data(stages=None):
+    """Update monitoring data from the database and publish a new snapshot.
 
-def update_monitoring_data():
-    """Update monitoring data from the database"""
-    global monitoring_data
-    print("\n=== STARTING DATA UPDATE... ===")
+    With `stages` (binlog-triggered updates), only those sections are
+    refreshed and the others keep their current values.
+    """
+    partial = stages is not None
+    with update_lock:
+        if partial:
+            names = ", ".join(stage.name for stage in stages)
+            print(f"\n=== STARTING DATA UPDATE ({names})... ===")
+        else:
+            print("\n=== STARTING DATA UPDATE... ===")
+            stages = refresh_stages()
+        started = time.monotonic()
 
+        results, errors, durations = refresh_executor.run(stages)
+        results.update(counter_sections(results, errors))
+        if "failed_tasks" in results:
+            results["failure_clusters"] = cluster_failures(
+                results["failed_tasks"], log_tailer.events_for
+            )
+        if not partial:
+            refresh_durations.observe(time.monotonic() - started)
+
+        # Sections that failed keep their last good value.
+        previous, snapshot = snapshots.publish(
+            lambda current: current.next(
+                results, errors, durations, EMPTY_SECTIONS, partial=partial
+            )
+        )
+
+        status = snapshot.meta["status"]
+        if status == "ok":
+            print("=== UPDATE COMPLETED SUCCESSFULLY! ===\n")
+        elif status == "partial":
+            errors = snapshot.meta["stage_errors"]
+            print(f"=== UPDATE COMPLETED WITH {len(errors)} FAILED STAGE(S) ===\n")
+        else:
+            print("[ERROR] Update failed: every stage failed.")
+
+        publish_live(previous, snapshot)
+        if not partial:
+            # The metrics history samples the scheduled refreshes only.
+            record_metrics(snapshot.data, results)
+
+
+def publish_live(previous, snapshot):
+    """Broadcast what changed on the dashboard to the connected browsers"""
     try:
-        print("[1/9] Getting total counts...")
-        total_counts = monitor.get_total_counts()
-        print(f"[1/9] OK")
-
-        print("[2/9] Getting table statistics...")
-        table_stats = monitor.get_table_stats()
-        print(f"[2/9] OK - {len(table_stats)} tables")
-
-        print("[3/9] Getting certificate usage...")
-        certificate_usage = monitor.get_certificate_usage()
-        print(f"[3/9] OK")
-
-        print("[4/9] Checking data integrity...")
-        integrity_checks = monitor.check_data_integrity()
-        print(f"[4/9] OK - {len(integrity_checks)} checks")
-
-        print("[5/9] Getting recent activity...")
-        recent_activity = monitor.get_recent_activity(1)
-        print(f"[5/9] OK")
-
-        print("[6/9] Getting recent certificates...")
-        certificates = monitor.get_certificates()
-        print(f"[6/9] OK - {len(certificates)} certificates")
-
-        print("[7/9] Getting recent certificates...")
-        recent_certificates = monitor.get_recent_certificates(7)
-        print(f"[7/9] OK - {len(recent_certificates)} recent certificates")
-
-        print("[8/9] Getting failed tasks...")
-        failed_tasks = monitor.get_failed_queue_tasks()
-        print(f"[8/9] OK - {len(failed_tasks)} failed tasks")
-
-        print("[9/9] Getting certificates by day...")
-        certificates_by_day = monitor.get_certificates_by_day(7)
-        print(f"[9/9] OK - {len(certificates_by_day)} days")
-
-        monitoring_data = {
-            "total_counts": total_counts,
-            "table_stats": table_stats,
-            "certificates": certificates,
-            "certificates_by_day": certificates_by_day,
-            "certificate_usage": certificate_usage,
-            "failed_tasks": failed_tasks,
-            "integrity_checks": integrity_checks,
-            "last_update": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
-            "recent_activity": recent_activity,
-            "recent_certificates": recent_certificates,
-            "status": "ok",
-        }
-        print("=== UPDATE COMPLETED SUCCESSFULLY! ===\n")
+        diff = dashboard_diff(previous.data, snapshot.data)
+        live_updates.publish("update", app.json.dumps(diff), snapshot.version)
+    except Exception as e:
+        print(f"[Live] Error publishing update: {e}")
 
+
+def certificates_version(snapshot):
+    """Changes whenever the certificates section of a snapshot does"""
+    return (snapshot.epoch, snapshot.section_generations.get("certificates"))
+
+
+def on_shared_snapshot(previous, snapshot):
+    """Called in web workers when the refresher published a new snapshot"""
+    if certificates_version(previous) != certificates_version(snapshot):
+        # Which rows changed is only known to the refresher, so drop every
+        # cached detail that shows a certificate.
+        certificate_details_cache.clear()
+        failure_details_cache.invalidate_where(
+            lambda details: bool(details.get("certificate"))
+        )
+    invalidate_failure_details(previous.get("failed_tasks"), snapshot.get("failed_tasks"))
+    publish_live(previous, snapshot)
+
+
+def write_shared_status():
+    """Share what only the refresher knows with the web workers"""
+    try:
+        tunnel = monitor.tunnel
+        shared_status.write(
+            service_status(),
+            tunnel.metrics(),
+            tunnel.local_port() if tunnel.is_active() else None,
+        )
     except Exception as e:
-        print(f"[ERROR] Update failed: {e}")
-        print(f"[ERROR] Type: {type(e).__name__}")
-        import traceback
-
-        traceback.print_exc()
-
-        monitoring_data = {
-            "total_counts": {},
-            "table_stats": [],
-            "integrity_checks": {},
-            "certificates": [],
-            "recent_certificates": [],
-            "failed_tasks": [],
-            "certificates_by_day": [],
-            "last_update": "Update error",
-            "status": "error",
-            "error_message": str(e),
-        }
+        print(f"[Shared] Error writing status: {e}")
+
+
+def service_status():
+    """Integrity, index and binlog status, from the refresher in web workers"""
+    if ROLE == "web":
+        return shared_status.services()
+    return {
+        **health.status(),
+        **index_advisor.status(),
+        **binlog_ingest.status(),
+        **log_tailer.status(),
+    }
+
+
+def poll_logs():
+    """Read new worker/queue log lines and share the events with web workers"""
+    log_tailer.poll()
+    if ROLE == "refresher" and log_tailer.changed:
+        try:
+            shared_logs.write(log_tailer.export())
+        except Exception as e:
+            print(f"[Shared] Error writing log events: {e}")
+
+
+def task_log_events():
+    """The log tailer, with the refresher's events loaded in web workers"""
+    if ROLE == "web":
+        try:
+            changed, events = shared_logs.read_changed()
+            if changed:
+                log_tailer.replace(events)
+        except Exception as e:
+            print(f"[Shared] Could not load log events: {e}")
+    return log_tailer
+
+
+def record_metrics(data, results):
+    """Append this refresh's figures to the local metrics store"""
+    try:
+        # Only sections refreshed this cycle, not retained last-good values.
+        metrics = snapshot_metrics(data, sections=results)
+        tunnel = monitor.tunnel.metrics()
+        metrics["tunnel.reconnects"] = tunnel["reconnects"]
+        metrics["tunnel.uptime_seconds"] = tunnel["uptime_seconds"]
+        metrics_store.record(metrics)
+        if "certificates_by_day" in results:
+            metrics_store.record_daily(
+                "certificates_created",
+                {day["date_full"]: day["count"] for day in data["certificates_by_day"]},
+            )
+    except Exception as e:
+        print(f"[Metrics] Error recording metrics: {e}")
 
 
 @app.route("/")
 def dashboard():
-    """Main dashboard"""
-    return render_template("dashboard.html", data=monitoring_data)
+    """Main dashboard, rendered once per snapshot generation"""
+    from flask import request
 
+    global dashboard_html
+    snapshot = snapshots.current
+    etag = f"dashboard-{snapshot.version}"
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "no-cache"}
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
 
-@app.route("/certificates")
-def certificates_page():
-    """Certificates page with pagination"""
+    version, html = dashboard_html
+    if version != snapshot.version:
+        html = render_template(
+            "dashboard.html", data=snapshot.data, version=snapshot.version
+        )
+        dashboard_html = (snapshot.version, html)
+    return Response(html, mimetype="text/html", headers=headers)
+
+
+def _cached_page(key, page, per_page):
+    """Slice the cached monitoring data when the database is unreachable"""
+    rows = snapshots.current.get(key) or []
+    start = (page - 1) * per_page
+    return {
+        "items": rows[start : start + per_page],
+        "has_prev": page > 1,
+        "has_next": start + per_page < len(rows),
+        "prev_cursor": None,
+        "next_cursor": None,
+    }, len(rows)
+
+
+def _paginated(fetch_page, count_name, cache_key):
+    """Render arguments for a keyset-paginated listing"""
     from flask import request
 
     page = request.args.get("page", 1, type=int)
+    cursor = request.args.get("cursor")
+    direction = request.args.get("direction", "next")
     per_page = 10
 
-    certificates = monitoring_data.get("certificates", [])
-    total = len(certificates)
-    start = (page - 1) * per_page
-    end = start + per_page
+    try:
+        result = fetch_page(cursor=cursor, per_page=per_page, direction=direction)
+        total = monitor.get_approximate_count(count_name)
+        approximate = True
+    except Exception as e:
+        print(f"[Pagination] Falling back to cached data: {e}")
+        result, total = _cached_page(cache_key, page, per_page)
+        approximate = False
+
+    if not result["has_prev"]:
+        page = 1
+    total_pages = max((total + per_page - 1) // per_page, page)
+    if result["has_next"]:
+        total_pages = max(total_pages, page + 1)
+
+    return {
+        "page": page,
+        "total_pages": total_pages,
+        "total": total,
+        "approximate": approximate,
+        "has_prev": result["has_prev"],
+        "has_next": result["has_next"],
+        "prev_cursor": result["prev_cursor"],
+        "next_cursor": result["next_cursor"],
+    }, result["items"]
+
+
+# Request arguments of a certificate search.
+SEARCH_ARGS = ("q", "course", "status", "from", "to")
+
+
+def _search_criteria(args):
+    """Search criteria from request arguments; raises ValueError if invalid.
 
-    paginated_certs = certificates[start:end]
-    total_pages = (total + per_page - 1) // per_page
+    from/to (YYYY-MM-DD) bound created_at, `to` included.
+    """
+    criteria = {
+        "query": (args.get("q") or "").strip() or None,
+        "course": (args.get("course") or "").strip() or None,
+        "status": (args.get("status") or "").strip() or None,
+    }
+    for arg, key in (("from", "created_from"), ("to", "created_to")):
+        value = args.get(arg)
+        criteria[key] = datetime.strptime(value, "%Y-%m-%d") if value else None
+    if criteria["created_to"] is not None:
+        criteria["created_to"] += timedelta(days=1)
+    return criteria
 
+
+@app.route("/certificates")
+def certificates_page():
+    """Certificates page with keyset pagination, or search results.
+
+    With any of ?q=, ?course=, ?status=, ?from=, ?to= the rows come from
+    the local search index, paginated by page number.
+    """
+    from urllib.parse import urlencode
+
+    from flask import request
+
+    search = {arg: request.args[arg] for arg in SEARCH_ARGS if request.args.get(arg)}
+    if not search:
+        pagination, certificates = _paginated(
+            monitor.get_certificates_page, "certificates", "certificates"
+        )
+        return render_template(
+            "certificates.html", certificates=certificates, search={}, **pagination
+        )
+
+    per_page = 10
+    page = max(request.args.get("page", 1, type=int), 1)
+    try:
+        criteria = _search_criteria(request.args)
+        error = None
+    except ValueError:
+        criteria, error = None, "Datas devem usar o formato AAAA-MM-DD"
+
+    certificates, total = [], 0
+    if criteria is not None:
+        certificates, total = search_certificates(
+            snapshots.current,
+            **criteria,
+            limit=per_page,
+            offset=(page - 1) * per_page,
+        )
     return render_template(
         "certificates.html",
-        certificates=paginated_certs,
+        certificates=certificates,
+        search=search,
+        search_query=urlencode(search) + "&",
+        search_error=error,
         page=page,
-        total_pages=total_pages,
+        total_pages=max((total + per_page - 1) // per_page, 1),
         total=total,
+        approximate=False,
+        has_prev=page > 1,
+        has_next=page * per_page < total,
+        prev_cursor=None,
+        next_cursor=None,
+    )
+
+
+@app.route("/api/certificates/search")
+def api_search_certificates():
+    """Search the local certificates index.
+
+    ?q= matches student and course names (accent-insensitive, word
+    prefixes), ?course= only course names; ?status=, ?from=/?to=
+    (YYYY-MM-DD) and ?limit=/?offset= as usual. Newest first.
+    """
+    from flask import request
+
+    try:
+        criteria = _search_criteria(request.args)
+    except ValueError:
+        return jsonify({"error": "Dates must use the YYYY-MM-DD format"}), 400
+    started = time.perf_counter()
+    certificates, total = search_certificates(
+        snapshots.current,
+        **criteria,
+        limit=request.args.get("limit", 20, type=int),
+        offset=request.args.get("offset", 0, type=int),
+    )
+    return jsonify(
+        {
+            "total": total,
+            "results": [row.to_dict() for row in certificates],
+            "took_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
     )
 
 
+def _cluster_page(snapshot, cluster, page, per_page):
+    """One page of the failed tasks of a cluster, from the snapshot"""
+    tasks = {task["id"]: task for task in snapshot.get("failed_tasks") or []}
+    task_ids = cluster["task_ids"]
+    start = (page - 1) * per_page
+    failures = [tasks[task_id] for task_id in task_ids[start : start + per_page]]
+    return {
+        "page": page,
+        "total_pages": max((len(task_ids) + per_page - 1) // per_page, 1),
+        "total": len(task_ids),
+        "approximate": False,
+        "has_prev": page > 1,
+        "has_next": start + per_page < len(task_ids),
+        "prev_cursor": None,
+        "next_cursor": None,
+    }, failures
+
+
 @app.route("/failures")
 def failures_page():
-    """Failures page with pagination"""
+    """Failures grouped by cause, with drill-down into each cluster.
+
+    ?cluster=<id> lists the tasks of one cluster and ?view=all every failed
+    task (keyset pagination). Until failed tasks are first loaded, the flat
+    list is shown.
+    """
     from flask import request
 
-    page = request.args.get("page", 1, type=int)
-    per_page = 10
+    snapshot = snapshots.current
+    view = request.args.get("view")
+    cluster_id = request.args.get("cluster")
+    loaded = "failure_clusters" in snapshot.section_generations
+    clusters = snapshot.get("failure_clusters") or []
 
-    failures = monitoring_data.get("failed_tasks", [])
-    total = len(failures)
-    start = (page - 1) * per_page
-    end = start + per_page
+    cluster = None
+    if loaded and cluster_id:
+        cluster = next((c for c in clusters if c["id"] == cluster_id), None)
 
-    paginated_failures = failures[start:end]
-    total_pages = (total + per_page - 1) // per_page
+    if loaded and not view and cluster is None:
+        return render_template(
+            "failures.html",
+            clusters=clusters,
+            total=len(snapshot.get("failed_tasks") or []),
+            last_update=snapshot.get("last_update"),
+            # The cluster may have disappeared with the last refresh.
+            missing_cluster=bool(cluster_id),
+        )
 
+    if cluster is not None:
+        page = max(request.args.get("page", 1, type=int), 1)
+        pagination, failures = _cluster_page(snapshot, cluster, page, 10)
+    else:
+        pagination, failures = _paginated(
+            monitor.get_failed_tasks_page, "failed_tasks", "failed_tasks"
+        )
+
+    log_counts = task_log_events().counts([task["id"] for task in failures])
     return render_template(
         "failures.html",
-        failures=paginated_failures,
-        page=page,
-        total_pages=total_pages,
-        total=total,
+        failures=failures,
+        cluster=cluster,
+        log_counts=log_counts,
+        logs_enabled=log_tailer.enabled,
+        **pagination,
     )
 
 
 @app.route("/api/stats")
 def api_stats():
-    return jsonify(monitoring_data)
+    """Monitoring data by section.
 
+    ?sections=total_counts,certificates_by_day selects sections (the full
+    certificates list is only sent when named, or with sections=all) and
+    ?fields=id,failed_tasks.student_name keeps only those keys in each item
+    (bare names apply to every section, prefixed names to one section).
+    """
+    from flask import request
 
-@app.route("/api/health")
-def health_check():
-    integrity = monitor.check_data_integrity()
+    snapshot = snapshots.current.stats
+    sections = snapshot.resolve_sections(request.args.get("sections"))
+    fields = request.args.get("fields")
+    fields = (
+        tuple(sorted(f.strip() for f in fields.split(",") if f.strip()))
+        if fields
+        else None
+    )
+
+    body, encoding, etag = snapshot.body(
+        sections, fields, choose_encoding(request.headers.get("Accept-Encoding"))
+    )
+    headers = {
+        "ETag": etag,
+        "Last-Modified": snapshot.last_modified,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+
+    if request.if_none_match:
+        if request.if_none_match.contains(etag.strip('"')):
+            return Response(status=304, headers=headers)
+    elif request.if_modified_since and snapshot.updated_at <= request.if_modified_since:
+        return Response(status=304, headers=headers)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, mimetype="application/json", headers=headers)
+
+
+@app.route("/api/stream")
+def live_stream():
+    """Server-Sent Events with dashboard changes.
+
+    On connect the current dashboard state is sent (unless ?since= or the
+    Last-Event-ID header already names the current refresh), then one
+    `update` event with the diff after every refresh.
+    """
+    from flask import request
+
+    subscriber = live_updates.subscribe()
+    if subscriber is None:
+        return jsonify({"error": "Too many live connections"}), 503
+
+    snapshot = snapshots.current
+    since = request.headers.get("Last-Event-ID") or request.args.get("since")
+    state = None
+    if since != snapshot.version:
+        state = format_event(
+            "state",
+            app.json.dumps(dashboard_state(snapshot.data)),
+            snapshot.version,
+        )
+
+    def stream():
+        try:
+            yield f"retry: {LIVE_CONFIG['retry_ms']}\n\n"
+            if state:
+                yield state
+            while True:
+                try:
+                    message = subscriber.get(timeout=LIVE_CONFIG["keepalive"])
+                except queue.Empty:
+                    # Keeps proxies from closing an idle connection.
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            live_updates.unsubscribe(subscriber)
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/history")
+def api_history():
+    """Time series of a recorded metric, read from the local metrics store"""
+    from flask import request
+
+    metric = request.args.get("metric")
+    days = min(max(request.args.get("days", 7, type=int), 1), 730)
+    if not metric:
+        return jsonify({"metrics": metrics_store.metrics()})
+    return jsonify(
+        {"metric": metric, "days": days, "points": metrics_store.series(metric, days)}
+    )
+
+
+@app.route("/api/history/daily")
+def api_history_daily():
+    """Per-day values of a metric, e.g. certificates_created"""
+    from flask import request
+
+    metric = request.args.get("metric", "certificates_created")
+    days = min(max(request.args.get("days", 7, type=int), 1), 730)
     return jsonify(
         {
-            "status": (
-                "healthy" if all(v == 0 for v in integrity.values()) else "issues"
+            "metric": metric,
+            "days": days,
+            "points": metrics_store.daily_series(
+                metric, days, today=datetime.now().strftime("%Y-%m-%d")
             ),
-            "integrity_checks": integrity,
         }
     )
 
 
+def _export_response(name, rows, fields, fmt):
+    """Stream rows as a downloadable CSV or NDJSON file"""
+    filename = f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    return Response(
+        stream_with_context(exporter.iter_export(rows, fields, fmt)),
+        mimetype=exporter.FORMATS[fmt],
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+def _export_filters():
+    """Read and validate ?from=YYYY-MM-DD&to=YYYY-MM-DD&status=..."""
+    from flask import request
+
+    filters = {"status": request.args.get("status") or None}
+    for arg, key in (("from", "date_from"), ("to", "date_to")):
+        value = request.args.get(arg)
+        filters[key] = (
+            datetime.strptime(value, "%Y-%m-%d").date() if value else None
+        )
+    return filters
+
+
+@app.route("/api/export/certificates.<fmt>")
+def export_certificates(fmt):
+    """Export certificates, filtered by creation date and status"""
+    if fmt not in exporter.FORMATS:
+        return jsonify({"error": f"Unsupported format: {fmt}"}), 404
+    try:
+        filters = _export_filters()
+    except ValueError:
+        return jsonify({"error": "Dates must use the YYYY-MM-DD format"}), 400
+
+    rows = monitor.iter_export("certificates", **filters)
+    return _export_response("certificates", rows, exporter.CERTIFICATE_FIELDS, fmt)
+
+
+@app.route("/api/export/failures.<fmt>")
+def export_failures(fmt):
+    """Export queue tasks (failed by default, ?status=all for every status)"""
+    from flask import request
+
+    if fmt not in exporter.FORMATS:
+        return jsonify({"error": f"Unsupported format: {fmt}"}), 404
+    try:
+        filters = _export_filters()
+    except ValueError:
+        return jsonify({"error": "Dates must use the YYYY-MM-DD format"}), 400
+    status = request.args.get("status", "failed")
+    filters["status"] = None if status == "all" else status
+
+    rows = monitor.iter_failed_tasks_export(**filters)
+    return _export_response("failures", rows, exporter.FAILED_TASK_FIELDS, fmt)
+
+
+# Answer of web workers to requests that need the refresher.
+REFRESHER_ONLY = "run on the refresher (APP_ROLE=refresher)"
+
+
+@app.route("/api/health")
+def health_check():
+    """Integrity status served from the cache, with its age.
+
+    Pass ?refresh=1 to recompute it now (rate limited).
+    """
+    from flask import request
+
+    response = {}
+    if request.args.get("refresh", type=int):
+        if ROLE == "web":
+            return jsonify({"error": REFRESHER_ONLY}), 409
+        refreshed, retry_after, error = health.force_refresh()
+        response["refreshed"] = refreshed
+        if error:
+            response["refresh_error"] = error
+        elif not refreshed:
+            response["retry_after"] = retry_after
+
+    response.update(service_status())
+    return jsonify(response), 503 if response.get("refresh_error") else 200
+
+
+@app.route("/api/health/live")
+def liveness_check():
+    """Lightweight liveness check: tunnel and database ping only"""
+    result = health.liveness()
+    result["tunnel_stats"] = monitor.tunnel.metrics()
+    alive = result["tunnel"] and result["database"]
+    result["status"] = "alive" if alive else "down"
+    return jsonify(result), 200 if alive else 503
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    """Query, refresh, snapshot and tunnel metrics in Prometheus text format"""
+    writer = PrometheusWriter()
+    writer.query_metrics(monitor.query_metrics)
+
+    writer.histogram(
+        "refresh_duration_seconds",
+        "Duration of a full refresh cycle.",
+        [
+            (
+                {},
+                refresh_durations.cumulative(),
+                refresh_durations.sum,
+                refresh_durations.count,
+            )
+        ],
+    )
+    snapshot = snapshots.current
+    writer.metric(
+        "refresh_stage_duration_seconds",
+        "gauge",
+        "Duration of each stage in the last refresh.",
+        [
+            ({"stage": name}, round(seconds, 3))
+            for name, seconds in sorted(
+                snapshot.meta["stage_durations"].items()
+            )
+        ],
+    )
+    writer.metric(
+        "refresh_stage_errors",
+        "gauge",
+        "Stages that failed in the last refresh.",
+        [({}, len(snapshot.meta["stage_errors"]))],
+    )
+    writer.metric(
+        "refreshes_total",
+        "counter",
+        "Number of snapshots published (refreshes and forced resyncs).",
+        [({}, snapshot.generation)],
+    )
+    writer.metric(
+        "snapshot_bytes",
+        "gauge",
+        "Serialized size of the sections served by /api/stats by default.",
+        [
+            (
+                {},
+                sum(
+                    len(snapshot.stats.fragments[name])
+                    for name in snapshot.stats.default_sections
+                ),
+            )
+        ],
+    )
+    writer.metric(
+        "snapshot_certificates",
+        "gauge",
+        "Certificates held in the snapshot.",
+        [({}, len(snapshot.get("certificates") or []))],
+    )
+
+    tunnel = monitor.tunnel.metrics()
+    writer.metric(
+        "tunnel_up", "gauge", "Whether the SSH tunnel is active.", [({}, tunnel["active"])]
+    )
+    writer.metric(
+        "tunnel_reconnects_total",
+        "counter",
+        "SSH tunnel reconnections.",
+        [({}, tunnel["reconnects"])],
+    )
+    writer.metric(
+        "tunnel_connect_failures_total",
+        "counter",
+        "Failed SSH tunnel connection attempts.",
+        [({}, tunnel["failures"])],
+    )
+    writer.metric(
+        "tunnel_uptime_seconds",
+        "gauge",
+        "Time since the current SSH tunnel was opened.",
+        [({}, tunnel["uptime_seconds"])],
+    )
+
+    services = service_status()
+    writer.metric(
+        "cdc_streaming",
+        "gauge",
+        "Whether binlog changes are being streamed (0 means polling only).",
+        [({}, services.get("cdc_state") == "streaming")],
+    )
+    writer.metric(
+        "cdc_events_total",
+        "counter",
+        "Binlog row changes received for the followed tables.",
+        [({}, services.get("cdc_events") or 0)],
+    )
+    writer.metric(
+        "cdc_lag_seconds",
+        "gauge",
+        "Age of the last binlog event when it was received.",
+        [({}, services.get("cdc_lag_seconds"))],
+    )
+
+    writer.metric(
+        "log_tail_bytes_total",
+        "counter",
+        "Bytes read from the followed worker/queue logs.",
+        [({}, services.get("log_tail_bytes"))],
+    )
+    writer.metric(
+        "log_tail_events_total",
+        "counter",
+        "Log events parsed from the followed worker/queue logs.",
+        [({}, services.get("log_tail_events"))],
+    )
+
+    writer.metric(
+        "live_clients",
+        "gauge",
+        "Browsers connected to the live updates stream.",
+        [({}, live_updates.clients())],
+    )
+
+    pool = monitor.pool.stats()
+    writer.metric(
+        "pool_connections",
+        "gauge",
+        "Database connections in the pool, by state.",
+        [({"state": "idle"}, pool["idle"]), ({"state": "in_use"}, pool["in_use"])],
+    )
+
+    return Response(writer.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/api/sync/full", methods=["POST"])
+def full_resync():
+    """Force a full resync of the local certificates replica"""
+    if ROLE == "web":
+        return jsonify({"error": REFRESHER_ONLY}), 409
+    try:
+        result = counters.sync_certificates(full=True)
+        invalidate_certificate_details(result["changed"] + result["removed"])
+        index_certificates(result)
+        snapshots.publish(
+            lambda current: current.replace(certificates=certificate_sync.rows())
+        )
+        return jsonify(
+            {
+                "mode": result["mode"],
+                "changed": len(result["changed"]),
+                "removed": len(result["removed"]),
+                "total": result["total"],
+            }
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _requeue_selection(args):
+    """Failed tasks matching the requeue filters in `args`, read from the database"""
+    filters = requeue.parse_filters(args)
+    return requeue.select_tasks(
+        monitor.get_failed_queue_tasks(), filters, task_log_events().events_for
+    )
+
+
+@app.route("/api/requeue/preview")
+def requeue_preview():
+    """How many failed tasks a requeue with these filters would reset"""
+    from flask import request
+
+    try:
+        selected = _requeue_selection(request.args)
+    except ValueError:
+        return jsonify({"error": "Invalid filters (dates use YYYY-MM-DD)"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(requeue.preview(selected, requeuer.max_tasks))
+
+
+@app.route("/api/requeue", methods=["POST"])
+def requeue_tasks():
+    """Requeue the failed tasks matching the filters, streaming NDJSON progress.
+
+    `digest` must be the one returned by the preview: if the selection
+    changed in between, nothing is updated and a new preview is returned.
+    """
+    from flask import request
+
+    args = request.get_json(silent=True) or request.form
+    try:
+        selected = _requeue_selection(args)
+    except ValueError:
+        return jsonify({"error": "Invalid filters (dates use YYYY-MM-DD)"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    summary = requeue.preview(selected, requeuer.max_tasks)
+    if summary["digest"] != args.get("digest"):
+        return jsonify({"error": "The selection changed, preview again", **summary}), 409
+    if summary["too_many"]:
+        return jsonify(
+            {"error": f"At most {requeuer.max_tasks} tasks per requeue", **summary}
+        ), 400
+
+    try:
+        progress = requeuer.run(task["id"] for task in selected)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+
+    def stream():
+        for step in progress:
+            task_ids = step.pop("ids", None)
+            if task_ids:
+                failure_details_cache.invalidate(task_ids)
+            if step.get("done") and ROLE != "web" and step["updated"]:
+                # Show the result now instead of at the next refresh.
+                update_monitoring_data([RefreshStage("failed_tasks", get_failed_tasks)])
+            yield app.json.dumps(step) + "\n"
+
+    response = Response(
+        stream(),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Frees the requeue lock even if the stream is never read.
+    response.call_on_close(progress.close)
+    return response
+
+
 @app.route("/api/failure-details/<int:task_id>")
 def failure_details(task_id):
     """Get detailed information about a failed task"""
     try:
-        details = monitor.get_failure_details(task_id)
-        return jsonify(details)
+        details = failure_details_cache.get_or_load(
+            task_id, lambda: monitor.get_failure_details(task_id)
+        )
+        # Log events are not cached with the details: they keep arriving.
+        return jsonify({**details, "log_events": task_log_events().events_for(task_id)})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -184,7 +1102,9 @@ def failure_details(task_id):
 def certificate_details(cert_id):
     """Get detailed information about a certificate"""
     try:
-        details = monitor.get_certificate_details(cert_id)
+        details = certificate_details_cache.get_or_load(
+            cert_id, lambda: monitor.get_certificate_details(cert_id)
+        )
         return jsonify(details)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -195,12 +1115,17 @@ def cleanup():
     print("[Cleanup] Shutting down application...")
     if scheduler.running:
         scheduler.shutdown()
+    binlog_ingest.stop()
+    log_tailer.close()
+    refresh_executor.shutdown()
     monitor.close()
 
 
 atexit.register(cleanup)
 
-if __name__ == "__main__":
+
+def start_refresher():
+    """Refresh now, then schedule refreshes and start the binlog ingest"""
     # Update data on startup.
     update_monitoring_data()
 
@@ -213,8 +1138,42 @@ if __name__ == "__main__":
         name="Update monitoring data every 5 minutes",
         replace_existing=True,
     )
+    if INDEX_ADVISOR_CONFIG["enabled"]:
+        # Runs once, in the background, so startup is not delayed.
+        scheduler.add_job(
+            func=index_advisor.run, id="index_advisor", name="Check query indexes"
+        )
+    if log_tailer.enabled:
+        scheduler.add_job(
+            func=poll_logs,
+            trigger="interval",
+            seconds=LOG_TAIL_CONFIG["interval"],
+            id="log_tail",
+            name="Follow worker/queue logs",
+            replace_existing=True,
+            next_run_time=datetime.now(),
+        )
+    if ROLE == "refresher":
+        write_shared_status()
+        scheduler.add_job(
+            func=write_shared_status,
+            trigger="interval",
+            seconds=DEPLOY_CONFIG["status_interval"],
+            id="shared_status",
+            name="Share status with the web workers",
+            replace_existing=True,
+        )
     scheduler.start()
     print("[Scheduler] Scheduler started - Updates every 5 minutes.")
+    # Near real-time updates between the scheduled ones, when enabled.
+    binlog_ingest.start(apply_binlog_changes)
+
+
+if __name__ == "__main__":
+    if ROLE == "web":
+        print("[Deploy] APP_ROLE=web: serving the refresher's snapshot.")
+    else:
+        start_refresher()
     try:
         app.run(host="0.0.0.0", port=5001, debug=False)
     except (KeyboardInterrupt, SystemExit):
@@ -0,0 +1,134 @@
+"""ASGI entry point, e.g.:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+
+Certificate and failure details are looked up with AsyncMySQLMonitor on
+the event loop, so one process answers many of them at once, each holding
+a pooled connection only while its query runs. Every other route is the
+Flask app, each request on its own thread from a pool of
+ASGI_WSGI_THREADS (see utils/wsgi_bridge.py), so an open /api/stream
+does not hold up the other routes.
+
+Like wsgi.py, workers default to APP_ROLE=web and serve the snapshot of a
+refresher started separately. With APP_ROLE=all (a single worker), the
+refresh is started here and runs in its own threads next to the loop.
+
+Requires `pip install uvicorn asgiref aiomysql` (or asyncmy).
+"""
+
+import asyncio
+import os
+import re
+
+os.environ.setdefault("APP_ROLE", "web")
+
+import app as dashboard  # noqa: E402
+from config.config import ASGI_CONFIG  # noqa: E402
+from utils.async_monitor import AsyncMySQLMonitor  # noqa: E402
+from utils.shared_state import SharedTunnel  # noqa: E402
+from utils.wsgi_bridge import ThreadedWsgiToAsgi  # noqa: E402
+
+DETAILS_PATH = re.compile(r"^/api/(certificate|failure)-details/(\d+)$")
+
+# Web workers connect through the refresher's tunnel, like the Flask app.
+details_monitor = AsyncMySQLMonitor(
+    tunnel=(
+        SharedTunnel(dashboard.shared_status)
+        if dashboard.ROLE == "web"
+        else dashboard.monitor.tunnel
+    ),
+    query_metrics=dashboard.monitor.query_metrics,
+)
+flask_app = ThreadedWsgiToAsgi(dashboard.app, ASGI_CONFIG["wsgi_threads"])
+# Lookups in progress, so concurrent requests for one id share a query.
+_loading = {}
+
+
+async def cached_details(cache, key, load):
+    """Like DetailCache.get_or_load(), for a coroutine loader"""
+    details = cache.get(key)
+    if details is not None:
+        return details
+
+    task = _loading.get((id(cache), key))
+    if task is None:
+        task = asyncio.ensure_future(load())
+        _loading[(id(cache), key)] = task
+        task.add_done_callback(lambda _: _loading.pop((id(cache), key), None))
+    details = await asyncio.shield(task)
+    if not (isinstance(details, dict) and "error" in details):
+        cache.set(key, details)
+    return details
+
+
+async def certificate_details(cert_id):
+    return await cached_details(
+        dashboard.certificate_details_cache,
+        cert_id,
+        lambda: details_monitor.get_certificate_details(cert_id),
+    )
+
+
+async def failure_details(task_id):
+    details = await cached_details(
+        dashboard.failure_details_cache,
+        task_id,
+        lambda: details_monitor.get_failure_details(task_id),
+    )
+    # Log events are not cached with the details: they keep arriving.
+    log_events = await asyncio.to_thread(
+        lambda: dashboard.task_log_events().events_for(task_id)
+    )
+    return {**details, "log_events": log_events}
+
+
+async def send_json(send, status, data):
+    body = dashboard.app.json.dumps(data).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            if dashboard.ROLE != "web":
+                # The first refresh blocks; keep it off the loop.
+                await asyncio.to_thread(dashboard.start_refresher)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await details_monitor.close()
+            flask_app.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+
+    match = DETAILS_PATH.match(scope.get("path", ""))
+    if scope["type"] != "http" or scope["method"] != "GET" or not match:
+        await flask_app(scope, receive, send)
+        return
+
+    kind, key = match.group(1), int(match.group(2))
+    try:
+        if kind == "certificate":
+            details = await certificate_details(key)
+        else:
+            details = await failure_details(key)
+    except Exception as e:
+        await send_json(send, 500, {"error": str(e)})
+        return
+    await send_json(send, 200, details)
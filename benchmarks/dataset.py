@@ -0,0 +1,315 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+# Rows inserted per executemany() call.
+BATCH_SIZE = 5000
+
+FIRST_NAMES = (
+    "Ana", "João", "Maria", "José", "Antônio", "Francisca", "Carlos", "Paulo",
+    "Lúcia", "Pedro", "Juliana", "Marcos", "Fernanda", "Rafael", "Patrícia",
+)
+LAST_NAMES = (
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves",
+    "Pereira", "Lima", "Gomes", "Costa", "Ribeiro", "Martins", "Araújo",
+)
+
+
+def schema(prefix):
+    """CREATE TABLE statements for the tables the monitor reads.
+
+    Columns and indexes follow what the queries in config/queries.py use.
+    """
+    return [
+        f"""
+        CREATE TABLE {prefix}students (
+            id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            email VARCHAR(255),
+            cpf VARCHAR(14),
+            phone VARCHAR(20),
+            position VARCHAR(100),
+            sector VARCHAR(100),
+            created_at DATETIME NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        f"""
+        CREATE TABLE {prefix}team_members (
+            id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            created_at DATETIME NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        f"""
+        CREATE TABLE {prefix}certificate_templates (
+            id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            template_config TEXT,
+            created_at DATETIME NOT NULL,
+            updated_at DATETIME NOT NULL,
+            KEY updated_at (updated_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        f"""
+        CREATE TABLE {prefix}certificates (
+            id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            template_id INT UNSIGNED,
+            student_id INT UNSIGNED,
+            user_id BIGINT UNSIGNED,
+            course_id BIGINT UNSIGNED,
+            completed_on DATETIME,
+            expiration DATETIME,
+            pdf_url VARCHAR(255),
+            platform_data TEXT,
+            status VARCHAR(20) NOT NULL,
+            created_at DATETIME NOT NULL,
+            updated_at DATETIME NOT NULL,
+            KEY created_at (created_at, id),
+            KEY updated_at (updated_at, id),
+            KEY user_course (user_id, course_id, created_at),
+            KEY student_id (student_id),
+            KEY template_id (template_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        f"""
+        CREATE TABLE {prefix}tasks_queue (
+            id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            payload LONGTEXT,
+            status VARCHAR(20) NOT NULL,
+            attempts INT UNSIGNED NOT NULL DEFAULT 0,
+            created_at DATETIME NOT NULL,
+            updated_at DATETIME NOT NULL,
+            KEY status_updated (status, updated_at, id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE wp_posts (
+            ID BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            post_title TEXT NOT NULL,
+            post_name VARCHAR(200) NOT NULL,
+            post_status VARCHAR(20) NOT NULL,
+            post_type VARCHAR(20) NOT NULL,
+            KEY type_status (post_type, post_status)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE wp_usermeta (
+            umeta_id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            user_id BIGINT UNSIGNED NOT NULL,
+            meta_key VARCHAR(255),
+            meta_value LONGTEXT,
+            KEY user_id (user_id),
+            KEY meta_key (meta_key(191))
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]
+
+
+def sizes(scale):
+    """Row counts per table for a given number of certificates"""
+    return {
+        "certificates": scale,
+        "students": max(scale // 2, 1),
+        "tasks_queue": max(scale // 5, 1),
+        "usermeta": max(scale // 20, 1),
+        "templates": 50,
+        "courses": 200,
+        "team_members": 100,
+    }
+
+
+class DatasetGenerator:
+    """Fills a database with deterministic synthetic data.
+
+    Dates are spread over the year before `now`, so the 7 and 30 day
+    windows used by the dashboard queries always have rows to count.
+    """
+
+    def __init__(self, connection, prefix, scale, seed=42, now=None):
+        self.connection = connection
+        self.prefix = prefix
+        self.sizes = sizes(scale)
+        self.random = random.Random(seed)
+        self.now = (now or datetime.now()).replace(microsecond=0)
+
+    def create(self):
+        with self.connection.cursor() as cursor:
+            for table in (
+                "students",
+                "team_members",
+                "certificate_templates",
+                "certificates",
+                "tasks_queue",
+            ):
+                cursor.execute(f"DROP TABLE IF EXISTS {self.prefix}{table}")
+            cursor.execute("DROP TABLE IF EXISTS wp_posts")
+            cursor.execute("DROP TABLE IF EXISTS wp_usermeta")
+            for statement in schema(self.prefix):
+                cursor.execute(statement)
+
+    def _date(self, max_days=365):
+        return self.now - timedelta(seconds=self.random.randint(0, max_days * 86400))
+
+    def _name(self):
+        return f"{self.random.choice(FIRST_NAMES)} {self.random.choice(LAST_NAMES)}"
+
+    def _insert(self, sql, rows):
+        """Insert rows from an iterable in batches, committing each one"""
+        total = 0
+        batch = []
+        with self.connection.cursor() as cursor:
+            for row in rows:
+                batch.append(row)
+                if len(batch) == BATCH_SIZE:
+                    cursor.executemany(sql, batch)
+                    self.connection.commit()
+                    total += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(sql, batch)
+                self.connection.commit()
+                total += len(batch)
+        return total
+
+    def _courses(self):
+        for i in range(1, self.sizes["courses"] + 1):
+            yield (i, f"Curso {i}", f"curso-{i}", "publish", "sfwd-courses")
+        # Other post types share the table in WordPress.
+        for i in range(self.sizes["courses"] + 1, self.sizes["courses"] * 3 + 1):
+            yield (i, f"Página {i}", f"pagina-{i}", "publish", "page")
+
+    def _students(self):
+        for _ in range(self.sizes["students"]):
+            yield (
+                self._name(),
+                f"aluno{self.random.randint(1, 10**9)}@example.com",
+                f"{self.random.randint(0, 999):03d}.{self.random.randint(0, 999):03d}."
+                f"{self.random.randint(0, 999):03d}-{self.random.randint(0, 99):02d}",
+                f"(11) 9{self.random.randint(0, 99999999):08d}",
+                self.random.choice(("Analista", "Técnico", "Gerente", "Assistente")),
+                self.random.choice(("Saúde", "Educação", "Administração")),
+                self._date(),
+            )
+
+    def _templates(self):
+        for i in range(1, self.sizes["templates"] + 1):
+            created = self._date()
+            # A couple of templates without configuration for the integrity check.
+            config = "" if i % 25 == 0 else json.dumps({"layout": f"layout-{i}"})
+            yield (f"Modelo {i}", config, created, created)
+
+    def _certificates(self):
+        statuses = ("generated",) * 90 + ("pending",) * 7 + ("failed",) * 3
+        for _ in range(self.sizes["certificates"]):
+            created = self._date()
+            updated = min(created + timedelta(hours=self.random.randint(0, 72)), self.now)
+            # About 0.5% point to templates that do not exist.
+            template = (
+                self.sizes["templates"] + 1000
+                if self.random.random() < 0.005
+                else self.random.randint(1, self.sizes["templates"])
+            )
+            yield (
+                template,
+                self.random.randint(1, self.sizes["students"]),
+                self.random.randint(1, self.sizes["students"]),
+                self.random.randint(1, self.sizes["courses"]),
+                created,
+                created + timedelta(days=365),
+                f"https://example.com/certificados/{self.random.randint(1, 10**9)}.pdf",
+                json.dumps({"origin": "benchmark"}),
+                self.random.choice(statuses),
+                created,
+                updated,
+            )
+
+    def _tasks(self):
+        statuses = ("completed",) * 75 + ("failed",) * 15 + ("pending",) * 10
+        for _ in range(self.sizes["tasks_queue"]):
+            created = self._date()
+            updated = min(created + timedelta(minutes=self.random.randint(0, 600)), self.now)
+            course = self.random.randint(1, self.sizes["courses"])
+            payload = json.dumps(
+                {
+                    "signer": {
+                        "user_id": self.random.randint(1, self.sizes["students"]),
+                        "user_name": self._name(),
+                    },
+                    "course": {"course_id": course, "course_title": f"Curso {course}"},
+                    "certificate": {"filename": f"certificado-{course}.pdf"},
+                }
+            )
+            if self.random.random() < 0.01:
+                payload = payload[:-5]  # Truncated, as seen in production.
+            yield (
+                payload,
+                self.random.choice(statuses),
+                self.random.randint(0, 5),
+                created,
+                updated,
+            )
+
+    def _usermeta(self):
+        for _ in range(self.sizes["usermeta"]):
+            yield (
+                self.random.randint(1, self.sizes["students"]),
+                f"_ldcds_certificate_{self.random.randint(1, self.sizes['courses'])}",
+                json.dumps({"issued": True}),
+            )
+
+    def _team_members(self):
+        for _ in range(self.sizes["team_members"]):
+            yield (self._name(), self._date())
+
+    def generate(self):
+        """Create the tables and load every one of them; returns row counts"""
+        p = self.prefix
+        self.create()
+        counts = {
+            "wp_posts": self._insert(
+                "INSERT INTO wp_posts (ID, post_title, post_name, post_status, post_type) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                self._courses(),
+            ),
+            f"{p}students": self._insert(
+                f"INSERT INTO {p}students "
+                "(name, email, cpf, phone, position, sector, created_at) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                self._students(),
+            ),
+            f"{p}team_members": self._insert(
+                f"INSERT INTO {p}team_members (name, created_at) VALUES (%s, %s)",
+                self._team_members(),
+            ),
+            f"{p}certificate_templates": self._insert(
+                f"INSERT INTO {p}certificate_templates "
+                "(name, template_config, created_at, updated_at) "
+                "VALUES (%s, %s, %s, %s)",
+                self._templates(),
+            ),
+            f"{p}certificates": self._insert(
+                f"INSERT INTO {p}certificates "
+                "(template_id, student_id, user_id, course_id, completed_on, "
+                "expiration, pdf_url, platform_data, status, created_at, updated_at) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                self._certificates(),
+            ),
+            f"{p}tasks_queue": self._insert(
+                f"INSERT INTO {p}tasks_queue "
+                "(payload, status, attempts, created_at, updated_at) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                self._tasks(),
+            ),
+            "wp_usermeta": self._insert(
+                "INSERT INTO wp_usermeta (user_id, meta_key, meta_value) "
+                "VALUES (%s, %s, %s)",
+                self._usermeta(),
+            ),
+        }
+
+        # Fresh statistics, so estimates behave as on a settled server.
+        with self.connection.cursor() as cursor:
+            for table in counts:
+                cursor.execute(f"ANALYZE TABLE {table}")
+                cursor.fetchall()
+        return counts
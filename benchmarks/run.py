@@ -0,0 +1,367 @@
+"""Benchmark MySQLMonitor against a local database with synthetic data.
+
+Usage:
+    python -m benchmarks.run --scales 10k,100k,1m [--start-docker] [--repeat 3]
+
+Each scale runs in its own process: the dataset is generated, every
+MySQLMonitor method is timed, then two update_monitoring_data() cycles
+(a cold one with a full certificate sync, then a warm incremental one).
+Results are printed as a table and can be saved as JSON with --output.
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DB = {
+    "host": os.getenv("BENCH_DB_HOST", "127.0.0.1"),
+    "port": int(os.getenv("BENCH_DB_PORT", 33306)),
+    "username": os.getenv("BENCH_DB_USERNAME", "root"),
+    "password": os.getenv("BENCH_DB_PASSWORD", "bench"),
+    "database": os.getenv("BENCH_DB_DATABASE", "certificates_bench"),
+}
+DOCKER_CONTAINER = "certificates-monitor-bench"
+
+
+def parse_scale(value):
+    """Turn '10k', '1m' or '5000' into a row count"""
+    value = value.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    if multiplier != 1:
+        value = value[:-1]
+    return int(float(value) * multiplier)
+
+
+def reset_peak_rss():
+    """Reset the kernel's peak RSS counter for this process (Linux only)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Peak resident memory in MB since the last reset (or process start)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def count_rows(result):
+    if isinstance(result, int):
+        return result
+    if isinstance(result, dict) and "items" in result:
+        return len(result["items"])
+    if isinstance(result, dict):
+        return 1
+    try:
+        return len(result)
+    except TypeError:
+        return 0
+
+
+def measure(func, repeat):
+    """Run func `repeat` times; returns latency stats, rows and peak RSS"""
+    latencies = []
+    rows = 0
+    reset_peak_rss()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        latencies.append(time.perf_counter() - started)
+        rows = count_rows(result)
+        del result
+
+    median = statistics.median(latencies)
+    return {
+        "min_ms": round(min(latencies) * 1000, 2),
+        "median_ms": round(median * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+        "rows": rows,
+        "rows_per_sec": round(rows / median) if median > 0 else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def start_docker(image):
+    """Start a throwaway database container and wait until it accepts logins"""
+    subprocess.run(
+        ["docker", "rm", "-f", DOCKER_CONTAINER],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    subprocess.run(
+        [
+            "docker", "run", "-d", "--rm",
+            "--name", DOCKER_CONTAINER,
+            "-e", f"MYSQL_ROOT_PASSWORD={BENCH_DB['password']}",
+            "-e", f"MARIADB_ROOT_PASSWORD={BENCH_DB['password']}",
+            "-p", f"{BENCH_DB['port']}:3306",
+            image,
+        ],
+        check=True,
+    )
+    print(f"[Bench] Started {image} as {DOCKER_CONTAINER}, waiting for it...")
+    wait_for_database(timeout=180)
+
+
+def stop_docker():
+    subprocess.run(["docker", "stop", DOCKER_CONTAINER], stdout=subprocess.DEVNULL)
+
+
+def server_connection(database=None):
+    import pymysql
+
+    return pymysql.connect(
+        host=BENCH_DB["host"],
+        port=BENCH_DB["port"],
+        user=BENCH_DB["username"],
+        password=BENCH_DB["password"],
+        database=database,
+        charset="utf8mb4",
+        connect_timeout=5,
+    )
+
+
+def wait_for_database(timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            server_connection().close()
+            return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(1)
+
+
+def load_dataset(scale, prefix):
+    from benchmarks.dataset import DatasetGenerator
+
+    conn = server_connection()
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{BENCH_DB['database']}`")
+    conn.select_db(BENCH_DB["database"])
+
+    print(f"[Bench] Generating {scale:,} certificates...")
+    started = time.perf_counter()
+    counts = DatasetGenerator(conn, prefix, scale).generate()
+    conn.close()
+    seconds = time.perf_counter() - started
+    print(f"[Bench] Dataset loaded in {seconds:.1f}s: {counts}")
+    return counts, seconds
+
+
+def monitor_cases(monitor, prefix):
+    """(name, callable) for every MySQLMonitor method worth timing"""
+    first_failed = monitor.get_failed_tasks_page(per_page=1)["items"]
+    failed_id = first_failed[0]["id"] if first_failed else 1
+    first_page = monitor.get_certificates_page(per_page=10)
+
+    return [
+        ("ping", monitor.ping),
+        ("get_total_counts", monitor.get_total_counts),
+        ("get_certificates_by_day", monitor.get_certificates_by_day),
+        ("get_table_sizes", monitor.get_table_sizes),
+        ("get_innodb_row_estimates", monitor.get_innodb_row_estimates),
+        ("get_table_stats", monitor.get_table_stats),
+        (
+            "get_exact_count(certificates)",
+            lambda: monitor.get_exact_count(f"{prefix}certificates"),
+        ),
+        ("get_certificates", monitor.get_certificates),
+        (
+            "get_certificates_after_id",
+            lambda: monitor.get_certificates_after_id(0, 5000),
+        ),
+        (
+            "get_certificates_since",
+            lambda: monitor.get_certificates_since(
+                first_page["items"][0]["created_at"], 0, 5000
+            )
+            if first_page["items"]
+            else [],
+        ),
+        ("get_certificates_fingerprint", monitor.get_certificates_fingerprint),
+        ("get_recent_certificates", monitor.get_recent_certificates),
+        ("get_failed_queue_tasks", monitor.get_failed_queue_tasks),
+        ("get_certificates_page(first)", monitor.get_certificates_page),
+        (
+            "get_certificates_page(next)",
+            lambda: monitor.get_certificates_page(cursor=first_page["next_cursor"]),
+        ),
+        ("get_failed_tasks_page(first)", monitor.get_failed_tasks_page),
+        (
+            "get_approximate_count(certificates)",
+            lambda: monitor.get_approximate_count("certificates"),
+        ),
+        (
+            "get_approximate_count(failed_tasks)",
+            lambda: monitor.get_approximate_count("failed_tasks"),
+        ),
+        ("get_certificate_usage", monitor.get_certificate_usage),
+        ("get_recent_activity", monitor.get_recent_activity),
+        ("check_data_integrity", monitor.check_data_integrity),
+        (
+            "get_certificate_details",
+            lambda: monitor.get_certificate_details(first_page["items"][0]["id"])
+            if first_page["items"]
+            else None,
+        ),
+        ("get_failure_details", lambda: monitor.get_failure_details(failed_id)),
+        (
+            "iter_export(certificates)",
+            lambda: sum(1 for _ in monitor.iter_export("certificates")),
+        ),
+        (
+            "iter_failed_tasks_export",
+            lambda: sum(1 for _ in monitor.iter_failed_tasks_export(status="failed")),
+        ),
+    ]
+
+
+def run_worker(args):
+    """Benchmark one scale; runs in a child process with its own environment"""
+    scale = parse_scale(args.scale)
+    prefix = os.environ["DB_PREFIX"]
+    result = {"scale": scale, "methods": {}, "refresh": {}}
+
+    if not args.skip_load:
+        result["dataset"], result["load_seconds"] = load_dataset(scale, prefix)
+
+    # Imported only now: config reads the environment set by the parent.
+    from utils.mysql_monitor import MySQLMonitor
+
+    monitor = MySQLMonitor()
+    for name, func in monitor_cases(monitor, prefix):
+        print(f"[Bench] {name}...")
+        try:
+            result["methods"][name] = measure(func, args.repeat)
+        except Exception as e:
+            result["methods"][name] = {"error": f"{type(e).__name__}: {e}"}
+    result["query_metrics"] = monitor.query_metrics.summary()
+    monitor.close()
+
+    import app
+
+    for name in ("cold", "warm"):
+        print(f"[Bench] update_monitoring_data ({name})...")
+        reset_peak_rss()
+        started = time.perf_counter()
+        app.update_monitoring_data()
+        result["refresh"][name] = {
+            "seconds": round(time.perf_counter() - started, 3),
+            "status": app.snapshots.current.meta["status"],
+            "stage_durations": {
+                stage: round(seconds, 3)
+                for stage, seconds in app.snapshots.current.meta["stage_durations"].items()
+            },
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+
+    with open(args.worker_output, "w") as f:
+        json.dump(result, f, default=str)
+
+
+def print_report(results):
+    for result in results:
+        print(f"\n=== {result['scale']:,} certificates ===")
+        if "load_seconds" in result:
+            print(f"Dataset load: {result['load_seconds']:.1f}s")
+        print(
+            f"{'method':40} {'median ms':>10} {'max ms':>10} "
+            f"{'rows':>9} {'rows/s':>11} {'peak MB':>8}"
+        )
+        for name, stats in result["methods"].items():
+            if "error" in stats:
+                print(f"{name:40} ERROR {stats['error']}")
+                continue
+            print(
+                f"{name:40} {stats['median_ms']:>10} {stats['max_ms']:>10} "
+                f"{stats['rows']:>9} {stats['rows_per_sec'] or '-':>11} "
+                f"{stats['peak_rss_mb']:>8}"
+            )
+        for name, stats in result["refresh"].items():
+            print(
+                f"{'update_monitoring_data (' + name + ')':40} "
+                f"{stats['seconds'] * 1000:>10.0f} {'':>10} {'':>9} {'':>11} "
+                f"{stats['peak_rss_mb']:>8}  [{stats['status']}]"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="10k", help="e.g. 10k,100k,1m,5m")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--start-docker", action="store_true")
+    parser.add_argument("--image", default="mysql:8.0")
+    parser.add_argument("--skip-load", action="store_true", help="reuse loaded data")
+    parser.add_argument("--prefix", default=os.getenv("DB_PREFIX") or "wp_")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--scale", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker_output:
+        run_worker(args)
+        return
+
+    if args.start_docker:
+        start_docker(args.image)
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="certificates-bench-") as tmp:
+            for scale in args.scales.split(","):
+                output = os.path.join(tmp, f"{scale}.json")
+                env = dict(
+                    os.environ,
+                    DB_DIRECT="1",
+                    DB_HOST=BENCH_DB["host"],
+                    DB_PORT=str(BENCH_DB["port"]),
+                    DB_USERNAME=BENCH_DB["username"],
+                    DB_PASSWORD=BENCH_DB["password"],
+                    DB_DATABASE=BENCH_DB["database"],
+                    DB_PREFIX=args.prefix,
+                    SYNC_STATE_PATH=os.path.join(tmp, f"{scale}-sync.pkl"),
+                    METRICS_DB_PATH=os.path.join(tmp, f"{scale}-metrics.db"),
+                )
+                command = [
+                    sys.executable, "-m", "benchmarks.run",
+                    "--scale", scale,
+                    "--repeat", str(args.repeat),
+                    "--worker-output", output,
+                ]
+                if args.skip_load:
+                    command.append("--skip-load")
+                subprocess.run(command, env=env, check=True)
+                with open(output) as f:
+                    results.append(json.load(f))
+    finally:
+        if args.start_docker:
+            stop_docker()
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n[Bench] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
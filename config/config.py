@@ -11,9 +11,156 @@ SSH_CONFIG = {
 }
 
 DB_CONFIG = {
-    'host': 'localhost',
+    'host': os.getenv('DB_HOST', 'localhost'),
     'port': int(os.getenv('DB_PORT', 3306)),
     'username': os.getenv('DB_USERNAME'),
     'password': os.getenv('DB_PASSWORD'),
-    'database': os.getenv('DB_DATABASE')
-}
\ No newline at end of file
+    'database': os.getenv('DB_DATABASE'),
+    # Connect to host:port directly instead of through the SSH tunnel
+    # (e.g. when running next to the database, or for benchmarks).
+    'direct': os.getenv('DB_DIRECT', '').lower() in ('1', 'true', 'yes'),
+}
+
+POOL_CONFIG = {
+    'size': int(os.getenv('DB_POOL_SIZE', 5)),
+    'timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+    'read_timeout': int(os.getenv('DB_READ_TIMEOUT', 120)),
+}
+
+ASYNC_DB_CONFIG = {
+    # aiomysql or asyncmy, used by asgi.py; empty picks the one installed.
+    'driver': os.getenv('ASYNC_DB_DRIVER') or None,
+    'pool_size': int(os.getenv('ASYNC_DB_POOL_SIZE', 10)),
+}
+
+REFRESH_CONFIG = {
+    'max_workers': int(os.getenv('REFRESH_MAX_WORKERS', 9)),
+    'stage_timeout': int(os.getenv('REFRESH_STAGE_TIMEOUT', 60)),
+}
+
+TABLE_STATS_CONFIG = {
+    'mode': os.getenv('TABLE_STATS_MODE', 'hybrid'),
+    'ttl': int(os.getenv('TABLE_STATS_TTL', 3600)),
+    'refresh_delay': float(os.getenv('TABLE_STATS_REFRESH_DELAY', 5)),
+}
+
+METRICS_CONFIG = {
+    'path': os.getenv('METRICS_DB_PATH', 'data/metrics.db'),
+    'raw_retention_days': int(os.getenv('METRICS_RAW_RETENTION_DAYS', 2)),
+    'hourly_retention_days': int(os.getenv('METRICS_HOURLY_RETENTION_DAYS', 30)),
+    'daily_retention_days': int(os.getenv('METRICS_DAILY_RETENTION_DAYS', 730)),
+}
+
+HEALTH_CONFIG = {
+    'max_age': int(os.getenv('HEALTH_MAX_AGE', 900)),
+    'force_interval': int(os.getenv('HEALTH_FORCE_INTERVAL', 60)),
+}
+
+DETAIL_CACHE_CONFIG = {
+    'max_size': int(os.getenv('DETAIL_CACHE_SIZE', 1000)),
+    'ttl': int(os.getenv('DETAIL_CACHE_TTL', 300)),
+}
+
+PAYLOAD_CONFIG = {
+    # msgspec, orjson or json; empty picks the fastest installed.
+    'backend': os.getenv('PAYLOAD_DECODER') or None,
+}
+
+SYNC_CONFIG = {
+    'state_path': os.getenv('SYNC_STATE_PATH', 'data/certificates_sync.pkl'),
+    'batch_size': int(os.getenv('SYNC_BATCH_SIZE', 5000)),
+    'overlap_seconds': int(os.getenv('SYNC_OVERLAP_SECONDS', 60)),
+    'drift_check_every': int(os.getenv('SYNC_DRIFT_CHECK_EVERY', 12)),
+}
+
+TUNNEL_CONFIG = {
+    # Seconds to wait for the forwarded port to accept connections.
+    'ready_timeout': float(os.getenv('TUNNEL_READY_TIMEOUT', 10)),
+    'keepalive': float(os.getenv('TUNNEL_KEEPALIVE', 15)),
+    'health_interval': float(os.getenv('TUNNEL_HEALTH_INTERVAL', 10)),
+    'backoff_base': float(os.getenv('TUNNEL_BACKOFF_BASE', 0.5)),
+    'backoff_max': float(os.getenv('TUNNEL_BACKOFF_MAX', 30)),
+    'max_attempts': int(os.getenv('TUNNEL_MAX_ATTEMPTS', 5)),
+}
+
+INDEX_ADVISOR_CONFIG = {
+    'enabled': os.getenv('INDEX_ADVISOR', 'true').lower() in ('1', 'true', 'yes'),
+    # Full scans of tables smaller than this are not reported.
+    'min_rows': int(os.getenv('INDEX_ADVISOR_MIN_ROWS', 10000)),
+}
+
+COUNTER_CONFIG = {
+    # Refresh cycles between full recounts of the dashboard counters.
+    'reconcile_every': int(os.getenv('COUNTER_RECONCILE_EVERY', 12)),
+}
+
+CDC_CONFIG = {
+    # Tail the binlog for near real-time updates (needs mysql-replication,
+    # binlog_format=ROW and REPLICATION SLAVE/CLIENT); polling otherwise.
+    'enabled': os.getenv('CDC_ENABLED', '').lower() in ('1', 'true', 'yes'),
+    'server_id': int(os.getenv('CDC_SERVER_ID', 4271)),
+    'state_path': os.getenv('CDC_STATE_PATH', 'data/binlog_position.json'),
+    # Changes are applied once no event arrived for `debounce_seconds`,
+    # and at most `max_delay_seconds` after the first one.
+    'debounce_seconds': float(os.getenv('CDC_DEBOUNCE_SECONDS', 2)),
+    'max_delay_seconds': float(os.getenv('CDC_MAX_DELAY_SECONDS', 10)),
+    'heartbeat_seconds': float(os.getenv('CDC_HEARTBEAT_SECONDS', 30)),
+    'retry_seconds': int(os.getenv('CDC_RETRY_SECONDS', 600)),
+}
+
+LIVE_CONFIG = {
+    # Dashboards connected to /api/stream at the same time.
+    'max_clients': int(os.getenv('LIVE_MAX_CLIENTS', 100)),
+    # Events a slow browser may fall behind before it is disconnected.
+    'queue_size': int(os.getenv('LIVE_QUEUE_SIZE', 16)),
+    'keepalive': float(os.getenv('LIVE_KEEPALIVE', 15)),
+    'retry_ms': int(os.getenv('LIVE_RETRY_MS', 5000)),
+}
+
+ASGI_CONFIG = {
+    # Threads running the Flask routes under asgi.py. Every open
+    # /api/stream holds one, so keep it above LIVE_MAX_CLIENTS.
+    'wsgi_threads': int(
+        os.getenv('ASGI_WSGI_THREADS', LIVE_CONFIG['max_clients'] + 32)
+    ),
+}
+
+DEPLOY_CONFIG = {
+    # all: one process refreshes and serves (default). For several workers,
+    # run one `refresher` (python app.py) and `web` workers (wsgi.py).
+    'role': os.getenv('APP_ROLE', 'all'),
+    'shared_path': os.getenv('SHARED_STATE_PATH', 'data/shared'),
+    # Seconds between checks for a new snapshot in web workers.
+    'poll_interval': float(os.getenv('SHARED_POLL_INTERVAL', 1)),
+    # Seconds between status writes by the refresher.
+    'status_interval': int(os.getenv('SHARED_STATUS_INTERVAL', 5)),
+}
+
+LOG_TAIL_CONFIG = {
+    # Comma-separated paths of worker/queue logs on the server; empty disables.
+    'paths': [p.strip() for p in os.getenv('LOG_TAIL_PATHS', '').split(',') if p.strip()],
+    'interval': int(os.getenv('LOG_TAIL_INTERVAL', 10)),
+    'state_path': os.getenv('LOG_TAIL_STATE_PATH', 'data/log_offsets.json'),
+    # Most bytes read from one file per poll, and from the end of a file
+    # seen for the first time.
+    'max_read_bytes': int(os.getenv('LOG_TAIL_MAX_READ_BYTES', 1048576)),
+    'initial_bytes': int(os.getenv('LOG_TAIL_INITIAL_BYTES', 65536)),
+    'max_events': int(os.getenv('LOG_TAIL_MAX_EVENTS', 5000)),
+    # Finds the tasks_queue id in a log line (first group).
+    'task_id_pattern': os.getenv(
+        'LOG_TAIL_TASK_ID_PATTERN',
+        r'\b(?:task|tasks_queue|queue_task)(?:[_ ]?id)?["\']?\s*[:=#]?\s*["\']?(\d+)',
+    ),
+}
+
+REQUEUE_CONFIG = {
+    # Tasks updated per transaction.
+    'batch_size': int(os.getenv('REQUEUE_BATCH_SIZE', 500)),
+    # Minimum pause between batches; a batch that took longer waits as long
+    # as it took, so writes use at most half of the time.
+    'throttle_seconds': float(os.getenv('REQUEUE_THROTTLE_SECONDS', 0.5)),
+    'max_tasks': int(os.getenv('REQUEUE_MAX_TASKS', 10000)),
+    # Status and attempts given to requeued tasks.
+    'status': os.getenv('REQUEUE_STATUS', 'pending'),
+    'attempts': int(os.getenv('REQUEUE_ATTEMPTS', 0)),
+}
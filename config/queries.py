@@ -9,12 +9,21 @@ MONITORING_QUERIES = {
     "table_sizes": f"""
         SELECT
             table_name AS 'Tabela',
-            ROUND((data_length + index_length) / 1024 / 1024, 2) AS 'Tamanho (MB)'
+            ROUND((data_length + index_length) / 1024 / 1024, 2) AS 'Tamanho (MB)',
+            table_rows AS 'Estimativa'
         FROM information_schema.tables
         WHERE table_schema = DATABASE()
         AND table_name LIKE '{prefix}%'
         ORDER BY (data_length + index_length) DESC
     """,
+    "innodb_table_stats": f"""
+        SELECT
+            table_name AS 'Tabela',
+            n_rows AS 'Estimativa'
+        FROM mysql.innodb_table_stats
+        WHERE database_name = DATABASE()
+        AND table_name LIKE '{prefix}%'
+    """,
     "certificates": f"""
         SELECT
             c.id,
@@ -29,6 +38,229 @@ MONITORING_QUERIES = {
         LEFT JOIN wp_posts p ON c.course_id = p.ID AND p.post_type = 'sfwd-courses'
         ORDER BY c.created_at DESC
     """,
+    "certificates_incremental": f"""
+        SELECT
+            c.id,
+            c.student_id,
+            c.course_id,
+            s.name as student_name,
+            p.post_title as course_name,
+            c.status,
+            c.created_at,
+            c.updated_at
+        FROM {prefix}certificates c
+        LEFT JOIN {prefix}students s ON c.student_id = s.id
+        LEFT JOIN wp_posts p ON c.course_id = p.ID AND p.post_type = 'sfwd-courses'
+        WHERE c.updated_at > %(since)s
+           OR (c.updated_at = %(since)s AND c.id > %(last_id)s)
+        ORDER BY c.updated_at ASC, c.id ASC
+        LIMIT %(limit)s
+    """,
+    "certificates_by_id": f"""
+        SELECT
+            c.id,
+            c.student_id,
+            c.course_id,
+            s.name as student_name,
+            p.post_title as course_name,
+            c.status,
+            c.created_at,
+            c.updated_at
+        FROM {prefix}certificates c
+        LEFT JOIN {prefix}students s ON c.student_id = s.id
+        LEFT JOIN wp_posts p ON c.course_id = p.ID AND p.post_type = 'sfwd-courses'
+        WHERE c.id > %(last_id)s
+        ORDER BY c.id ASC
+        LIMIT %(limit)s
+    """,
+    "certificates_fingerprint": f"""
+        SELECT
+            COUNT(*) as total,
+            MAX(id) as max_id
+        FROM {prefix}certificates
+    """,
+    "certificates_page": {
+        "first": f"""
+            SELECT
+                c.id,
+                c.student_id,
+                c.course_id,
+                s.name as student_name,
+                p.post_title as course_name,
+                c.status,
+                c.created_at
+            FROM {prefix}certificates c
+            LEFT JOIN {prefix}students s ON c.student_id = s.id
+            LEFT JOIN wp_posts p ON c.course_id = p.ID AND p.post_type = 'sfwd-courses'
+            ORDER BY c.created_at DESC, c.id DESC
+            LIMIT %(limit)s
+        """,
+        "next": f"""
+            SELECT
+                c.id,
+                c.student_id,
+                c.course_id,
+                s.name as student_name,
+                p.post_title as course_name,
+                c.status,
+                c.created_at
+            FROM {prefix}certificates c
+            LEFT JOIN {prefix}students s ON c.student_id = s.id
+            LEFT JOIN wp_posts p ON c.course_id = p.ID AND p.post_type = 'sfwd-courses'
+            WHERE c.created_at < %(key)s
+               OR (c.created_at = %(key)s AND c.id < %(id)s)
+            ORDER BY c.created_at DESC, c.id DESC
+            LIMIT %(limit)s
+        """,
+        "prev": f"""
+            SELECT
+                c.id,
+                c.student_id,
+                c.course_id,
+                s.name as student_name,
+                p.post_title as course_name,
+                c.status,
+                c.created_at
+            FROM {prefix}certificates c
+            LEFT JOIN {prefix}students s ON c.student_id = s.id
+            LEFT JOIN wp_posts p ON c.course_id = p.ID AND p.post_type = 'sfwd-courses'
+            WHERE c.created_at > %(key)s
+               OR (c.created_at = %(key)s AND c.id > %(id)s)
+            ORDER BY c.created_at ASC, c.id ASC
+            LIMIT %(limit)s
+        """,
+    },
+    "failed_tasks_page": {
+        "first": f"""
+            SELECT *
+            FROM {prefix}tasks_queue
+            WHERE status = 'failed'
+            ORDER BY updated_at DESC, id DESC
+            LIMIT %(limit)s
+        """,
+        "next": f"""
+            SELECT *
+            FROM {prefix}tasks_queue
+            WHERE status = 'failed'
+            AND (updated_at < %(key)s OR (updated_at = %(key)s AND id < %(id)s))
+            ORDER BY updated_at DESC, id DESC
+            LIMIT %(limit)s
+        """,
+        "prev": f"""
+            SELECT *
+            FROM {prefix}tasks_queue
+            WHERE status = 'failed'
+            AND (updated_at > %(key)s OR (updated_at = %(key)s AND id > %(id)s))
+            ORDER BY updated_at ASC, id ASC
+            LIMIT %(limit)s
+        """,
+    },
+    "approximate_counts": {
+        "certificates": f"""
+            SELECT table_rows AS count
+            FROM information_schema.tables
+            WHERE table_schema = DATABASE()
+            AND table_name = '{prefix}certificates'
+        """,
+        "failed_tasks": f"""
+            EXPLAIN SELECT id
+            FROM {prefix}tasks_queue
+            WHERE status = 'failed'
+        """,
+    },
+    "exports": {
+        "certificates": {
+            "query": f"""
+                SELECT
+                    c.id,
+                    c.student_id,
+                    c.course_id,
+                    s.name as student_name,
+                    p.post_title as course_name,
+                    c.status,
+                    c.created_at,
+                    c.updated_at
+                FROM {prefix}certificates c
+                LEFT JOIN {prefix}students s ON c.student_id = s.id
+                LEFT JOIN wp_posts p ON c.course_id = p.ID AND p.post_type = 'sfwd-courses'
+                WHERE 1 = 1 {{filters}}
+                ORDER BY c.id ASC
+            """,
+            "date_column": "c.created_at",
+            "status_column": "c.status",
+        },
+        "tasks": {
+            "query": f"""
+                SELECT id, payload, status, attempts, created_at, updated_at
+                FROM {prefix}tasks_queue
+                WHERE 1 = 1 {{filters}}
+                ORDER BY id ASC
+            """,
+            "date_column": "updated_at",
+            "status_column": "status",
+        },
+    },
+    "certificate_details": f"""
+        SELECT
+            c.*,
+            s.id AS student__id,
+            s.name AS student__name,
+            s.email AS student__email,
+            s.cpf AS student__cpf,
+            s.phone AS student__phone,
+            s.position AS student__position,
+            s.sector AS student__sector,
+            s.created_at AS student__created_at,
+            p.ID AS course__id,
+            p.post_title AS course__title,
+            p.post_name AS course__slug,
+            p.post_status AS course__status
+        FROM {prefix}certificates c
+        LEFT JOIN {prefix}students s ON s.id = c.student_id
+        LEFT JOIN wp_posts p ON p.ID = c.course_id AND p.post_type = 'sfwd-courses'
+        WHERE c.id = %s
+    """,
+    "failure_details": f"""
+        SELECT
+            t.*,
+            c.id AS certificate__id,
+            c.template_id AS certificate__template_id,
+            c.student_id AS certificate__student_id,
+            c.user_id AS certificate__user_id,
+            c.course_id AS certificate__course_id,
+            c.completed_on AS certificate__completed_on,
+            c.expiration AS certificate__expiration,
+            c.pdf_url AS certificate__pdf_url,
+            c.platform_data AS certificate__platform_data,
+            c.status AS certificate__status,
+            c.created_at AS certificate__created_at,
+            c.updated_at AS certificate__updated_at,
+            m.meta_value AS user_metadata
+        FROM (
+            SELECT
+                q.*,
+                CASE WHEN JSON_VALID(q.payload) THEN CAST(JSON_UNQUOTE(
+                    JSON_EXTRACT(q.payload, '$.signer.user_id')) AS UNSIGNED)
+                END AS signer_user_id,
+                CASE WHEN JSON_VALID(q.payload) THEN CAST(JSON_UNQUOTE(
+                    JSON_EXTRACT(q.payload, '$.course.course_id')) AS UNSIGNED)
+                END AS payload_course_id
+            FROM {prefix}tasks_queue q
+            WHERE q.id = %s
+        ) t
+        LEFT JOIN {prefix}certificates c ON c.id = (
+            SELECT c2.id
+            FROM {prefix}certificates c2
+            WHERE c2.user_id = t.signer_user_id
+            AND c2.course_id = t.payload_course_id
+            ORDER BY c2.created_at DESC
+            LIMIT 1
+        )
+        LEFT JOIN wp_usermeta m
+            ON m.user_id = t.signer_user_id
+            AND m.meta_key = CONCAT('_ldcds_certificate_', t.payload_course_id)
+        LIMIT 1
+    """,
     "recent_certificates": f"""
         SELECT
             c.id,
@@ -44,12 +276,23 @@ MONITORING_QUERIES = {
         WHERE c.created_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
         ORDER BY c.created_at DESC
     """,
-    "failed_queue_tasks": f"""
-        SELECT *
+    "failed_queue_task_keys": f"""
+        SELECT id, attempts, updated_at
         FROM {prefix}tasks_queue
         WHERE status = 'failed'
         ORDER BY updated_at DESC
     """,
+    "queue_task_payloads": f"""
+        SELECT id, payload
+        FROM {prefix}tasks_queue
+        WHERE id IN %(ids)s
+    """,
+    "requeue_tasks": f"""
+        UPDATE {prefix}tasks_queue
+        SET status = %(status)s, attempts = %(attempts)s
+        WHERE id IN %(ids)s
+        AND status = 'failed'
+    """,
     "total_counts": f"""
         SELECT
             (SELECT COUNT(*) FROM {prefix}certificates) as total_certificates,
@@ -57,21 +300,45 @@ MONITORING_QUERIES = {
             (SELECT COUNT(*) FROM {prefix}team_members) as total_team_members,
             (SELECT COUNT(*) FROM {prefix}tasks_queue WHERE status = 'failed') as total_failed_tasks
     """,
+    "table_totals": {
+        "students": f"""
+            SELECT COUNT(*) as total, MAX(id) as max_id
+            FROM {prefix}students
+        """,
+        "team_members": f"""
+            SELECT COUNT(*) as total, MAX(id) as max_id
+            FROM {prefix}team_members
+        """,
+    },
+    "table_growth": {
+        "students": f"""
+            SELECT COUNT(*) as total, MAX(id) as max_id
+            FROM {prefix}students
+            WHERE id > %(last_id)s
+        """,
+        "team_members": f"""
+            SELECT COUNT(*) as total, MAX(id) as max_id
+            FROM {prefix}team_members
+            WHERE id > %(last_id)s
+        """,
+    },
+    "recent_templates": f"""
+        SELECT COUNT(*) as count
+        FROM {prefix}certificate_templates
+        WHERE updated_at >= DATE_SUB(NOW(), INTERVAL %(hours)s HOUR)
+    """,
+    "binlog_settings": """
+        SHOW VARIABLES
+        WHERE Variable_name IN ('log_bin', 'binlog_format', 'binlog_row_image')
+    """,
+    "binlog_status": "SHOW MASTER STATUS",
     "certificates_by_day": f"""
-        WITH RECURSIVE dates AS (
-            SELECT CONVERT_TZ(NOW(), '+00:00', '-03:00') - INTERVAL 6 DAY as date
-            UNION ALL
-            SELECT date + INTERVAL 1 DAY
-            FROM dates
-            WHERE date < DATE(CONVERT_TZ(NOW(), '+00:00', '-03:00'))
-        )
         SELECT
-            DATE(d.date) as date,
-            COALESCE(COUNT(c.id), 0) as count
-        FROM dates d
-        LEFT JOIN {prefix}certificates c ON DATE(CONVERT_TZ(c.created_at, '+00:00', '-03:00')) = DATE(d.date)
-        GROUP BY DATE(d.date)
-        ORDER BY DATE(d.date) ASC
+            DATE(CONVERT_TZ(created_at, '+00:00', '-03:00')) as date,
+            COUNT(*) as count
+        FROM {prefix}certificates
+        WHERE created_at >= %(start)s AND created_at < %(end)s
+        GROUP BY DATE(CONVERT_TZ(created_at, '+00:00', '-03:00'))
     """,
     "certificate_usage": f"""
         SELECT
@@ -79,7 +346,7 @@ MONITORING_QUERIES = {
             COUNT(*) as count,
             DATE(created_at) as date
         FROM {prefix}certificates
-        WHERE created_at >= DATE_SUB(NOW(), INTERVAL 30 DAY)
+        WHERE created_at >= %(start)s AND created_at < %(end)s
         GROUP BY status, DATE(created_at)
         ORDER BY date DESC
     """,
@@ -98,6 +365,16 @@ MONITORING_QUERIES = {
         FROM {prefix}certificate_templates
         WHERE updated_at >= DATE_SUB(NOW(), INTERVAL %(hours)s HOUR)
     """,
+    "index_columns": """
+        SELECT
+            table_name AS table_name,
+            index_name AS index_name,
+            column_name AS column_name
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE()
+        AND table_name IN %(tables)s
+        ORDER BY table_name, index_name, seq_in_index
+    """,
     "integrity_checks": {
         "certificados_sem_template": f"""
             SELECT COUNT(*)
@@ -112,3 +389,39 @@ MONITORING_QUERIES = {
         """,
     },
 }
+
+# Indexes the monitoring queries rely on: table, leading columns and the
+# queries that need them. Checked at startup by utils/index_advisor.py.
+RECOMMENDED_INDEXES = [
+    {
+        "table": f"{prefix}certificates",
+        "columns": ("created_at",),
+        "queries": "certificates_by_day, certificate_usage, certificates_page, "
+        "recent_certificates, recent_activity",
+    },
+    {
+        "table": f"{prefix}certificates",
+        "columns": ("updated_at",),
+        "queries": "certificates_incremental",
+    },
+    {
+        "table": f"{prefix}certificates",
+        "columns": ("user_id", "course_id"),
+        "queries": "failure_details",
+    },
+    {
+        "table": f"{prefix}tasks_queue",
+        "columns": ("status", "updated_at"),
+        "queries": "failed_tasks_page, failed_queue_task_keys, total_counts",
+    },
+    {
+        "table": f"{prefix}certificate_templates",
+        "columns": ("updated_at",),
+        "queries": "recent_activity",
+    },
+    {
+        "table": "wp_usermeta",
+        "columns": ("user_id",),
+        "queries": "failure_details",
+    },
+]
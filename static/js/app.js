@@ -56,6 +56,23 @@ function showFailuresDetails(taskId) {
             html += '</div>';
             html += '</div>';
 
+            // Log Events
+            if (data.log_events && data.log_events.length) {
+                html += '<div class="modal-section">';
+                html += '<h3>🧾 Logs</h3>';
+                data.log_events.forEach(event => {
+                    html += `<div class="log-event ${event.level.toLowerCase()}">`;
+                    html += `<div class="info-item"><span class="info-label">${escapeHtml(event.time)}</span> `;
+                    html += `<span class="badge log-level">${escapeHtml(event.level)}</span> `;
+                    html += `${escapeHtml(event.message)}</div>`;
+                    if (event.context.length) {
+                        html += `<div class="json-content"><pre>${escapeHtml(event.context.join('\n'))}</pre></div>`;
+                    }
+                    html += '</div>';
+                });
+                html += '</div>';
+            }
+
             modalContent.innerHTML = html;
         })
         .catch(error => {
@@ -153,6 +170,227 @@ window.onclick = function(event) {
     }
 }
 
+function requeueFilters() {
+    const form = document.getElementById('requeueForm');
+    const filters = {};
+    new FormData(form).forEach((value, key) => {
+        if (value !== '') {
+            filters[key] = value;
+        }
+    });
+    return filters;
+}
+
+function previewRequeue(event) {
+    event.preventDefault();
+    const preview = document.getElementById('requeuePreview');
+    const filters = requeueFilters();
+    preview.innerHTML = '<p>Carregando...</p>';
+
+    fetch(`/api/requeue/preview?${new URLSearchParams(filters)}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.error) {
+                preview.innerHTML = `<p style="color: red;">Erro: ${escapeHtml(data.error)}</p>`;
+                return;
+            }
+
+            let html = `<p><strong>${data.count}</strong> tarefas com falha serão reenfileiradas.</p>`;
+            if (data.courses.length) {
+                html += '<ul>';
+                data.courses.forEach(course => {
+                    html += `<li>${escapeHtml(course.course_name)}: ${course.count}</li>`;
+                });
+                html += '</ul>';
+            }
+            if (data.too_many) {
+                html += `<p style="color: red;">Máximo de ${data.max_tasks} tarefas por vez; refine os filtros.</p>`;
+            } else if (data.count) {
+                html += `<button class="btn-details" onclick="runRequeue('${data.digest}')">Confirmar</button>`;
+            }
+            preview.innerHTML = html;
+        })
+        .catch(error => {
+            preview.innerHTML = `<p style="color: red;">Erro: ${error}</p>`;
+        });
+}
+
+function runRequeue(digest) {
+    const preview = document.getElementById('requeuePreview');
+    const status = document.createElement('p');
+    preview.innerHTML = '';
+    preview.appendChild(status);
+    status.textContent = 'Reenfileirando...';
+
+    fetch('/api/requeue', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({...requeueFilters(), digest: digest}),
+    })
+        .then(response => {
+            if (!response.ok) {
+                return response.json().then(data => {
+                    status.textContent = `Erro: ${data.error}`;
+                });
+            }
+            // One JSON line per batch.
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            const read = () => reader.read().then(({done, value}) => {
+                buffer += decoder.decode(value || new Uint8Array(), {stream: !done});
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                lines.filter(line => line).forEach(line => {
+                    const step = JSON.parse(line);
+                    if (step.error) {
+                        status.textContent = `Erro após ${step.updated} tarefas: ${step.error}`;
+                    } else if (step.done) {
+                        status.textContent = `${step.updated} de ${step.total} tarefas reenfileiradas.`;
+                    } else {
+                        status.textContent = `Lote ${step.batch}/${step.batches}: ${step.processed} de ${step.total}...`;
+                    }
+                });
+                if (!done) {
+                    return read();
+                }
+            });
+            return read();
+        })
+        .catch(error => {
+            status.textContent = `Erro: ${error}`;
+        });
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text == null ? '' : String(text);
+    return div.innerHTML;
+}
+
 function closeModal(modal) {
     document.getElementById(modal + 'Modal').style.display = 'none';
 }
+
+// Snapshot versions are "<epoch>-<generation>"; generations start over
+// with a new epoch when the server restarts.
+function parseVersion(version) {
+    const match = /^(.*)-(\d+)$/.exec(version || '');
+    return match ? { epoch: match[1], generation: Number(match[2]) } : { epoch: '', generation: 0 };
+}
+
+// Live dashboard updates (Server-Sent Events from /api/stream).
+function connectLiveUpdates(since, onChange) {
+    if (!window.EventSource) {
+        return null;
+    }
+
+    let last = parseVersion(since);
+    const source = new EventSource(`/api/stream?since=${encodeURIComponent(since || '')}`);
+    const handle = event => {
+        const version = parseVersion(event.lastEventId);
+        // Diffs already contained in the page or in a state event.
+        if (event.type === 'update' && version.epoch === last.epoch && version.generation <= last.generation) {
+            return;
+        }
+        last = version;
+        onChange(JSON.parse(event.data), event.type);
+    };
+    source.addEventListener('state', handle);
+    source.addEventListener('update', handle);
+    return source;
+}
+
+function flash(element) {
+    element.classList.remove('live-updated');
+    // Restart the animation.
+    void element.offsetWidth;
+    element.classList.add('live-updated');
+}
+
+function checkLabel(check) {
+    return check.replace(/_/g, ' ').replace(/\S+/g, word => word.charAt(0).toUpperCase() + word.slice(1).toLowerCase());
+}
+
+function patchDashboard(change) {
+    Object.entries(change.total_counts || {}).forEach(([key, value]) => {
+        const element = document.querySelector(`[data-count="${key}"]`);
+        if (element && element.textContent !== String(value)) {
+            element.textContent = value ?? '';
+            flash(element);
+        }
+    });
+
+    if (change.total_counts && 'total_failed_tasks' in change.total_counts) {
+        const failed = change.total_counts.total_failed_tasks || 0;
+        const card = document.getElementById('failedCard');
+        card.classList.toggle('danger', failed > 0);
+        card.classList.toggle('success', failed <= 0);
+    }
+
+    if (change.failed_tasks && change.failed_tasks.added.length) {
+        const badge = document.getElementById('newFailures');
+        const count = (Number(badge.dataset.count) || 0) + change.failed_tasks.added.length;
+        badge.dataset.count = count;
+        badge.textContent = `+${count} nova${count > 1 ? 's' : ''}`;
+        badge.title = change.failed_tasks.added
+            .map(task => `#${task.id} ${task.student_name} - ${task.course_name}`)
+            .join('\n');
+        badge.hidden = false;
+    }
+
+    if (change.integrity_checks) {
+        patchIntegrityChecks(change.integrity_checks);
+    }
+    if (change.table_stats) {
+        renderTableStats(change.table_stats);
+    }
+    if (change.last_update) {
+        document.getElementById('lastUpdate').textContent = `Última atualização: ${change.last_update}`;
+    }
+}
+
+function patchIntegrityChecks(checks) {
+    const tbody = document.getElementById('integrityChecks');
+    Object.entries(checks).forEach(([check, value]) => {
+        let row = tbody.querySelector(`tr[data-check="${check}"]`);
+        if (!row) {
+            row = document.createElement('tr');
+            row.dataset.check = check;
+            const label = document.createElement('td');
+            label.textContent = checkLabel(check);
+            const cell = document.createElement('td');
+            cell.appendChild(document.createElement('span'));
+            row.append(label, cell);
+            tbody.appendChild(row);
+        }
+        const badge = row.querySelector('span');
+        badge.className = `badge ${value > 0 ? 'warning' : 'success'}`;
+        badge.textContent = value;
+        flash(row);
+    });
+}
+
+function renderTableStats(tables) {
+    const tbody = document.getElementById('tableStats');
+    tbody.replaceChildren(...tables.map(table => {
+        const estimated = table['Origem'].startsWith('Estimado');
+        const row = document.createElement('tr');
+        const cells = [
+            table['Tabela'],
+            `${estimated ? '~' : ''}${table['Registros']}`,
+            table['Tamanho (MB)'],
+        ].map(text => {
+            const cell = document.createElement('td');
+            cell.textContent = text;
+            return cell;
+        });
+        const source = document.createElement('td');
+        const badge = document.createElement('span');
+        badge.className = `badge ${estimated ? 'estimate' : 'exact'}`;
+        badge.textContent = table['Origem'];
+        source.appendChild(badge);
+        row.append(...cells, source);
+        return row;
+    }));
+}
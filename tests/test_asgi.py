@@ -0,0 +1,106 @@
+import asyncio
+
+import asgi
+from utils.wsgi_bridge import ThreadedWsgiToAsgi
+
+
+def scope(path, method="GET"):
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [],
+        "http_version": "1.1",
+        "root_path": "",
+    }
+
+
+async def request(app, path, disconnect=None, method="GET", body=b""):
+    """Run one request; the client disconnects once `disconnect` is set"""
+    disconnect = disconnect or asyncio.Event()
+    received = []
+    messages = []
+
+    async def receive():
+        if not received:
+            received.append(True)
+            return {"type": "http.request", "body": body}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope(path, method), receive, send)
+    return messages
+
+
+def response_body(messages):
+    return b"".join(m.get("body", b"") for m in messages if "body" in m)
+
+
+def test_plain_route_answers_while_a_stream_is_open():
+    live_updates = asgi.dashboard.live_updates
+
+    async def scenario():
+        gone = asyncio.Event()
+        stream = asyncio.ensure_future(request(asgi.app, "/api/stream", gone))
+        while live_updates.clients() == 0:
+            await asyncio.sleep(0.01)
+
+        messages = await asyncio.wait_for(request(asgi.app, "/api/stats"), 5)
+        assert messages[0]["status"] == 200
+        assert not stream.done()
+
+        gone.set()
+        # The stream notices the disconnect on its next write.
+        for _ in range(100):
+            live_updates.publish("update", "{}")
+            await asyncio.wait([stream], timeout=0.05)
+            if stream.done():
+                break
+        assert stream.done()
+
+    asyncio.run(scenario())
+    assert live_updates.clients() == 0
+
+
+def test_bridge_passes_the_request_body():
+    def echo(environ, start_response):
+        start_response("201 Created", [("Content-Type", "text/plain")])
+        return [environ["REQUEST_METHOD"].encode(), environ["wsgi.input"].read()]
+
+    bridge = ThreadedWsgiToAsgi(echo, max_threads=2)
+    messages = asyncio.run(request(bridge, "/", method="POST", body=b"hello"))
+    bridge.close()
+
+    assert messages[0]["status"] == 201
+    assert response_body(messages) == b"POSThello"
+    assert messages[-1] == {"type": "http.response.body"}
+
+
+def test_bridge_closes_the_response_when_the_client_leaves():
+    closed = []
+
+    class Endless:
+        def __iter__(self):
+            while True:
+                yield b"tick\n"
+
+        def close(self):
+            closed.append(True)
+
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return Endless()
+
+    async def scenario():
+        gone = asyncio.Event()
+        gone.set()
+        return await asyncio.wait_for(request(bridge, "/", gone), 5)
+
+    bridge = ThreadedWsgiToAsgi(app, max_threads=1)
+    asyncio.run(scenario())
+    bridge.close()
+    assert closed == [True]
@@ -0,0 +1,177 @@
+import asyncio
+
+import pytest
+
+from config.config import POOL_CONFIG
+from utils import async_monitor
+from utils.async_monitor import AsyncMySQLMonitor
+from utils.connection_pool import PoolTimeout
+
+
+class ConnectionLost(Exception):
+    pass
+
+
+class FakeTunnel:
+    def __init__(self):
+        self.port = 40000
+
+    def is_active(self):
+        return True
+
+    def local_port(self):
+        return self.port
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.connection = conn
+        self.rowcount = 0
+        self.rows = []
+
+    async def execute(self, query, args=None):
+        if self.connection.server.lost:
+            raise ConnectionLost("server has gone away")
+        self.connection.server.queries.append(query)
+        self.rows = list(self.connection.server.rows)
+
+    async def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    async def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+
+    def cursor(self, cursor_class):
+        return FakeCursor(self)
+
+    async def ping(self, reconnect=True):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool:
+    def __init__(self, server, maxsize, port):
+        self.server = server
+        self.port = port
+        self.free = maxsize
+        self.closed = False
+        self.released = []
+
+    async def acquire(self):
+        while not self.free:
+            await asyncio.sleep(0.01)
+        self.free -= 1
+        return FakeConnection(self.server)
+
+    def release(self, conn):
+        self.free += 1
+        self.released.append(conn)
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+
+class FakeServer:
+    def __init__(self):
+        self.rows = []
+        self.queries = []
+        self.lost = False
+        self.pools = []
+
+    async def create_pool(self, minsize, maxsize, port, **options):
+        pool = FakePool(self, maxsize, port)
+        self.pools.append(pool)
+        return pool
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeServer()
+    driver = {
+        "create_pool": server.create_pool,
+        "database_arg": "db",
+        "cursor": None,
+        "ss_cursor": None,
+        "connection_errors": (ConnectionLost,),
+    }
+    monkeypatch.setattr(async_monitor, "_drivers", lambda: {"fake": driver})
+    return server
+
+
+@pytest.fixture
+def monitor(server):
+    monitor = AsyncMySQLMonitor(tunnel=FakeTunnel(), driver="fake")
+    monitor.pool_size = 1
+    return monitor
+
+
+def test_missing_driver_is_reported(server):
+    with pytest.raises(RuntimeError, match="not installed"):
+        AsyncMySQLMonitor(tunnel=FakeTunnel(), driver="asyncpg")
+
+
+def test_queries_share_one_pool(monitor, server):
+    server.rows = [{"count": 3}]
+
+    async def scenario():
+        counts = await asyncio.gather(
+            monitor.get_recent_templates(), monitor.get_recent_templates()
+        )
+        await monitor.close()
+        return counts
+
+    assert asyncio.run(scenario()) == [3, 3]
+    assert len(server.pools) == 1
+    assert server.pools[0].closed
+    assert server.pools[0].free == 1
+    assert monitor.query_metrics.summary()["recent_templates"]["calls"] == 2
+
+
+def test_broken_connection_recreates_the_pool(monitor, server):
+    server.rows = [{"count": 1}]
+
+    async def scenario():
+        server.lost = True
+        with pytest.raises(ConnectionLost):
+            await monitor.get_recent_templates()
+        # The tunnel was replaced meanwhile.
+        server.lost = False
+        monitor.tunnel.port = 40001
+        return await monitor.get_recent_templates()
+
+    assert asyncio.run(scenario()) == 1
+    first, second = server.pools
+    assert first.closed
+    assert first.released[0].closed
+    assert second.port == 40001
+
+
+def test_exhausted_pool_times_out(monitor, server, monkeypatch):
+    monkeypatch.setitem(POOL_CONFIG, "timeout", 0.05)
+
+    async def scenario():
+        async with monitor._connection():
+            with pytest.raises(PoolTimeout):
+                async with monitor._connection():
+                    pass
+
+    asyncio.run(scenario())
+
+
+def test_ping(monitor):
+    result = asyncio.run(monitor.ping())
+    assert result["tunnel"] and result["database"]
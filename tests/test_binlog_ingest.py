@@ -0,0 +1,97 @@
+import json
+import random
+import threading
+
+import pytest
+
+from config.config import CDC_CONFIG
+from utils.binlog_ingest import BinlogIngest
+
+
+@pytest.fixture
+def ingest(tmp_path, monkeypatch):
+    monkeypatch.setitem(CDC_CONFIG, "state_path", str(tmp_path / "position.json"))
+    ingest = BinlogIngest(monitor=None)
+    ingest.applied = []
+    ingest.failing = False
+
+    def on_change(changes):
+        if ingest.failing:
+            raise ConnectionError("database gone")
+        ingest.applied.append(changes)
+
+    ingest.on_change = on_change
+    return ingest
+
+
+def receive(ingest, position, changed=(), deleted=()):
+    """What the stream thread leaves behind after a committed transaction"""
+    with ingest._lock:
+        pending = ingest._pending.setdefault(
+            "certificates", {"changed": set(), "deleted": set()}
+        )
+        pending["changed"].update(changed)
+        pending["deleted"].update(deleted)
+        ingest._pending_since = ingest._pending_since or 1.0
+        ingest._committed = position
+
+
+def saved_position(ingest):
+    with open(ingest.state_path) as f:
+        return json.load(f)
+
+
+def test_position_is_saved_after_changes_are_applied(ingest):
+    receive(ingest, ("bin.000001", 120), changed=[1, 2], deleted=[2])
+    assert ingest._dispatch()
+    assert ingest.applied == [{"certificates": {"changed": [1], "deleted": [2]}}]
+    assert saved_position(ingest) == {"log_file": "bin.000001", "log_pos": 120}
+    assert ingest.batches == 1
+
+
+def test_position_is_kept_when_applying_fails(ingest):
+    receive(ingest, ("bin.000001", 120), changed=[1])
+    ingest._dispatch()
+
+    ingest.failing = True
+    receive(ingest, ("bin.000001", 300), changed=[5])
+    assert not ingest._dispatch()
+    assert saved_position(ingest)["log_pos"] == 120
+    assert ingest.position == ("bin.000001", 120)
+
+    # The failed batch is retried together with what arrived meanwhile.
+    receive(ingest, ("bin.000001", 450), changed=[6])
+    ingest.failing = False
+    assert ingest._dispatch()
+    assert ingest.applied[-1] == {"certificates": {"changed": [5, 6], "deleted": []}}
+    assert saved_position(ingest)["log_pos"] == 450
+
+
+def test_saved_position_is_loaded_on_start(ingest):
+    receive(ingest, ("bin.000002", 4), changed=[1])
+    ingest._dispatch()
+    assert BinlogIngest(monitor=None).position == ("bin.000002", 4)
+
+
+def test_dispatch_loop_retries_a_failed_batch(ingest, monkeypatch):
+    monkeypatch.setattr(random, "uniform", lambda low, high: 0)
+    ingest.debounce = ingest.max_delay = 0
+    calls = []
+
+    def on_change(changes):
+        calls.append(changes)
+        if len(calls) == 1:
+            raise ConnectionError("database gone")
+        ingest.stop()
+
+    ingest.on_change = on_change
+    receive(ingest, ("bin.000001", 120), changed=[1])
+    ingest._wake.set()
+    thread = threading.Thread(target=ingest._dispatch_loop)
+    thread.start()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert len(calls) == 2
+    assert calls[0] == calls[1]
+    assert saved_position(ingest)["log_pos"] == 120
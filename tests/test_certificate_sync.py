@@ -0,0 +1,240 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.certificate_snapshot import CertificateSnapshot
+from utils.certificate_sync import CertificateSync
+from utils.refresh_executor import ParallelRefresh, RefreshStage
+
+BASE = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def certificate(cert_id, status="emitido", minutes=0, **fields):
+    row = {
+        "id": cert_id,
+        "student_id": cert_id * 10,
+        "course_id": 1,
+        "student_name": f"Aluno {cert_id}",
+        "course_name": "Python",
+        "status": status,
+        "created_at": BASE + timedelta(minutes=cert_id),
+        "updated_at": BASE + timedelta(minutes=cert_id + minutes),
+    }
+    row.update(fields)
+    return row
+
+
+class FakeMonitor:
+    """The certificates table, queried like MySQLMonitor does"""
+
+    def __init__(self, rows):
+        self.rows = {row["id"]: row for row in rows}
+        self.fail_after_id = None
+
+    def get_certificates_after_id(self, last_id=0, limit=5000):
+        if self.fail_after_id is not None and last_id >= self.fail_after_id:
+            raise ConnectionError("lost connection")
+        ids = sorted(cert_id for cert_id in self.rows if cert_id > last_id)
+        return [dict(self.rows[cert_id]) for cert_id in ids[:limit]]
+
+    def get_certificates_since(self, since, last_id=0, limit=5000):
+        rows = sorted(
+            (
+                row
+                for row in self.rows.values()
+                if (row["updated_at"], row["id"]) > (since, last_id)
+            ),
+            key=lambda row: (row["updated_at"], row["id"]),
+        )
+        return [dict(row) for row in rows[:limit]]
+
+    def get_certificates_fingerprint(self):
+        return {"total": len(self.rows), "max_id": max(self.rows, default=0)}
+
+
+@pytest.fixture
+def make_sync(tmp_path):
+    def make(monitor, batch_size=2):
+        sync = CertificateSync(monitor, state_path=str(tmp_path / "sync.pkl"))
+        sync.batch_size = batch_size
+        sync.overlap = timedelta(0)
+        sync.drift_check_every = 0
+        return sync
+
+    return make
+
+
+def test_snapshot_upsert_keeps_rows_sorted_by_id():
+    snapshot = CertificateSnapshot.from_rows([certificate(3), certificate(1)])
+    assert list(snapshot.ids()) == [1, 3]
+    assert snapshot.upsert(certificate(2))
+    assert list(snapshot.ids()) == [1, 2, 3]
+    assert snapshot.get(2).student_name == "Aluno 2"
+    assert snapshot.max_id() == 3
+
+
+def test_snapshot_upsert_reports_unchanged_rows():
+    snapshot = CertificateSnapshot.from_rows([certificate(1)])
+    assert not snapshot.upsert(certificate(1))
+    assert snapshot.upsert(certificate(1, status="pendente"))
+    assert snapshot.get(1).status == "pendente"
+
+
+def test_snapshot_copy_is_independent():
+    snapshot = CertificateSnapshot.from_rows([certificate(1), certificate(2)])
+    view = snapshot.ordered()
+    copy = snapshot.copy()
+    copy.remove(1)
+    copy.upsert(certificate(2, status="revogado"))
+    assert len(snapshot) == 2
+    assert snapshot.get(2).status == "emitido"
+    assert [row.id for row in view] == [2, 1]
+
+
+def test_snapshot_ordered_and_filter():
+    snapshot = CertificateSnapshot.from_rows(
+        [certificate(1), certificate(2, status="pendente"), certificate(3)]
+    )
+    view = snapshot.ordered()
+    assert [row.id for row in view] == [3, 2, 1]
+    assert [row.id for row in view.filter(status="emitido")] == [3, 1]
+    assert len(view.filter(status="desconhecido")) == 0
+    early = view.filter(created_to=BASE + timedelta(minutes=2))
+    assert [row.id for row in early] == [1]
+
+
+def test_snapshot_preserves_none_values():
+    snapshot = CertificateSnapshot.from_rows(
+        [certificate(1, student_id=None, updated_at=None)]
+    )
+    row = snapshot.get(1)
+    assert row.student_id is None
+    assert row.updated_at is None
+    assert row.to_dict()["created_at"] == BASE + timedelta(minutes=1)
+
+
+def test_first_sync_is_full_and_sets_the_mark(make_sync):
+    monitor = FakeMonitor([certificate(i) for i in range(1, 6)])
+    sync = make_sync(monitor)
+
+    result = sync.sync()
+
+    assert result["mode"] == "full"
+    assert result["total"] == 5
+    assert result["changes"] is None
+    assert sync.high_water_mark == (BASE + timedelta(minutes=5), 5)
+
+
+def test_incremental_sync_returns_change_pairs(make_sync):
+    monitor = FakeMonitor([certificate(i) for i in range(1, 4)])
+    sync = make_sync(monitor)
+    sync.sync()
+
+    monitor.rows[2] = certificate(2, status="revogado", minutes=10)
+    monitor.rows[4] = certificate(4, minutes=10)
+    result = sync.sync()
+
+    assert result["mode"] == "incremental"
+    assert sorted(result["changed"]) == [2, 4]
+    pairs = {(old and old.status, new.status) for old, new in result["changes"]}
+    assert pairs == {("emitido", "revogado"), (None, "emitido")}
+    assert sync.high_water_mark == (BASE + timedelta(minutes=14), 4)
+
+
+def test_removed_ids_are_dropped_from_the_replica(make_sync):
+    monitor = FakeMonitor([certificate(i) for i in range(1, 4)])
+    sync = make_sync(monitor)
+    sync.sync()
+
+    del monitor.rows[2]
+    result = sync.sync(removed_ids=[2], check_drift=False)
+
+    assert result["removed"] == [2]
+    assert 2 not in sync.replica
+    [(old, new)] = result["changes"]
+    assert old.id == 2 and new is None
+
+
+def test_failed_full_resync_keeps_replica_and_mark(make_sync):
+    monitor = FakeMonitor([certificate(i) for i in range(1, 4)])
+    sync = make_sync(monitor)
+    sync.sync()
+    replica, mark = sync.replica, sync.high_water_mark
+
+    monitor.rows.update({i: certificate(i, minutes=10) for i in range(4, 8)})
+    monitor.fail_after_id = 4
+    with pytest.raises(ConnectionError):
+        sync.sync(full=True)
+
+    assert sync.replica is replica
+    assert sync.high_water_mark == mark
+
+    # Nothing is skipped once the database answers again.
+    monitor.fail_after_id = None
+    result = sync.sync()
+    assert sorted(result["changed"]) == [4, 5, 6, 7]
+
+
+def test_failed_incremental_sync_keeps_the_mark(make_sync):
+    monitor = FakeMonitor([certificate(i) for i in range(1, 3)])
+    sync = make_sync(monitor)
+    sync.sync()
+    mark = sync.high_water_mark
+
+    monitor.rows.update({i: certificate(i, minutes=10) for i in range(3, 7)})
+    calls = []
+    fetch = monitor.get_certificates_since
+
+    def flaky(since, last_id=0, limit=5000):
+        calls.append(since)
+        if len(calls) > 1:
+            raise ConnectionError("lost connection")
+        return fetch(since, last_id, limit)
+
+    monitor.get_certificates_since = flaky
+    with pytest.raises(ConnectionError):
+        sync.sync()
+    assert sync.high_water_mark == mark
+    assert len(sync.replica) == 2
+
+    monitor.get_certificates_since = fetch
+    assert sorted(sync.sync()["changed"]) == [3, 4, 5, 6]
+
+
+def test_state_survives_a_restart(make_sync, tmp_path):
+    monitor = FakeMonitor([certificate(i) for i in range(1, 4)])
+    make_sync(monitor).sync()
+
+    restarted = make_sync(monitor)
+    assert len(restarted.replica) == 3
+    assert restarted.high_water_mark == (BASE + timedelta(minutes=3), 3)
+    assert restarted.sync()["mode"] == "incremental"
+
+
+def test_timed_out_refresh_stage_keeps_replica_and_mark(make_sync):
+    monitor = FakeMonitor([certificate(i) for i in range(1, 3)])
+    sync = make_sync(monitor)
+    sync.sync()
+    replica, mark = sync.replica, sync.high_water_mark
+
+    monitor.rows[3] = certificate(3, minutes=10)
+    refresh = ParallelRefresh(max_workers=1)
+    release = threading.Event()
+
+    def stage():
+        release.wait(5)
+        return sync.sync()
+
+    try:
+        stages = [RefreshStage("certificates", stage, timeout=0.05)]
+        _, errors, _ = refresh.run(stages)
+        assert "certificates" in errors
+        release.set()
+        refresh.executor.shutdown(wait=True)
+    finally:
+        refresh.shutdown()
+
+    assert sync.replica is replica
+    assert sync.high_water_mark == mark
+    assert sync.sync()["changed"] == [3]
@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+from utils.connection_pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.open = True
+
+    def close(self):
+        self.open = False
+
+
+class Connector:
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self):
+        conn = FakeConnection(len(self.opened))
+        self.opened.append(conn)
+        return conn
+
+
+def test_connections_are_reused():
+    connect = Connector()
+    pool = ConnectionPool(connect, size=2, timeout=1)
+
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert len(connect.opened) == 1
+
+
+def test_exhausted_pool_times_out():
+    pool = ConnectionPool(Connector(), size=1, timeout=0.05)
+    pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+
+def test_waiter_gets_the_released_connection():
+    pool = ConnectionPool(Connector(), size=1, timeout=5)
+    conn = pool.acquire()
+    borrowed = []
+    waiter = threading.Thread(target=lambda: borrowed.append(pool.acquire()))
+    waiter.start()
+    pool.release(conn)
+    waiter.join(5)
+    assert borrowed == [conn]
+
+
+def test_broken_and_discarded_connections_are_closed():
+    connect = Connector()
+    pool = ConnectionPool(connect, size=2, timeout=1)
+    first, second = pool.acquire(), pool.acquire()
+    second.open = False
+
+    pool.release(first, discard=True)
+    pool.release(second)
+
+    assert not first.open
+    assert pool.stats() == {"size": 2, "idle": 0, "in_use": 0}
+
+
+def test_close_all_retires_connections_in_use():
+    connect = Connector()
+    pool = ConnectionPool(connect, size=2, timeout=1)
+    idle, busy = pool.acquire(), pool.acquire()
+    pool.release(idle)
+
+    pool.close_all()
+    assert not idle.open
+    pool.release(busy)
+    assert not busy.open
+    assert pool.acquire() not in (idle, busy)
+
+
+def test_failed_connect_frees_its_slot():
+    def connect():
+        raise ConnectionError("refused")
+
+    pool = ConnectionPool(connect, size=1, timeout=0.05)
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    assert pool.stats()["in_use"] == 0
+
+
+def test_acquire_timeout_can_be_overridden():
+    pool = ConnectionPool(Connector(), size=1, timeout=30)
+    pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire(timeout=0)
@@ -0,0 +1,139 @@
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.certificate_sync import CertificateSync
+from utils.counters import CounterEngine
+
+# 01:00 UTC, the previous local day at UTC-3.
+BASE = datetime(2024, 6, 10, 1, 0, 0)
+
+
+def certificate(cert_id, status="emitido", hours=0):
+    created_at = BASE + timedelta(hours=hours)
+    return {
+        "id": cert_id,
+        "student_id": cert_id,
+        "course_id": 1,
+        "student_name": f"Aluno {cert_id}",
+        "course_name": "Python",
+        "status": status,
+        "created_at": created_at,
+        "updated_at": BASE + timedelta(days=1, minutes=cert_id),
+    }
+
+
+class FakeMonitor:
+    """Certificates and the tables CounterEngine counts by id"""
+
+    def __init__(self, certificates):
+        self.certificates = {row["id"]: row for row in certificates}
+        self.tables = {"students": [1, 2, 3], "team_members": [1]}
+
+    def get_certificates_after_id(self, last_id=0, limit=5000):
+        ids = sorted(cert_id for cert_id in self.certificates if cert_id > last_id)
+        return [dict(self.certificates[cert_id]) for cert_id in ids[:limit]]
+
+    def get_certificates_since(self, since, last_id=0, limit=5000):
+        rows = sorted(
+            (
+                row
+                for row in self.certificates.values()
+                if (row["updated_at"], row["id"]) > (since, last_id)
+            ),
+            key=lambda row: (row["updated_at"], row["id"]),
+        )
+        return [dict(row) for row in rows[:limit]]
+
+    def get_table_total(self, name):
+        ids = self.tables[name]
+        return {"total": len(ids), "max_id": max(ids, default=0)}
+
+    def get_table_growth(self, name, last_id):
+        new = [i for i in self.tables[name] if i > last_id]
+        return {"total": len(new), "max_id": max(new, default=None)}
+
+    def get_recent_templates(self, hours=24):
+        return 2
+
+
+@pytest.fixture
+def engine(tmp_path):
+    monitor = FakeMonitor([certificate(1), certificate(2, hours=5), certificate(3)])
+    sync = CertificateSync(monitor, state_path=str(tmp_path / "sync.pkl"))
+    sync.overlap = timedelta(0)
+    sync.drift_check_every = 0
+    sync.sync()
+    engine = CounterEngine(monitor, sync)
+    engine.reconcile_every = 0
+    return engine
+
+
+def counters(engine):
+    return (
+        engine.total_certificates,
+        +engine.by_status_day,
+        +engine.by_local_day,
+    )
+
+
+def test_initial_counts_come_from_the_replica(engine):
+    assert engine.total_certificates == 3
+    assert engine.by_status_day == Counter({("emitido", BASE.date()): 3})
+    local_day = (BASE - timedelta(hours=3)).date()
+    assert engine.by_local_day == Counter({local_day: 2, BASE.date(): 1})
+
+
+def test_deltas_match_a_full_recount(engine):
+    rows = engine.monitor.certificates
+    later = BASE + timedelta(days=2)
+    rows[2] = dict(certificate(2, status="revogado", hours=30), updated_at=later)
+    rows[4] = dict(certificate(4, hours=-48), updated_at=later)
+    del rows[3]
+
+    result = engine.sync_certificates(removed_ids=[3])
+    assert result["mode"] == "incremental"
+    incremental = counters(engine)
+
+    engine.rebuild_certificates()
+    assert incremental == counters(engine)
+    assert engine.total_certificates == 3
+    assert engine.by_status_day[("revogado", (BASE + timedelta(hours=30)).date())] == 1
+
+
+def test_full_sync_rebuilds(engine):
+    engine.monitor.certificates[5] = certificate(5)
+    engine.sync_certificates(full=True)
+    assert engine.total_certificates == 4
+
+
+def test_tables_grow_by_new_ids_until_reconciled(engine):
+    engine.reconcile_every = 3
+    assert engine.refresh_tables()["reconciled"]
+
+    engine.monitor.tables["students"] += [4, 5]
+    result = engine.refresh_tables()
+    assert not result["reconciled"]
+    assert result["students"] == 5
+
+    # Deletions only show up when the tables are recounted.
+    engine.monitor.tables["students"] = [4, 5]
+    assert engine.refresh_tables() == {
+        "reconciled": True,
+        "students": 2,
+        "team_members": 1,
+    }
+    assert engine.total_counts(0)["total_students"] == 2
+
+
+def test_concurrent_refreshes_count_every_cycle(engine):
+    engine.reconcile_every = 5
+    engine.refresh_tables()
+    threads = [threading.Thread(target=engine.refresh_tables) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert engine.cycles == 21
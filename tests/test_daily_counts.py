@@ -0,0 +1,21 @@
+from datetime import date, datetime, time, timedelta, timezone
+
+from utils.mysql_monitor import LOCAL_UTC_OFFSET, daily_counts, day_range
+
+
+def test_day_range_covers_whole_local_days():
+    first_day, start, end = day_range(7, LOCAL_UTC_OFFSET)
+    assert end - start == timedelta(days=7)
+    # Local midnight, expressed in UTC.
+    assert (start + LOCAL_UTC_OFFSET).time() == time(0)
+    assert (start + LOCAL_UTC_OFFSET).date() == first_day
+    assert start <= datetime.now(timezone.utc).replace(tzinfo=None) < end
+
+
+def test_days_without_certificates_count_zero():
+    rows = daily_counts(date(2025, 2, 27), 3, {date(2025, 3, 1): 4})
+    assert rows == [
+        {"date": "27/02", "date_full": "2025-02-27", "count": 0},
+        {"date": "28/02", "date_full": "2025-02-28", "count": 0},
+        {"date": "01/03", "date_full": "2025-03-01", "count": 4},
+    ]
@@ -0,0 +1,66 @@
+import time
+
+from utils.detail_cache import DetailCache
+
+
+def test_get_or_load_caches_the_result():
+    cache = DetailCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {"id": 7}
+
+    assert cache.get_or_load(7, loader) == {"id": 7}
+    assert cache.get_or_load(7, loader) == {"id": 7}
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_errors_are_not_cached():
+    cache = DetailCache()
+    cache.get_or_load(1, lambda: {"error": "Not found"})
+    assert cache.get(1) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = DetailCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = DetailCache(ttl=10)
+    cache.set("a", 1)
+    now[0] += 5
+    assert cache.get("a") == 1
+    now[0] += 6
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_invalidation_by_key_and_by_value():
+    cache = DetailCache()
+    cache.set(1, {"student_id": 10})
+    cache.set(2, {"student_id": 20})
+    cache.set(3, {"student_id": 20})
+
+    cache.invalidate([1, 99])
+    assert cache.get(1) is None
+    assert cache.invalidate_where(lambda value: value["student_id"] == 20) == 2
+    assert cache.stats()["size"] == 0
+
+
+def test_clear_drops_everything():
+    cache = DetailCache()
+    cache.set(1, {"id": 1})
+    cache.clear()
+    assert cache.get(1) is None
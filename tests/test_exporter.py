@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from utils.exporter import iter_csv, iter_export, iter_ndjson
+
+FIELDS = ["id", "student_name", "updated_at"]
+
+
+def make_rows(count):
+    return (
+        {
+            "id": number,
+            "student_name": f"Aluno {number}",
+            "updated_at": datetime(2024, 1, 1, 12, 0, number % 60),
+            "ignored": "not exported",
+        }
+        for number in range(count)
+    )
+
+
+def test_csv_has_header_and_iso_dates():
+    text = "".join(iter_csv(make_rows(2), FIELDS))
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0] == FIELDS
+    assert rows[1] == ["0", "Aluno 0", "2024-01-01T12:00:00"]
+    assert len(rows) == 3
+
+
+def test_csv_is_flushed_in_chunks():
+    chunks = list(iter_csv(make_rows(5), FIELDS, flush_every=2))
+    assert len(chunks) == 3
+    lines = "".join(chunks).splitlines()
+    assert len(lines) == 6
+
+
+def test_ndjson_writes_one_object_per_line():
+    chunks = list(iter_ndjson(make_rows(3), FIELDS, flush_every=2))
+    assert len(chunks) == 2
+    objects = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert [obj["id"] for obj in objects] == [0, 1, 2]
+    assert set(objects[0]) == set(FIELDS)
+    assert objects[2]["updated_at"] == "2024-01-01T12:00:02"
+
+
+def test_ndjson_keeps_accents():
+    rows = [{"id": 1, "student_name": "João", "updated_at": None}]
+    assert "João" in "".join(iter_ndjson(rows, FIELDS))
+
+
+def test_csv_consumes_rows_lazily():
+    consumed = []
+
+    def rows():
+        for row in make_rows(10):
+            consumed.append(row["id"])
+            yield row
+
+    stream = iter_csv(rows(), FIELDS, flush_every=2)
+    assert consumed == []
+    next(stream)
+    assert consumed == [0, 1]
+
+
+def test_empty_ndjson_export_yields_nothing():
+    assert list(iter_export([], FIELDS, "ndjson")) == []
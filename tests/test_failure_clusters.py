@@ -0,0 +1,89 @@
+from datetime import datetime
+
+from utils.failure_clusters import (
+    NO_ERROR,
+    attempts_bucket,
+    cluster_failures,
+    error_signature,
+    task_cluster,
+)
+
+
+def task(task_id, error=None, course="Python", template_id=7, attempts=1, day=1):
+    return {
+        "id": task_id,
+        "course_name": course,
+        "template_id": template_id,
+        "attempts": attempts,
+        "error": error,
+        "updated_at": datetime(2025, 2, day, 10),
+    }
+
+
+def test_signature_replaces_variable_parts():
+    first = error_signature("Timeout after 30s rendering '/tmp/a1/cert-12.pdf'")
+    second = error_signature("Timeout after 45s rendering '/tmp/b9/cert-99.pdf'")
+    assert first == second == "Timeout after Ns rendering '?'"
+    assert error_signature(
+        "File /var/www/storage/x.pdf missing for 0f1e2d3c-4b5a-6978-8a9b-0c1d2e3f4a5b"
+    ) == "File <path> missing for <uuid>"
+
+
+def test_signature_keeps_the_first_line_only():
+    assert error_signature("Boom\n#0 /app/Job.php(12)") == "Boom"
+    assert error_signature(None) == NO_ERROR
+    assert error_signature("") == NO_ERROR
+
+
+def test_attempts_buckets():
+    buckets = [attempts_bucket(n) for n in (None, 1, 2, 3, 4, 9, 10, 250)]
+    assert buckets == ["1", "1", "2-3", "2-3", "4-9", "4-9", "10+", "10+"]
+
+
+def test_tasks_with_the_same_cause_share_a_cluster():
+    same = task(1, "Timeout after 30s"), task(2, "Timeout after 90s")
+    assert task_cluster(same[0])[0] == task_cluster(same[1])[0]
+
+    others = [
+        task(3, "Timeout after 30s", course="Java"),
+        task(4, "Timeout after 30s", template_id=8),
+        task(5, "Timeout after 30s", attempts=5),
+        task(6, "Disk full"),
+    ]
+    ids = {task_cluster(other)[0] for other in others}
+    assert len(ids) == 4
+    assert task_cluster(same[0])[0] not in ids
+
+
+def test_log_events_stand_in_for_a_missing_error():
+    events = {
+        1: [
+            {"level": "INFO", "message": "Processing"},
+            {"level": "ERROR", "message": "SMTP refused 550"},
+        ]
+    }
+    _, fields = task_cluster(task(1), lambda task_id: events.get(task_id, []))
+    assert fields["signature"] == "SMTP refused N"
+    assert task_cluster(task(2))[1]["signature"] == NO_ERROR
+
+
+def test_clusters_are_sorted_by_size_with_their_tasks_and_period():
+    tasks = [
+        task(10, "Disk full", day=3),
+        task(11, "Timeout after 1s", day=5),
+        task(12, "Timeout after 2s", day=2),
+        task(13, "Timeout after 3s", day=4),
+    ]
+    clusters = cluster_failures(tasks)
+
+    assert [cluster["count"] for cluster in clusters] == [3, 1]
+    largest = clusters[0]
+    assert largest["task_ids"] == [11, 12, 13]
+    assert largest["example"] == "Timeout after 1s"
+    assert largest["first_at"] == datetime(2025, 2, 2, 10)
+    assert largest["last_at"] == datetime(2025, 2, 5, 10)
+    assert sum(cluster["count"] for cluster in clusters) == len(tasks)
+
+
+def test_no_failures_no_clusters():
+    assert cluster_failures([]) == []
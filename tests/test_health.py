@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+from utils.connection_pool import ConnectionPool
+from utils.health import HealthMonitor
+from utils.mysql_monitor import MySQLMonitor
+
+
+class FakeMonitor:
+    def __init__(self):
+        self.error = None
+
+    def check_data_integrity(self):
+        if self.error:
+            raise self.error
+        return {"orphan_certificates": 0}
+
+
+@pytest.fixture
+def health():
+    health = HealthMonitor(FakeMonitor())
+    health.force_interval = 60
+    return health
+
+
+def test_forced_refresh_caches_results(health):
+    assert health.force_refresh() == (True, 0, None)
+    status = health.status()
+    assert status["status"] == "healthy"
+    assert status["error"] is None
+
+
+def test_forced_refresh_is_rate_limited(health):
+    health.force_refresh()
+    refreshed, retry_after, error = health.force_refresh()
+    assert not refreshed
+    assert 0 < retry_after <= 61
+    assert error is None
+
+
+def test_failed_forced_refresh_is_reported(health):
+    health.monitor.error = ConnectionError("tunnel down")
+    refreshed, _, error = health.force_refresh()
+    assert not refreshed
+    assert error == "ConnectionError: tunnel down"
+    assert health.status()["status"] == "unknown"
+    assert health.status()["error"] == error
+
+
+class FakeTunnel:
+    def is_active(self):
+        return True
+
+
+class FakeConnection:
+    open = True
+
+    def ping(self, reconnect=True):
+        pass
+
+    def close(self):
+        self.open = False
+
+
+def make_pinger(size):
+    monitor = MySQLMonitor.__new__(MySQLMonitor)
+    monitor.tunnel = FakeTunnel()
+    monitor.pool = ConnectionPool(FakeConnection, size=size, timeout=30)
+    return monitor
+
+
+def test_ping_uses_a_free_connection():
+    monitor = make_pinger(size=1)
+    result = monitor.ping()
+    assert result["database"] is True
+    assert "latency_ms" in result
+    assert monitor.pool.stats()["in_use"] == 0
+
+
+def test_ping_does_not_wait_for_a_busy_pool():
+    monitor = make_pinger(size=1)
+    monitor.pool.acquire()
+
+    started = time.monotonic()
+    result = monitor.ping()
+    assert time.monotonic() - started < 1
+    assert result == {"tunnel": True, "database": True, "pool_busy": True}
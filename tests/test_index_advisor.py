@@ -0,0 +1,91 @@
+from contextlib import contextmanager
+
+from config.queries import RECOMMENDED_INDEXES
+from utils.index_advisor import IndexAdvisor, _explainable_queries, _sample_params
+
+
+class FakeCursor:
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self.result = []
+
+    def execute(self, query, args=None, name=None):
+        if query.startswith("EXPLAIN"):
+            self.result = self.monitor.plan(query)
+        else:
+            self.result = self.monitor.index_rows
+
+    def fetchall(self):
+        return self.result
+
+
+class FakeMonitor:
+    def __init__(self, index_rows=(), plan=None):
+        self.index_rows = list(index_rows)
+        self.plan = plan or (lambda query: [])
+
+    @contextmanager
+    def _cursor(self):
+        yield FakeCursor(self)
+
+
+def index_rows(indexes):
+    return [
+        {"table_name": index["table"], "index_name": f"idx{n}", "column_name": column}
+        for n, index in enumerate(indexes)
+        for column in index["columns"]
+    ]
+
+
+def test_sample_params_match_placeholders():
+    assert _sample_params("SELECT 1") is None
+    assert _sample_params("WHERE id > %s LIMIT %s") == (0, 0)
+    params = _sample_params("WHERE id > %(last_id)s AND created_at >= %(start)s")
+    assert params["last_id"] == 0
+    assert params["start"] is not None
+
+
+def test_metadata_queries_are_not_explained():
+    names = {name for name, _ in _explainable_queries()}
+    assert "certificates_by_day" in names
+    assert "table_sizes" not in names
+    assert not any("{filters}" in sql for _, sql in _explainable_queries())
+
+
+def test_no_warnings_when_every_index_exists():
+    advisor = IndexAdvisor(FakeMonitor(index_rows(RECOMMENDED_INDEXES)))
+    assert advisor.run() == []
+    assert advisor.status()["index_checked_at"] is not None
+
+
+def test_missing_index_is_reported():
+    missing = RECOMMENDED_INDEXES[0]
+    advisor = IndexAdvisor(FakeMonitor(index_rows(RECOMMENDED_INDEXES[1:])))
+    warnings = advisor.check_indexes()
+    assert [w["table"] for w in warnings] == [missing["table"]]
+    assert ", ".join(missing["columns"]) in warnings[0]["message"]
+
+
+def test_index_must_lead_with_the_columns():
+    wanted = next(index for index in RECOMMENDED_INDEXES if len(index["columns"]) > 1)
+    reversed_index = dict(wanted, columns=tuple(reversed(wanted["columns"])))
+    others = [index for index in RECOMMENDED_INDEXES if index is not wanted]
+    advisor = IndexAdvisor(FakeMonitor(index_rows(others + [reversed_index])))
+    assert [w["table"] for w in advisor.check_indexes()] == [wanted["table"]]
+
+
+def test_full_scans_of_large_tables_are_reported():
+    def plan(query):
+        if "GROUP BY" in query:
+            return [{"table": "wp_certificates", "type": "ALL", "rows": 10**6}]
+        return [
+            {"table": "<derived2>", "type": "ALL", "rows": 10**6},
+            {"table": "wp_small", "type": "ALL", "rows": 1},
+        ]
+
+    advisor = IndexAdvisor(FakeMonitor(plan=plan))
+    advisor.min_rows = 1000
+    warnings = advisor.explain_queries()
+    assert warnings
+    assert all("full scan of wp_certificates" in w["message"] for w in warnings)
+    assert "certificates" not in {w["query"] for w in warnings}
@@ -0,0 +1,95 @@
+import pytest
+
+from config.queries import MONITORING_QUERIES
+from utils.instrumentation import (
+    Histogram,
+    InstrumentedCursor,
+    PrometheusWriter,
+    QueryMetrics,
+)
+
+
+class FakeCursor:
+    def __init__(self, rows, error=None):
+        self.rows = list(rows)
+        self.error = error
+        self.connection = None
+        self.closed = False
+
+    def execute(self, query, args=None):
+        if self.error:
+            raise self.error
+        return len(self.rows)
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 5):
+        histogram.observe(value)
+    assert histogram.cumulative() == [(0.1, 1), (1, 3), (float("inf"), 4)]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(6.25)
+
+
+def test_cursor_records_named_queries():
+    metrics = QueryMetrics()
+    query = next(q for q in MONITORING_QUERIES.values() if isinstance(q, str))
+    name = next(k for k, q in MONITORING_QUERIES.items() if q is query)
+
+    with InstrumentedCursor(FakeCursor([{"id": 1}, {"id": 2}]), metrics) as cursor:
+        cursor.execute(query)
+        cursor.fetchall()
+        cursor.execute("SELECT 1", name="custom")
+        assert list(cursor) == []
+
+    summary = metrics.summary()
+    assert summary[name]["calls"] == 1
+    assert summary[name]["rows"] == 2
+    assert summary["custom"]["calls"] == 1
+    assert summary["custom"]["rows"] == 0
+    assert summary["custom"]["errors"] == 0
+
+
+def test_cursor_counts_errors_by_type():
+    metrics = QueryMetrics()
+    cursor = InstrumentedCursor(FakeCursor([], error=TimeoutError("slow")), metrics)
+    with pytest.raises(TimeoutError):
+        cursor.execute("SELECT 1")
+
+    _, errors = metrics.snapshot()
+    assert errors == {("other", "TimeoutError"): 1}
+    assert metrics.summary()["other"]["errors"] == 1
+
+
+def test_prometheus_exposition():
+    metrics = QueryMetrics()
+    metrics.observe("failed_tasks", 0.2, rows=3, bytes_received=512)
+
+    writer = PrometheusWriter(prefix="test_")
+    writer.metric("up", "gauge", "Whether it is up.", [({}, True), ({}, None)])
+    writer.query_metrics(metrics)
+    text = writer.render()
+
+    assert "# TYPE test_up gauge\ntest_up 1\n" in text
+    bucket = 'test_query_duration_seconds_bucket{query="failed_tasks",le='
+    assert bucket + '"0.1"} 0' in text
+    assert bucket + '"+Inf"} 1' in text
+    assert 'test_query_duration_seconds_sum{query="failed_tasks"} 0.2' in text
+    assert 'test_query_rows_total{query="failed_tasks"} 3' in text
+    assert 'test_query_bytes_total{query="failed_tasks"} 512' in text
+
+
+def test_label_values_are_escaped():
+    writer = PrometheusWriter(prefix="")
+    writer.metric("errors", "counter", "Errors.", [({"error": 'bad "x"\n'}, 2)])
+    assert 'errors{error="bad \\"x\\"\\n"} 2' in writer.render()
@@ -0,0 +1,77 @@
+from utils.live_updates import Broadcaster, dashboard_diff, format_event
+
+
+def data(counts=None, days=(), tasks=(), loaded=1, **extra):
+    return {
+        "total_counts": counts or {},
+        "certificates_by_day": [
+            {"date_full": day, "count": count} for day, count in days
+        ],
+        "failed_tasks": [{"id": task_id, "student_name": "A"} for task_id in tasks],
+        "section_generations": {"failed_tasks": loaded},
+        "last_update": "10:00",
+        "status": "online",
+        **extra,
+    }
+
+
+def test_diff_carries_only_what_changed():
+    old = data({"certificates": 10, "failed": 2}, [("2025-03-01", 4)])
+    new = data(
+        {"certificates": 11, "failed": 2},
+        [("2025-03-01", 4), ("2025-03-02", 1)],
+    )
+    diff = dashboard_diff(old, new)
+    assert diff["total_counts"] == {"certificates": 11}
+    assert diff["certificates_by_day"] == [{"date_full": "2025-03-02", "count": 1}]
+    assert "integrity_checks" not in diff
+    assert "table_stats" not in diff
+    assert "failed_tasks" not in diff
+
+
+def test_diff_lists_new_and_resolved_failures():
+    diff = dashboard_diff(data(tasks=[1, 2]), data(tasks=[2, 3]))
+    added = diff["failed_tasks"]["added"]
+    assert [task["id"] for task in added] == [3]
+    assert set(added[0]) == {"id", "student_name", "course_name", "updated_at"}
+    assert diff["failed_tasks"]["resolved"] == [1]
+
+
+def test_first_load_of_failures_is_not_a_diff():
+    diff = dashboard_diff(data(loaded=None), data(tasks=[1, 2]))
+    assert "failed_tasks" not in diff
+
+
+def test_event_format():
+    assert format_event("update", '{"a":1}', event_id="ab12-3") == (
+        'id: ab12-3\nevent: update\ndata: {"a":1}\n\n'
+    )
+    assert format_event("ping", "{}") == "event: ping\ndata: {}\n\n"
+
+
+def test_broadcaster_limits_clients():
+    broadcaster = Broadcaster(max_clients=1)
+    subscriber = broadcaster.subscribe()
+    assert broadcaster.subscribe() is None
+    broadcaster.unsubscribe(subscriber)
+    assert broadcaster.subscribe() is not None
+
+
+def test_published_events_reach_every_subscriber():
+    broadcaster = Broadcaster()
+    first, second = broadcaster.subscribe(), broadcaster.subscribe()
+    broadcaster.publish("update", "{}", event_id=1)
+    assert first.get_nowait() == second.get_nowait() == format_event("update", "{}", 1)
+    assert broadcaster.published == 1
+
+
+def test_slow_subscriber_is_dropped_and_told_to_close():
+    broadcaster = Broadcaster(queue_size=2)
+    slow = broadcaster.subscribe()
+    for number in range(3):
+        broadcaster.publish("update", str(number))
+
+    assert broadcaster.dropped == 1
+    assert broadcaster.clients() == 0
+    assert slow.get_nowait() is None
+    assert slow.empty()
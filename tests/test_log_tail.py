@@ -0,0 +1,154 @@
+import os
+import re
+
+import pytest
+
+from config.config import LOG_TAIL_CONFIG
+from utils.log_tail import LogTailer, parse_entry
+
+
+class LocalSFTP:
+    """The part of paramiko's SFTPClient LogTailer uses, on local files"""
+
+    def stat(self, path):
+        return os.stat(path)
+
+    def open(self, path, mode):
+        return open(path, mode)
+
+
+@pytest.fixture
+def log(tmp_path):
+    return tmp_path / "worker.log"
+
+
+@pytest.fixture
+def make_tailer(tmp_path, log, monkeypatch):
+    def make(**config):
+        monkeypatch.setitem(LOG_TAIL_CONFIG, "paths", [str(log)])
+        state_path = str(tmp_path / "offsets.json")
+        monkeypatch.setitem(LOG_TAIL_CONFIG, "state_path", state_path)
+        for name, value in config.items():
+            monkeypatch.setitem(LOG_TAIL_CONFIG, name, value)
+        tailer = LogTailer()
+        tailer._sftp_client = LocalSFTP
+        return tailer
+
+    return make
+
+
+def write(path, text, mode="a"):
+    with open(path, mode) as f:
+        f.write(text)
+
+
+def messages(tailer):
+    return [event["message"] for event in tailer.export()]
+
+
+def test_parse_monolog_and_worker_lines():
+    pattern = re.compile(LOG_TAIL_CONFIG["task_id_pattern"], re.IGNORECASE)
+    event = parse_entry(
+        "[2025-01-31 12:00:00] production.ERROR: Render failed task_id=42", pattern
+    )
+    assert event["level"] == "ERROR"
+    assert event["channel"] == "production"
+    assert event["task_ids"] == [42]
+
+    worker = parse_entry("2025-01-31 12:00:01 App\\Jobs\\Send ..... FAIL", pattern)
+    assert worker["level"] == "ERROR"
+    assert parse_entry("#0 /app/Job.php(10): render()", pattern) is None
+
+
+def test_only_new_lines_are_read(make_tailer, log):
+    write(log, "[2025-01-31 12:00:00] app.INFO: first\n")
+    tailer = make_tailer()
+    assert tailer.poll() == 1
+
+    write(log, "[2025-01-31 12:00:01] app.INFO: second\n")
+    assert tailer.poll() == 1
+    assert tailer.poll() == 0
+    assert messages(tailer) == ["first", "second"]
+
+
+def test_partial_lines_wait_for_their_newline(make_tailer, log):
+    write(log, "")
+    tailer = make_tailer()
+    tailer.poll()
+
+    write(log, "[2025-01-31 12:00:00] app.ERROR: half")
+    assert tailer.poll() == 0
+    write(log, " done task_id=7\n")
+    assert tailer.poll() == 1
+    assert messages(tailer) == ["half done task_id=7"]
+    assert tailer.counts([7]) == {7: 1}
+
+
+def test_stack_traces_extend_the_previous_event(make_tailer, log):
+    write(log, "")
+    tailer = make_tailer()
+    tailer.poll()
+
+    write(log, "[2025-01-31 12:00:00] app.ERROR: boom\n#0 Job.php task_id=9\n")
+    tailer.poll()
+    [event] = tailer.events_for(9)
+    assert event["message"] == "boom"
+    assert event["context"] == ["#0 Job.php task_id=9"]
+
+
+def test_first_poll_starts_near_the_end(make_tailer, log):
+    lines = [f"[2025-01-31 12:00:{i:02}] app.INFO: line {i}\n" for i in range(50)]
+    write(log, "".join(lines))
+    tailer = make_tailer(initial_bytes=100)
+    tailer.poll()
+    # The partial line at the offset is skipped.
+    assert messages(tailer) == ["line 48", "line 49"]
+
+
+def test_rotation_by_rename_drains_the_old_file(make_tailer, log):
+    write(log, "[2025-01-31 12:00:00] app.INFO: old 1\n")
+    tailer = make_tailer()
+    tailer.poll()
+
+    write(log, "[2025-01-31 12:00:01] app.INFO: old 2\n")
+    os.rename(log, f"{log}.1")
+    write(log, "[2025-01-31 13:00:00] app.INFO: new 1\n", mode="w")
+
+    assert tailer.poll() == 2
+    assert messages(tailer) == ["old 1", "old 2", "new 1"]
+    assert tailer.rotations == 1
+
+
+def test_truncation_starts_over(make_tailer, log):
+    write(log, "[2025-01-31 12:00:00] app.INFO: before truncation\n")
+    tailer = make_tailer()
+    tailer.poll()
+
+    write(log, "[2025-01-31 12:00:00] app.INFO: x\n", mode="w")
+    tailer.poll()
+    assert tailer.rotations == 1
+    assert messages(tailer)[-1] == "x"
+
+
+def test_offsets_survive_a_restart(make_tailer, log):
+    write(log, "[2025-01-31 12:00:00] app.INFO: seen\n")
+    make_tailer().poll()
+
+    write(log, "[2025-01-31 12:00:01] app.INFO: unseen\n")
+    restarted = make_tailer()
+    assert restarted.poll() == 1
+    assert messages(restarted) == ["unseen"]
+
+
+def test_old_events_are_unlinked_from_tasks(make_tailer, log):
+    write(log, "")
+    tailer = make_tailer(max_events=2)
+    tailer.poll()
+    write(
+        log,
+        "".join(
+            f"[2025-01-31 12:00:0{i}] app.ERROR: task_id={i}\n" for i in range(3)
+        ),
+    )
+    tailer.poll()
+    assert tailer.counts([0, 1, 2]) == {0: 0, 1: 1, 2: 1}
@@ -0,0 +1,91 @@
+import pytest
+
+from utils.metrics_store import DAY, HOUR, MetricsStore, snapshot_metrics
+
+# Midnight UTC, so hour and day buckets start at T0.
+T0 = 1_700_000_000 - 1_700_000_000 % DAY
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MetricsStore(str(tmp_path / "metrics.db"))
+    store.raw_retention = DAY
+    store.hourly_retention = 3 * DAY
+    store.daily_retention = 30 * DAY
+    # Compaction is only run explicitly.
+    store._last_compaction = float("inf")
+    return store
+
+
+def test_raw_samples_are_returned_as_is(store):
+    store.record({"queue": 3, "name": "ignored"}, ts=T0)
+    store.record({"queue": 5}, ts=T0 + 60)
+    assert store.series("queue", days=1, now=T0 + 120) == [
+        {"ts": T0, "value": 3.0, "min": 3.0, "max": 3.0},
+        {"ts": T0 + 60, "value": 5.0, "min": 5.0, "max": 5.0},
+    ]
+    assert store.metrics() == ["queue"]
+
+
+def test_old_samples_roll_up_into_hours(store):
+    for minute, value in enumerate([2, 8, 5]):
+        store.record({"queue": value}, ts=T0 + minute * 60)
+    store.record({"queue": 1}, ts=T0 + HOUR)
+
+    store.compact(now=T0 + DAY + 2 * HOUR)
+
+    assert store.series("queue", days=2, now=T0 + DAY + 2 * HOUR) == [
+        {"ts": T0, "value": 5.0, "min": 2.0, "max": 8.0},
+        {"ts": T0 + HOUR, "value": 1.0, "min": 1.0, "max": 1.0},
+    ]
+
+
+def test_compaction_never_counts_a_sample_twice(store):
+    store.record({"queue": 4}, ts=T0)
+    store.compact(now=T0 + DAY + HOUR)
+    store.record({"queue": 10}, ts=T0 + 30 * 60)
+    store.compact(now=T0 + DAY + HOUR)
+    store.compact(now=T0 + DAY + HOUR)
+
+    [bucket] = store.series("queue", days=2, now=T0 + DAY + HOUR)
+    assert bucket == {"ts": T0, "value": 7.0, "min": 4.0, "max": 10.0}
+
+
+def test_old_hours_roll_up_into_days(store):
+    store.record({"queue": 2}, ts=T0)
+    store.record({"queue": 6}, ts=T0 + 5 * HOUR)
+    store.record({"queue": 9}, ts=T0 + DAY)
+
+    store.compact(now=T0 + 4 * DAY + HOUR)
+
+    assert store.series("queue", days=5, now=T0 + 4 * DAY + HOUR) == [
+        {"ts": T0, "value": 4.0, "min": 2.0, "max": 6.0},
+        {"ts": T0 + DAY, "value": 9.0, "min": 9.0, "max": 9.0},
+    ]
+
+
+def test_daily_values_are_upserted(store):
+    store.record_daily("certificates", {"2024-01-01": 3, "2024-01-02": 4})
+    store.record_daily("certificates", {"2024-01-02": 6})
+    assert store.daily_series("certificates", days=2, today="2024-01-02") == [
+        {"date": "2024-01-01", "value": 3.0},
+        {"date": "2024-01-02", "value": 6.0},
+    ]
+
+
+def test_snapshot_metrics_flattens_numeric_sections():
+    data = {
+        "total_counts": {"certificates": 10, "students": None},
+        "failed_tasks": [{}, {}],
+        "table_stats": [
+            {"Tabela": "certificates", "Registros": 10, "Tamanho (MB)": 1.5}
+        ],
+    }
+    assert snapshot_metrics(data) == {
+        "total_counts.certificates": 10,
+        "failed_tasks.count": 2,
+        "table_rows.certificates": 10,
+        "table_size_mb.certificates": 1.5,
+    }
+    only_failed = snapshot_metrics(data, sections={"failed_tasks"})
+    assert only_failed == {"failed_tasks.count": 2}
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+from utils.pagination import decode_cursor, encode_cursor, keyset_page
+
+BASE = datetime(2024, 3, 1, 8, 30, 15)
+
+
+def rows(ids):
+    return [{"id": i, "created_at": BASE + timedelta(hours=i)} for i in ids]
+
+
+def test_cursor_round_trip():
+    token = encode_cursor(BASE, 42)
+    assert "=" not in token
+    assert decode_cursor(token) == (BASE, 42)
+
+
+def test_cursor_without_timestamp():
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+
+
+def test_invalid_cursors_decode_to_none():
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+    assert decode_cursor("not-a-cursor") is None
+    assert decode_cursor(encode_cursor(BASE, 1)[:-3] + "***") is None
+
+
+def test_first_page_has_next_only():
+    page = keyset_page(rows([5, 4, 3]), 2, "created_at", "next", has_cursor=False)
+    assert [row["id"] for row in page["items"]] == [5, 4]
+    assert not page["has_prev"]
+    assert page["has_next"]
+    assert decode_cursor(page["next_cursor"]) == (BASE + timedelta(hours=4), 4)
+
+
+def test_last_page_has_prev_only():
+    page = keyset_page(rows([2, 1]), 2, "created_at", "next", has_cursor=True)
+    assert [row["id"] for row in page["items"]] == [2, 1]
+    assert page["has_prev"]
+    assert not page["has_next"]
+
+
+def test_prev_page_is_returned_newest_first():
+    # A "prev" query fetches ascending, beyond the cursor.
+    page = keyset_page(rows([6, 7, 8]), 2, "created_at", "prev", has_cursor=True)
+    assert [row["id"] for row in page["items"]] == [7, 6]
+    assert page["has_prev"]
+    assert page["has_next"]
+    assert decode_cursor(page["prev_cursor"]) == (BASE + timedelta(hours=7), 7)
+
+
+def test_empty_page_has_no_links():
+    page = keyset_page([], 20, "created_at", "next", has_cursor=True)
+    assert page["items"] == []
+    assert not page["has_prev"]
+    assert not page["has_next"]
+    assert page["next_cursor"] is None
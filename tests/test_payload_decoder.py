@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from utils.payload_decoder import BACKENDS, PayloadDecoder, PayloadError
+
+PAYLOAD = json.dumps(
+    {
+        "signer": {"user_name": "Maria Souza", "email": "maria@example.com"},
+        "course": {"course_title": "Python Básico", "hours": 40},
+        "certificate": {"filename": "cert-1.pdf", "template_id": 3},
+        "error_message": {"message": "Template not found"},
+        "extra": list(range(50)),
+    }
+)
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def decoder(request):
+    return PayloadDecoder(backend=request.param)
+
+
+def test_extracts_only_the_display_fields(decoder):
+    assert decoder.extract(PAYLOAD) == {
+        "student_name": "Maria Souza",
+        "course_name": "Python Básico",
+        "cert_filename": "cert-1.pdf",
+        "template_id": 3,
+        "error": "Template not found",
+    }
+
+
+def test_missing_sections_fall_back_to_defaults(decoder):
+    fields = decoder.extract("{}")
+    assert fields["student_name"] == "N/A"
+    assert fields["course_name"] == "N/A"
+    assert fields["cert_filename"] == ""
+    assert fields["error"] is None
+
+
+def test_errors_are_truncated(decoder):
+    fields = decoder.extract(json.dumps({"error": "x" * 1000}))
+    assert len(fields["error"]) == 300
+
+
+@pytest.mark.parametrize("raw", ["", None, "{not json", "[1, 2]"])
+def test_invalid_payloads_raise_payload_error(decoder, raw):
+    with pytest.raises(PayloadError):
+        decoder.extract(raw)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        PayloadDecoder(backend="simdjson")
+
+
+def test_cache_is_keyed_by_task_and_update_time():
+    decoder = PayloadDecoder(backend="json")
+    decoder.store((1, "t1"), {"student_name": "A"})
+    decoder.store((2, "t1"), {"student_name": "B"})
+
+    assert decoder.cached((1, "t1")) == {"student_name": "A"}
+    assert decoder.cached((1, "t2")) is None
+
+    decoder.retain([(2, "t1")])
+    assert decoder.cached((1, "t1")) is None
+    assert len(decoder) == 1
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+from utils.refresh_executor import (
+    ParallelRefresh,
+    RefreshStage,
+    cancelled,
+    raise_if_cancelled,
+)
+
+
+@pytest.fixture
+def refresh():
+    refresh = ParallelRefresh(max_workers=4)
+    yield refresh
+    refresh.shutdown()
+
+
+def test_stages_run_concurrently_and_report_errors(refresh):
+    def fail():
+        raise ValueError("bad query")
+
+    started = time.monotonic()
+    results, errors, durations = refresh.run(
+        [
+            RefreshStage("a", lambda: time.sleep(0.1) or 1),
+            RefreshStage("b", lambda: time.sleep(0.1) or 2),
+            RefreshStage("c", fail),
+        ]
+    )
+    assert time.monotonic() - started < 0.19
+    assert results == {"a": 1, "b": 2}
+    assert errors == {"c": "ValueError: bad query"}
+    assert set(durations) == {"a", "b"}
+
+
+def test_a_timed_out_stage_does_not_commit(refresh):
+    release = threading.Event()
+    committed, stopped = [], threading.Event()
+
+    def slow():
+        release.wait(5)
+        try:
+            raise_if_cancelled()
+        except Exception:
+            stopped.set()
+            raise
+        committed.append(True)
+
+    results, errors, _ = refresh.run(
+        [RefreshStage("slow", slow, timeout=0.05), RefreshStage("fast", lambda: 1)]
+    )
+    assert results == {"fast": 1}
+    assert errors == {"slow": "Timed out after 0.05s"}
+
+    release.set()
+    assert stopped.wait(5)
+    assert committed == []
+
+
+def test_a_stage_still_running_is_not_started_again(refresh):
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+
+    refresh.run([RefreshStage("slow", slow, timeout=0.05)])
+    _, errors, _ = refresh.run([RefreshStage("slow", slow, timeout=0.05)])
+    assert errors == {"slow": "Still running after timing out earlier"}
+    assert len(calls) == 1
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while refresh._running["slow"].running() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    results, errors, _ = refresh.run([RefreshStage("slow", lambda: "again")])
+    assert results == {"slow": "again"}
+
+
+def test_cancellation_only_applies_inside_a_stage():
+    assert not cancelled()
+    raise_if_cancelled()
@@ -0,0 +1,141 @@
+from datetime import datetime
+
+import pytest
+
+from utils.requeue import Requeuer, parse_filters, preview, select_tasks
+
+
+class FakeMonitor:
+    def __init__(self, fail_on_batch=None):
+        self.batches = []
+        self.fail_on_batch = fail_on_batch
+
+    def requeue_tasks(self, task_ids, status, attempts):
+        self.batches.append(list(task_ids))
+        if len(self.batches) == self.fail_on_batch:
+            raise ConnectionError("lost connection")
+        # Task 3 was requeued by someone else in the meantime.
+        return len([task_id for task_id in task_ids if task_id != 3])
+
+
+@pytest.fixture
+def requeuer():
+    requeuer = Requeuer(FakeMonitor())
+    requeuer.batch_size = 2
+    requeuer.throttle = 0
+    return requeuer
+
+
+def test_tasks_are_updated_in_batches(requeuer):
+    steps = list(requeuer.run(range(1, 6)))
+
+    assert requeuer.monitor.batches == [[1, 2], [3, 4], [5]]
+    assert [step["processed"] for step in steps] == [2, 4, 5, 5]
+    assert steps[-1] == {
+        "done": True,
+        "updated": 4,
+        "skipped": 1,
+        "processed": 5,
+        "total": 5,
+    }
+
+
+def test_a_failed_batch_stops_the_requeue(requeuer):
+    requeuer.monitor.fail_on_batch = 2
+    steps = list(requeuer.run(range(1, 6)))
+
+    assert len(requeuer.monitor.batches) == 2
+    assert steps[-1]["done"]
+    assert steps[-1]["error"] == "lost connection"
+    assert steps[-1]["updated"] == 2
+    assert steps[-1]["processed"] == 2
+
+
+def test_only_one_requeue_runs_at_a_time(requeuer):
+    progress = requeuer.run([1, 2, 3])
+    next(progress)
+    with pytest.raises(RuntimeError):
+        requeuer.run([4])
+
+    list(progress)
+    assert list(requeuer.run([4]))[-1]["updated"] == 1
+
+
+def test_closing_an_unread_requeue_frees_the_lock(requeuer):
+    progress = requeuer.run([1, 2, 3])
+    # E.g. the client disconnected before the response was streamed.
+    progress.close()
+    assert requeuer.monitor.batches == []
+    assert list(requeuer.run([4]))[-1]["done"]
+
+
+def test_closing_a_requeue_midway_stops_it(requeuer):
+    progress = requeuer.run(range(1, 7))
+    next(progress)
+    progress.close()
+    progress.close()
+    assert requeuer.monitor.batches == [[1, 2]]
+    assert list(requeuer.run([7]))[-1]["done"]
+
+
+TASKS = [
+    {
+        "id": 1,
+        "course_name": "Python Básico",
+        "attempts": 5,
+        "updated_at": datetime(2025, 1, 10, 9),
+        "error": "Timeout rendering 'cert-1.pdf'",
+    },
+    {
+        "id": 2,
+        "course_name": "Java",
+        "attempts": 1,
+        "updated_at": datetime(2025, 1, 12, 23, 59),
+        "error": None,
+    },
+    {"id": 3, "course_name": "python avançado", "attempts": 2, "updated_at": None},
+]
+
+
+def test_filters_are_parsed_from_request_arguments():
+    filters = parse_filters(
+        {"course": " python ", "min_attempts": "2", "to": "2025-01-12"}
+    )
+    assert filters["course"] == "python"
+    assert filters["min_attempts"] == 2
+    assert filters["max_attempts"] is None
+    assert filters["date_to"] == datetime(2025, 1, 12)
+    with pytest.raises(ValueError):
+        parse_filters({"from": "12/01/2025"})
+
+
+def ids(filters, log_events=None):
+    selected = select_tasks(TASKS, parse_filters(filters), log_events)
+    return [task["id"] for task in selected]
+
+
+def test_select_tasks_by_course_attempts_and_dates():
+    assert ids({"course": "PYTHON"}) == [1, 3]
+    assert ids({"min_attempts": "2", "max_attempts": "4"}) == [3]
+    # `to` includes the whole day; tasks without updated_at never match dates.
+    assert ids({"from": "2025-01-11", "to": "2025-01-12"}) == [2]
+
+
+def test_select_tasks_by_log_error():
+    events = {2: [{"level": "ERROR", "message": "SMTP refused", "context": []}]}
+    assert ids({"error": "smtp"}, lambda task_id: events.get(task_id, [])) == [2]
+    assert ids({"error": "smtp"}) == []
+
+
+def test_select_tasks_by_payload_error_without_log_tailing():
+    assert ids({"error": "TIMEOUT"}) == [1]
+    events = {2: [{"level": "ERROR", "message": "SMTP refused", "context": []}]}
+    assert ids({"error": "timeout"}, lambda task_id: events.get(task_id, [])) == [1]
+
+
+def test_preview_digest_ignores_order():
+    forward, backward = preview(TASKS, 10), preview(TASKS[::-1], 10)
+    assert forward["digest"] == backward["digest"]
+    assert forward["count"] == 3
+    assert not forward["too_many"]
+    assert preview(TASKS, 2)["too_many"]
@@ -0,0 +1,176 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.certificate_snapshot import CertificateSnapshot
+from utils.search_index import MAX_LIMIT, CertificateSearchIndex, normalize, words
+
+BASE = datetime(2025, 1, 1)
+NAMES = ["João Conceição", "Maria Souza", "Joana Lima", "José Araújo", "Ana Maria"]
+COURSES = ["Python Básico", "Gestão de Projetos", "Excel Avançado"]
+STATUSES = ["emitido", "pendente", "revogado"]
+
+
+def certificate(cert_id, name, course, status="emitido", hours=None):
+    created_at = BASE + timedelta(hours=cert_id if hours is None else hours)
+    return {
+        "id": cert_id,
+        "student_id": cert_id,
+        "course_id": COURSES.index(course) if course in COURSES else 99,
+        "student_name": name,
+        "course_name": course,
+        "status": status,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def build(rows):
+    snapshot = CertificateSnapshot.from_rows(rows)
+    index = CertificateSearchIndex()
+    index.rebuild(snapshot.ordered())
+    return snapshot, index
+
+
+@pytest.fixture
+def index():
+    return build(
+        [
+            certificate(1, "João Conceição", "Python Básico"),
+            certificate(2, "Maria Souza", "Gestão de Projetos", "pendente"),
+            certificate(3, "Joana Lima", "Python Básico", "revogado"),
+            certificate(4, "José Araújo", "Excel Avançado"),
+        ]
+    )[1]
+
+
+def test_normalize_strips_accents_and_case():
+    assert normalize("João CONCEIÇÃO") == "joao conceicao"
+    assert normalize(None) == ""
+    assert words("Ana  ana, Maria") == ("ana", "maria")
+
+
+def test_words_match_as_accent_insensitive_prefixes(index):
+    assert index.search("joao") == ([1], 1)
+    assert index.search("jo") == ([4, 3, 1], 3)
+    assert index.search("JOSÉ ara") == ([4], 1)
+    assert index.search("python") == ([3, 1], 2)
+    assert index.search("maria gestao") == ([2], 1)
+    assert index.search("xyz") == ([], 0)
+
+
+def test_course_status_and_dates_filter(index):
+    assert index.search(course="pyth") == ([3, 1], 2)
+    assert index.search("jo", status="emitido") == ([4, 1], 2)
+    assert index.search(
+        created_from=BASE + timedelta(hours=2), created_to=BASE + timedelta(hours=4)
+    ) == ([3, 2], 2)
+    assert index.search(status="desconhecido") == ([], 0)
+
+
+def test_pages_are_newest_first(index):
+    assert index.search(limit=2) == ([4, 3], 4)
+    assert index.search(limit=2, offset=2) == ([2, 1], 4)
+    assert index.search(limit=2, offset=10) == ([], 4)
+    assert index.search(limit=0)[0] == [4]
+
+
+def test_apply_follows_sync_changes():
+    snapshot, index = build(
+        [
+            certificate(1, "João Conceição", "Python Básico"),
+            certificate(2, "Maria Souza", "Gestão de Projetos"),
+        ]
+    )
+    # Like CertificateSync: changes go to a copy, old rows stay readable.
+    replica = snapshot.copy()
+    replica.upsert(certificate(2, "Maria Souza", "Excel Avançado", "revogado"))
+    replica.upsert(certificate(3, "Pedro Alves", "Python Básico"))
+    replica.remove(1)
+
+    index.apply(
+        [
+            (snapshot.get(2), replica.get(2)),
+            (None, replica.get(3)),
+            (snapshot.get(1), None),
+        ]
+    )
+
+    assert index.search("joao") == ([], 0)
+    assert index.search("gestao") == ([], 0)
+    assert index.search("maria", status="revogado", course="excel") == ([2], 1)
+    assert index.search("python") == ([3], 1)
+    assert len(index) == 2
+    # Words no longer used are dropped from the sorted term list.
+    assert "joao" not in index.fields["student_name"].terms
+
+
+def brute_force(rows, query=None, course=None, status=None, low=None, high=None):
+    def matches(row):
+        text = words(row["student_name"]) + words(row["course_name"])
+        course_words = words(row["course_name"])
+        return (
+            all(any(w.startswith(q) for w in text) for q in words(query))
+            and all(any(w.startswith(c) for w in course_words) for c in words(course))
+            and (not status or row["status"] == status)
+            and (low is None or row["created_at"] >= low)
+            and (high is None or row["created_at"] < high)
+        )
+
+    found = sorted(
+        (row for row in rows.values() if matches(row)),
+        key=lambda row: (row["created_at"], row["id"]),
+        reverse=True,
+    )
+    return [row["id"] for row in found]
+
+
+def test_search_matches_a_full_scan_after_random_changes():
+    generator = random.Random(7)
+
+    def random_row(cert_id):
+        return certificate(
+            cert_id,
+            generator.choice(NAMES),
+            generator.choice(COURSES),
+            generator.choice(STATUSES),
+            hours=generator.randrange(500),
+        )
+
+    rows = {cert_id: random_row(cert_id) for cert_id in range(1, 400)}
+    snapshot, index = build(rows.values())
+
+    for _ in range(5):
+        previous, snapshot = snapshot, snapshot.copy()
+        changed = generator.sample(range(1, 450), 40)
+        for cert_id in changed:
+            if cert_id in rows and generator.random() < 0.3:
+                snapshot.remove(cert_id)
+                del rows[cert_id]
+            else:
+                rows[cert_id] = random_row(cert_id)
+                snapshot.upsert(rows[cert_id])
+        index.apply(
+            [(previous.get(cert_id), snapshot.get(cert_id)) for cert_id in changed]
+        )
+
+        for query, course, status, hours in [
+            ("jo", None, None, None),
+            ("maria", "python", None, None),
+            (None, None, "pendente", (100, 300)),
+            ("a", None, "emitido", (0, 50)),
+            (None, "excel av", None, None),
+            (None, None, None, (250, 260)),
+        ]:
+            low, high = (
+                (BASE + timedelta(hours=hours[0]), BASE + timedelta(hours=hours[1]))
+                if hours
+                else (None, None)
+            )
+            expected = brute_force(rows, query, course, status, low, high)
+            found, total = index.search(
+                query, course, status, low, high, limit=MAX_LIMIT
+            )
+            assert total == len(expected)
+            assert found == expected[:MAX_LIMIT]
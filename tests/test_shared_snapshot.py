@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+import app
+from utils.snapshot import MonitoringSnapshot
+
+
+@pytest.fixture
+def caches(monkeypatch):
+    monkeypatch.setattr(app, "publish_live", lambda previous, snapshot: None)
+    app.certificate_details_cache.clear()
+    app.failure_details_cache.clear()
+    app.certificate_details_cache.set(1, {"id": 1, "status": "pending"})
+    app.failure_details_cache.set(7, {"id": 7, "certificate": {"id": 1}})
+    app.failure_details_cache.set(8, {"id": 8, "certificate": None})
+    yield app.certificate_details_cache, app.failure_details_cache
+    app.certificate_details_cache.clear()
+    app.failure_details_cache.clear()
+
+
+def snapshot():
+    tasks = [{"id": 7, "updated_at": 1}, {"id": 8, "updated_at": 1}]
+    return MonitoringSnapshot.initial({}, json.dumps).replace(
+        certificates=[], failed_tasks=tasks
+    )
+
+
+def test_new_certificates_section_drops_certificate_details(caches):
+    certificate_details, failure_details = caches
+    previous = snapshot()
+    app.on_shared_snapshot(previous, previous.replace(certificates=[{"id": 1}]))
+
+    assert certificate_details.get(1) is None
+    assert failure_details.get(7) is None
+    assert failure_details.get(8) is not None
+
+
+def test_new_epoch_drops_certificate_details(caches):
+    certificate_details, _ = caches
+    app.on_shared_snapshot(snapshot(), snapshot())
+    assert certificate_details.get(1) is None
+
+
+def test_other_sections_keep_certificate_details(caches):
+    certificate_details, failure_details = caches
+    previous = snapshot()
+    app.on_shared_snapshot(previous, previous.replace(total_counts={"n": 1}))
+
+    assert certificate_details.get(1) is not None
+    assert failure_details.get(7) is not None
@@ -0,0 +1,64 @@
+import json
+
+from utils.shared_state import SharedSnapshotStore
+from utils.snapshot import MonitoringSnapshot
+
+DEFAULTS = {"total_counts": {}, "failed_tasks": []}
+
+
+def initial():
+    return MonitoringSnapshot.initial(DEFAULTS, json.dumps)
+
+
+def refresh(results, errors=None):
+    """A publish() build function for one refresh"""
+    return lambda current: current.next(results, errors or {}, {}, DEFAULTS)
+
+
+def test_next_keeps_failed_sections_and_the_epoch():
+    first = refresh({"total_counts": {"n": 1}, "failed_tasks": [1]})(initial())
+    second = refresh({"total_counts": {"n": 2}}, {"failed_tasks": "timeout"})(first)
+
+    assert second.generation == 2
+    assert second.epoch == first.epoch
+    assert second.version == f"{first.epoch}-2"
+    assert second["failed_tasks"] == [1]
+    assert second.meta["status"] == "partial"
+    assert second.section_generations == {"total_counts": 2, "failed_tasks": 1}
+
+
+def test_restarted_processes_get_another_version():
+    before, after = initial(), initial()
+    assert before.generation == after.generation
+    assert before.version != after.version
+
+
+def test_web_worker_follows_a_new_epoch(tmp_path):
+    path = str(tmp_path / "shared")
+    writer = SharedSnapshotStore(initial(), path, writer=True)
+    writer.publish(refresh({"total_counts": {"n": 1}}))
+
+    reader = SharedSnapshotStore(initial(), path, writer=False)
+    reader.poll()
+    assert reader._current.version == writer.current.version
+
+    # The shared files are reset and a new refresher reaches the same generation.
+    for name in (tmp_path / "shared").iterdir():
+        name.unlink()
+    restarted = SharedSnapshotStore(initial(), path, writer=True)
+    restarted.publish(refresh({"total_counts": {"n": 7}}))
+    assert restarted.current.generation == 1
+
+    reader.poll()
+    assert reader._current.version == restarted.current.version
+    assert reader._current["total_counts"] == {"n": 7}
+
+
+def test_restarted_refresher_resumes_the_shared_epoch(tmp_path):
+    path = str(tmp_path / "shared")
+    writer = SharedSnapshotStore(initial(), path, writer=True)
+    writer.publish(refresh({"total_counts": {"n": 1}}))
+
+    resumed = SharedSnapshotStore(initial(), path, writer=True)
+    assert resumed.current.version == writer.current.version
+    assert resumed.current["total_counts"] == {"n": 1}
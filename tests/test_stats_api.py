@@ -0,0 +1,75 @@
+import gzip
+import json
+from datetime import datetime
+
+from utils.stats_api import StatsSnapshot, choose_encoding, parse_fields
+
+UPDATED_AT = datetime(2024, 5, 1, 10, 0, 0).astimezone()
+
+
+def stats(generation=1, **data):
+    data = {
+        "total_counts": {"certificates": 10, "students": 4},
+        "failed_tasks": [
+            {"id": i, "student_name": f"Aluno {i}", "payload": "x" * 100}
+            for i in range(30)
+        ],
+        "certificates": [{"id": 1}],
+        **data,
+    }
+    return StatsSnapshot(data, generation, UPDATED_AT, json.dumps)
+
+
+def test_default_sections_leave_out_heavy_ones():
+    snapshot = stats()
+    assert snapshot.resolve_sections(None) == ("total_counts", "failed_tasks")
+    assert "certificates" in snapshot.resolve_sections("all")
+    assert snapshot.resolve_sections("total_counts,unknown") == ("total_counts",)
+
+
+def test_body_drops_payloads_and_selects_fields():
+    snapshot = stats()
+    body, encoding, _ = snapshot.body(("failed_tasks",), ("id",))
+    assert encoding is None
+    assert json.loads(body)["failed_tasks"][0] == {"id": 0}
+
+    body, _, _ = snapshot.body(("failed_tasks",))
+    assert "payload" not in json.loads(body)["failed_tasks"][0]
+
+
+def test_compressed_body_round_trips():
+    snapshot = stats()
+    body, encoding, _ = snapshot.body(("failed_tasks",), None, "gzip")
+    plain, _, _ = snapshot.body(("failed_tasks",))
+    assert encoding == "gzip"
+    assert gzip.decompress(body) == plain
+
+
+def test_etag_differs_per_content_coding():
+    snapshot = stats()
+    sections = ("failed_tasks",)
+    etags = {snapshot.body(sections, None, coding)[2] for coding in (None, "gzip")}
+    assert len(etags) == 2
+    assert snapshot.body(sections, None, "gzip")[2].endswith('-gz"')
+
+
+def test_etag_follows_content_not_generation():
+    sections = ("total_counts",)
+    # A restarted process reuses generation numbers for other content.
+    before = stats(1).body(sections)[2]
+    after_restart = stats(1, total_counts={"certificates": 11}).body(sections)[2]
+    assert before != after_restart
+    assert stats(1).body(sections)[2] == stats(2).body(sections)[2]
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding(None) is None
+
+
+def test_parse_fields_groups_by_section():
+    assert parse_fields(("id", "failed_tasks.student_name")) == {
+        "*": {"id"},
+        "failed_tasks": {"student_name"},
+    }
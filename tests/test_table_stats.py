@@ -0,0 +1,86 @@
+import time
+
+from utils.table_stats import (
+    SOURCE_CACHED,
+    SOURCE_EXACT,
+    SOURCE_INFORMATION_SCHEMA,
+    SOURCE_INNODB,
+    TableStatsEngine,
+)
+
+
+class FakeMonitor:
+    def __init__(self):
+        self.counts = {"certificates": 120, "students": 40}
+        self.innodb = {"certificates": 118}
+        self.counted = []
+
+    def get_table_sizes(self):
+        return [
+            {"Tabela": "certificates", "Tamanho (MB)": 2.5, "Estimativa": 100},
+            {"Tabela": "students", "Tamanho (MB)": 0.5, "Estimativa": 38},
+        ]
+
+    def get_exact_count(self, name):
+        self.counted.append(name)
+        return self.counts[name]
+
+    def get_innodb_row_estimates(self):
+        if self.innodb is None:
+            raise PermissionError("SELECT denied on mysql.innodb_table_stats")
+        return self.innodb
+
+
+def counts(rows):
+    return {row["Tabela"]: (row["Registros"], row["Origem"]) for row in rows}
+
+
+def test_exact_mode_counts_every_table():
+    engine = TableStatsEngine(FakeMonitor(), mode="exact")
+    assert counts(engine.collect()) == {
+        "certificates": (120, SOURCE_EXACT),
+        "students": (40, SOURCE_EXACT),
+    }
+
+
+def test_estimate_mode_prefers_innodb_statistics():
+    monitor = FakeMonitor()
+    engine = TableStatsEngine(monitor, mode="estimate")
+    assert counts(engine.collect()) == {
+        "certificates": (118, SOURCE_INNODB),
+        "students": (38, SOURCE_INFORMATION_SCHEMA),
+    }
+    assert monitor.counted == []
+
+
+def test_estimates_fall_back_when_innodb_stats_are_unreadable():
+    monitor = FakeMonitor()
+    monitor.innodb = None
+    engine = TableStatsEngine(monitor, mode="estimate")
+    assert counts(engine.collect())["certificates"] == (100, SOURCE_INFORMATION_SCHEMA)
+
+
+def test_hybrid_mode_serves_estimates_until_recounted():
+    monitor = FakeMonitor()
+    engine = TableStatsEngine(monitor, mode="hybrid", ttl=60, refresh_delay=0)
+
+    assert counts(engine.collect())["certificates"] == (118, SOURCE_INNODB)
+
+    deadline = time.monotonic() + 5
+    while len(monitor.counted) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert counts(engine.collect()) == {
+        "certificates": (120, SOURCE_CACHED),
+        "students": (40, SOURCE_CACHED),
+    }
+
+
+def test_expired_counts_are_recounted():
+    monitor = FakeMonitor()
+    engine = TableStatsEngine(monitor, mode="hybrid", ttl=0, refresh_delay=0)
+    engine._count_now("certificates")
+    assert counts(engine.collect())["certificates"] == (118, SOURCE_INNODB)
+
+
+def test_unknown_mode_falls_back_to_hybrid():
+    assert TableStatsEngine(FakeMonitor(), mode="fast").mode == "hybrid"
@@ -0,0 +1,122 @@
+import pytest
+
+from utils import ssh_client
+from utils.ssh_client import TunnelManager
+
+
+class FakeForwarder:
+    def __init__(self, port):
+        self.is_active = True
+        self.local_bind_port = port
+
+
+class FakeSSHTunnel:
+    """Stands in for SSHTunnel; `outcomes` decides each attempt in turn"""
+
+    outcomes = []
+    opened = []
+
+    def __init__(self, keepalive=None, ready_timeout=None):
+        self.tunnel = None
+
+    def __enter__(self):
+        if FakeSSHTunnel.outcomes and not FakeSSHTunnel.outcomes.pop(0):
+            raise OSError("connection refused")
+        self.tunnel = FakeForwarder(40000 + len(FakeSSHTunnel.opened))
+        FakeSSHTunnel.opened.append(self)
+        return self.tunnel
+
+    def __exit__(self, *exc):
+        if self.tunnel:
+            self.tunnel.is_active = False
+
+    def is_ready(self):
+        return self.tunnel.is_active
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    FakeSSHTunnel.outcomes = []
+    FakeSSHTunnel.opened = []
+    monkeypatch.setattr(ssh_client, "SSHTunnel", FakeSSHTunnel)
+    monkeypatch.setattr(TunnelManager, "_start_health_thread", lambda self: None)
+    manager = TunnelManager()
+    manager.max_attempts = 3
+    manager.backoff_base = 0
+    manager.reconnected = 0
+
+    def on_reconnect():
+        manager.reconnected += 1
+
+    manager.on_reconnect = on_reconnect
+    return manager
+
+
+def drop(manager):
+    manager.ssh_tunnel.tunnel.is_active = False
+
+
+def test_first_tunnel_is_not_a_reconnect(manager):
+    FakeSSHTunnel.outcomes = [False, True]
+    assert manager.local_port() == 40000
+    assert manager.reconnects == 0
+    assert manager.reconnected == 0
+    assert manager.failures == 1
+    assert manager.metrics()["state"] == "up"
+
+
+def test_replacing_a_dropped_tunnel_is_a_reconnect(manager):
+    manager.local_port()
+    drop(manager)
+    assert manager.local_port() == 40001
+    assert manager.reconnects == 1
+    assert manager.reconnected == 1
+
+
+def test_success_after_failed_reconnect_is_counted(manager):
+    manager.local_port()
+    drop(manager)
+
+    FakeSSHTunnel.outcomes = [False, False, False]
+    with pytest.raises(OSError):
+        manager.local_port()
+    assert manager.ssh_tunnel is None
+    assert manager.state == "down"
+
+    assert manager.local_port() == 40001
+    assert manager.reconnects == 1
+    assert manager.reconnected == 1
+
+
+def test_backoff_waits_outside_the_lock(manager):
+    held = []
+
+    def wait(delay):
+        held.append(manager._lock.locked())
+        return False
+
+    manager._stop.wait = wait
+    FakeSSHTunnel.outcomes = [False, False, True]
+    manager.local_port()
+    assert held == [False, False]
+
+
+def test_tunnel_replaced_meanwhile_is_reused(manager):
+    manager.local_port()
+    stale = manager.ssh_tunnel
+    drop(manager)
+    current = manager._reconnect(stale)
+
+    assert manager._reconnect(stale) is current
+    assert len(FakeSSHTunnel.opened) == 2
+
+
+def test_stop_ends_the_retries(manager):
+    manager.local_port()
+    drop(manager)
+    manager._stop.set()
+
+    FakeSSHTunnel.outcomes = [False, True]
+    with pytest.raises(OSError):
+        manager.local_port()
+    assert manager.state == "down"
@@ -0,0 +1,394 @@
+import asyncio
+import inspect
+import time
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
+from config.config import ASYNC_DB_CONFIG, DB_CONFIG, POOL_CONFIG
+from config.queries import MONITORING_QUERIES
+from utils.connection_pool import PoolTimeout
+from utils.instrumentation import AsyncInstrumentedCursor
+from utils.mysql_monitor import (
+    LOCAL_UTC_OFFSET,
+    PAYLOAD_BATCH_SIZE,
+    MonitorBase,
+    daily_counts,
+    day_range,
+)
+from utils.pagination import keyset_page
+
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None
+
+try:
+    import asyncmy
+    import asyncmy.cursors
+    import asyncmy.errors
+except ImportError:
+    asyncmy = None
+
+
+async def _resolved(value):
+    """Await `value` if needed: aiomysql and asyncmy differ on what is a coroutine"""
+    return await value if inspect.isawaitable(value) else value
+
+
+def _drivers():
+    """Installed asyncio MySQL drivers, in order of preference"""
+    drivers = {}
+    if aiomysql is not None:
+        drivers["aiomysql"] = {
+            "create_pool": aiomysql.create_pool,
+            "database_arg": "db",
+            "cursor": aiomysql.DictCursor,
+            "ss_cursor": aiomysql.SSDictCursor,
+            # aiomysql raises the pymysql exceptions.
+            "connection_errors": (aiomysql.OperationalError, aiomysql.InterfaceError),
+        }
+    if asyncmy is not None:
+        drivers["asyncmy"] = {
+            "create_pool": asyncmy.create_pool,
+            "database_arg": "database",
+            "cursor": asyncmy.cursors.DictCursor,
+            "ss_cursor": asyncmy.cursors.SSDictCursor,
+            "connection_errors": (
+                asyncmy.errors.OperationalError,
+                asyncmy.errors.InterfaceError,
+            ),
+        }
+    return drivers
+
+
+class AsyncMySQLMonitor(MonitorBase):
+    """MySQLMonitor for asyncio, over an aiomysql or asyncmy pool.
+
+    Same queries and results as MySQLMonitor, with coroutine methods, so
+    one event loop can serve many lookups at once, each holding a pooled
+    connection only while its query runs. The pool is created on first use
+    in the running loop; when a connection breaks (e.g. the SSH tunnel was
+    replaced), the pool is recreated with the current address.
+
+    The table counts and the binlog, which only the refresh uses, stay on
+    MySQLMonitor.
+    """
+
+    def __init__(self, tunnel=None, query_metrics=None, driver=None):
+        super().__init__(tunnel, query_metrics)
+        drivers = _drivers()
+        name = driver or ASYNC_DB_CONFIG["driver"] or next(iter(drivers), None)
+        if name not in drivers:
+            raise RuntimeError(
+                f"Async MySQL driver {name or ''!r} is not installed "
+                "(pip install aiomysql, or asyncmy)"
+            )
+        self.driver = name
+        self._driver = drivers[name]
+        self.pool_size = ASYNC_DB_CONFIG["pool_size"]
+        self._pool = None
+        self._stale_pools = []
+        self._pool_lock = None
+
+    async def _get_pool(self):
+        """The connection pool, created (or recreated) in the running loop"""
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            await self._close_stale_pools()
+            if self._pool is None:
+                # Opening the tunnel blocks, so it runs outside the loop.
+                host, port = await asyncio.to_thread(self.address)
+                self._pool = await self._driver["create_pool"](
+                    minsize=0,
+                    maxsize=self.pool_size,
+                    host=host,
+                    port=port,
+                    user=DB_CONFIG["username"],
+                    password=DB_CONFIG["password"],
+                    charset="utf8mb4",
+                    connect_timeout=10,
+                    # Same reason as MySQLMonitor: no stale REPEATABLE READ views.
+                    autocommit=True,
+                    **{self._driver["database_arg"]: DB_CONFIG["database"]},
+                )
+                print(f"[DB] Async connection pool ready ({self.driver}).")
+            return self._pool
+
+    def _retire_pool(self):
+        """Recreate the pool on next use; connections in use finish first"""
+        if self._pool is not None:
+            self._stale_pools.append(self._pool)
+            self._pool = None
+
+    async def _close_stale_pools(self, wait=False):
+        """Close retired pools; their connections close as they are released"""
+        for pool in self._stale_pools:
+            pool.close()
+            if wait:
+                await pool.wait_closed()
+        self._stale_pools = []
+
+    @asynccontextmanager
+    async def _connection(self):
+        """Borrow a pooled connection, waiting up to the pool timeout"""
+        pool = await self._get_pool()
+        try:
+            conn = await asyncio.wait_for(pool.acquire(), POOL_CONFIG["timeout"])
+        except asyncio.TimeoutError:
+            raise PoolTimeout(
+                f"No database connection available after {POOL_CONFIG['timeout']}s"
+            ) from None
+
+        try:
+            yield conn
+        except self._driver["connection_errors"]:
+            # Closed connections are dropped by the pool on release.
+            conn.close()
+            if pool is self._pool:
+                self._retire_pool()
+            raise
+        finally:
+            await _resolved(pool.release(conn))
+
+    async def _open_cursor(self, conn, unbuffered=False):
+        cursor_class = self._driver["ss_cursor" if unbuffered else "cursor"]
+        cursor = await _resolved(conn.cursor(cursor_class))
+        return AsyncInstrumentedCursor(cursor, self.query_metrics)
+
+    @asynccontextmanager
+    async def _cursor(self, unbuffered=False):
+        """Borrow a pooled connection and yield an instrumented cursor on it"""
+        async with self._connection() as conn:
+            async with await self._open_cursor(conn, unbuffered) as cursor:
+                yield cursor
+
+    async def _fetchone(self, query, params=None):
+        async with self._cursor() as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchone()
+
+    async def _fetchall(self, query, params=None):
+        async with self._cursor() as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchall()
+
+    async def ping(self):
+        """Check that the tunnel is up and a pooled connection answers"""
+        tunnel_active = await asyncio.to_thread(self.tunnel.is_active)
+        started = time.monotonic()
+        try:
+            async with self._connection() as conn:
+                await conn.ping(reconnect=False)
+        except Exception as e:
+            return {"tunnel": tunnel_active, "database": False, "error": str(e)}
+
+        return {
+            "tunnel": True,
+            "database": True,
+            "latency_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+
+    async def close(self):
+        """Close the pool; the tunnel belongs to the blocking monitor"""
+        print("[Monitor] Closing async connections...")
+        self._retire_pool()
+        await self._close_stale_pools(wait=True)
+
+    async def get_total_counts(self):
+        """Get total counts"""
+        return await self._fetchone(MONITORING_QUERIES["total_counts"])
+
+    async def get_table_total(self, name):
+        """Row count and max id of a table listed in table_totals"""
+        return await self._fetchone(MONITORING_QUERIES["table_totals"][name])
+
+    async def get_table_growth(self, name, last_id):
+        """Count and max id of the rows added to a table after last_id"""
+        return await self._fetchone(
+            MONITORING_QUERIES["table_growth"][name], {"last_id": last_id}
+        )
+
+    async def get_recent_templates(self, hours=24):
+        """Number of certificate templates updated in the last hours"""
+        result = await self._fetchone(
+            MONITORING_QUERIES["recent_templates"], {"hours": hours}
+        )
+        return result["count"] if result else 0
+
+    async def get_certificates_by_day(self, days=7):
+        """Get certificates grouped by day, in Brasília time, oldest day first"""
+        first_day, start, end = day_range(days, LOCAL_UTC_OFFSET)
+        rows = await self._fetchall(
+            MONITORING_QUERIES["certificates_by_day"], {"start": start, "end": end}
+        )
+        return daily_counts(first_day, days, {row["date"]: row["count"] for row in rows})
+
+    async def get_table_sizes(self):
+        """Get size and row estimate of every prefixed table"""
+        return await self._fetchall(MONITORING_QUERIES["table_sizes"])
+
+    async def get_certificates(self):
+        """Get all certificates"""
+        return await self._fetchall(MONITORING_QUERIES["certificates"])
+
+    async def get_certificates_since(self, since, last_id=0, limit=5000):
+        """Get certificates changed after the (updated_at, id) high-water mark"""
+        return await self._fetchall(
+            MONITORING_QUERIES["certificates_incremental"],
+            {"since": since, "last_id": last_id, "limit": limit},
+        )
+
+    async def get_certificates_after_id(self, last_id=0, limit=5000):
+        """Get a batch of certificates ordered by id, for full resyncs"""
+        return await self._fetchall(
+            MONITORING_QUERIES["certificates_by_id"],
+            {"last_id": last_id, "limit": limit},
+        )
+
+    async def get_certificates_fingerprint(self):
+        """Get row count and highest id of the certificates table"""
+        return await self._fetchone(MONITORING_QUERIES["certificates_fingerprint"])
+
+    async def get_recent_certificates(self, days=7):
+        """Get recent certificates"""
+        return await self._fetchall(MONITORING_QUERIES["recent_certificates"])
+
+    async def get_failed_queue_tasks(self):
+        """Get failed tasks in the queue, decoding only new or changed payloads"""
+        async with self._cursor() as cursor:
+            await cursor.execute(MONITORING_QUERIES["failed_queue_task_keys"])
+            results = await cursor.fetchall()
+
+            missing = self._missing_payloads(results)
+            payloads = {}
+            for start in range(0, len(missing), PAYLOAD_BATCH_SIZE):
+                await cursor.execute(
+                    MONITORING_QUERIES["queue_task_payloads"],
+                    {"ids": missing[start : start + PAYLOAD_BATCH_SIZE]},
+                )
+                rows = await cursor.fetchall()
+                payloads.update((row["id"], row["payload"]) for row in rows)
+
+        return self._failed_tasks(results, payloads, len(missing))
+
+    async def _fetch_page(
+        self, queries, key_field, cursor=None, per_page=10, direction="next"
+    ):
+        """Fetch one keyset page using the first/next/prev query variants"""
+        query, params, direction, position = self._page_query(
+            queries, cursor, per_page, direction
+        )
+        rows = await self._fetchall(query, params)
+        return keyset_page(rows, per_page, key_field, direction, position is not None)
+
+    async def get_certificates_page(self, cursor=None, per_page=10, direction="next"):
+        """Get one page of certificates ordered by (created_at, id), newest first"""
+        return await self._fetch_page(
+            MONITORING_QUERIES["certificates_page"],
+            "created_at",
+            cursor,
+            per_page,
+            direction,
+        )
+
+    async def get_failed_tasks_page(self, cursor=None, per_page=10, direction="next"):
+        """Get one page of failed tasks ordered by (updated_at, id), newest first"""
+        page = await self._fetch_page(
+            MONITORING_QUERIES["failed_tasks_page"],
+            "updated_at",
+            cursor,
+            per_page,
+            direction,
+        )
+        page["items"] = [self._process_failed_task(task) for task in page["items"]]
+        return page
+
+    async def get_approximate_count(self, name):
+        """Get a fast row count estimate from table statistics or EXPLAIN"""
+        result = await self._fetchone(MONITORING_QUERIES["approximate_counts"][name])
+        return self._approximate_count(result)
+
+    async def requeue_tasks(self, task_ids, status, attempts):
+        """Reset failed tasks to `status` in one transaction; returns rows changed"""
+        async with self._connection() as conn:
+            await conn.begin()
+            try:
+                async with await self._open_cursor(conn) as cursor:
+                    await cursor.execute(
+                        MONITORING_QUERIES["requeue_tasks"],
+                        {"ids": list(task_ids), "status": status, "attempts": attempts},
+                    )
+                    changed = cursor.rowcount
+                await conn.commit()
+            except self._driver["connection_errors"]:
+                raise
+            except Exception:
+                await conn.rollback()
+                raise
+            return changed
+
+    async def iter_export(
+        self, name, date_from=None, date_to=None, status=None, batch_size=1000
+    ):
+        """Stream rows of an export query through an unbuffered cursor"""
+        query, params = self._export_query(name, date_from, date_to, status)
+        async with self._connection() as conn:
+            cursor = await self._open_cursor(conn, unbuffered=True)
+            finished = False
+            try:
+                await cursor.execute(
+                    "SET SESSION net_write_timeout = 600", name="session"
+                )
+                await cursor.execute(query, params, name=f"exports.{name}")
+                while True:
+                    rows = await cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield row
+                finished = True
+            finally:
+                if finished:
+                    await cursor.close()
+                else:
+                    cursor.finish()
+                    # An abandoned unbuffered result cannot be reused.
+                    conn.close()
+
+    async def iter_failed_tasks_export(self, **filters):
+        """Stream queue tasks with their payload fields extracted"""
+        async for task in self.iter_export("tasks", **filters):
+            yield self._process_failed_task(task)
+
+    async def get_certificate_usage(self, days=30):
+        _, start, end = day_range(days, timedelta(0))
+        return await self._fetchall(
+            MONITORING_QUERIES["certificate_usage"], {"start": start, "end": end}
+        )
+
+    async def get_recent_activity(self, days=24):
+        return await self._fetchall(
+            MONITORING_QUERIES["recent_activity"], {"hours": days * 24}
+        )
+
+    async def check_data_integrity(self):
+        """Check data integrity"""
+        integrity_checks = {}
+        async with self._cursor() as cursor:
+            for check_name, query in MONITORING_QUERIES["integrity_checks"].items():
+                await cursor.execute(query)
+                integrity_checks[check_name] = self._integrity_value(
+                    await cursor.fetchone()
+                )
+        return integrity_checks
+
+    async def get_failure_details(self, task_id):
+        """Get detailed information about a failed task, in one joined query"""
+        task = await self._fetchone(MONITORING_QUERIES["failure_details"], (task_id,))
+        return self._failure_details(task)
+
+    async def get_certificate_details(self, cert_id):
+        """Get detailed information about a certificate, its student and course"""
+        cert = await self._fetchone(MONITORING_QUERIES["certificate_details"], (cert_id,))
+        return self._certificate_details(cert)
@@ -0,0 +1,355 @@
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+import pymysql
+
+from config.config import CDC_CONFIG, DB_CONFIG
+from config.queries import prefix
+
+try:
+    from pymysqlreplication import BinLogStreamReader
+    from pymysqlreplication.event import XidEvent
+    from pymysqlreplication.row_event import (
+        DeleteRowsEvent,
+        UpdateRowsEvent,
+        WriteRowsEvent,
+    )
+except ImportError:
+    BinLogStreamReader = None
+
+# Tables followed in the binlog, without the prefix.
+TABLES = ("certificates", "tasks_queue", "certificate_templates")
+
+# Server errors meaning the user may not read the binlog.
+ACCESS_ERRORS = {1044, 1045, 1142, 1227}
+# The saved position is no longer on the server (binlog purged).
+POSITION_PURGED = 1236
+
+
+def _row_id(row):
+    """Primary key of a row event entry, or None if the image lacks it"""
+    for key in ("values", "after_values", "before_values"):
+        values = row.get(key)
+        if values and "id" in values:
+            return values["id"]
+    return None
+
+
+class BinlogIngest:
+    """Tails the MySQL binlog and reports the rows that changed.
+
+    Row events for the followed tables are collected per table and, once
+    no event arrived for `debounce_seconds` (or `max_delay_seconds` after
+    the first one), handed to `on_change` as
+    {table: {"changed": [ids], "deleted": [ids]}}. The stream connects
+    through the monitor's SSH tunnel and resumes from the last committed
+    position, which is persisted only once a batch was applied; a batch
+    whose on_change raised is retried with backoff.
+
+    When the library is missing, the binlog is off or not in ROW format,
+    or the user lacks REPLICATION SLAVE/CLIENT, nothing is streamed and the
+    scheduled refresh remains the only source of updates; access is
+    checked again every `retry_seconds`.
+    """
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self.enabled = CDC_CONFIG["enabled"]
+        self.server_id = CDC_CONFIG["server_id"]
+        self.state_path = CDC_CONFIG["state_path"]
+        self.debounce = CDC_CONFIG["debounce_seconds"]
+        self.max_delay = CDC_CONFIG["max_delay_seconds"]
+        self.heartbeat = CDC_CONFIG["heartbeat_seconds"]
+        self.retry_seconds = CDC_CONFIG["retry_seconds"]
+        self.tables = {f"{prefix}{name}": name for name in TABLES}
+
+        self.on_change = None
+        self.state = "disabled"
+        self.reason = None
+        self.events = 0
+        self.batches = 0
+        self.last_event_at = None
+        self.lag_seconds = None
+        self.position = None
+        self._committed = None
+        self._pending = {}
+        self._pending_since = None
+        self._stream = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        self._load_position()
+
+    def _load_position(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            self.position = (state["log_file"], state["log_pos"])
+        except Exception as e:
+            print(f"[CDC] Could not load binlog position, starting from the end: {e}")
+
+    def _save_position(self, position):
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"log_file": position[0], "log_pos": position[1]}, f)
+        os.replace(tmp_path, self.state_path)
+        self.position = position
+
+    def check_access(self):
+        """Return None if the binlog can be streamed, or why it cannot"""
+        if BinLogStreamReader is None:
+            return "mysql-replication is not installed"
+        try:
+            settings = self.monitor.get_binlog_settings()
+            status = self.monitor.get_binlog_status()
+        except pymysql.err.MySQLError as e:
+            return f"binlog status not readable: {e}"
+
+        if settings.get("log_bin", "").upper() != "ON" or not status:
+            return "binary logging is disabled"
+        if settings.get("binlog_format", "").upper() != "ROW":
+            return f"binlog_format is {settings.get('binlog_format')}, ROW is required"
+        return None
+
+    def start(self, on_change):
+        """Start streaming in the background, if enabled"""
+        if not self.enabled:
+            return
+        self.on_change = on_change
+        self.state = "starting"
+        for target, name in (
+            (self._stream_loop, "binlog-stream"),
+            (self._dispatch_loop, "binlog-dispatch"),
+        ):
+            threading.Thread(target=target, name=name, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._close_stream()
+
+    def _close_stream(self):
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def _fall_back(self, reason):
+        if self.state != "polling" or self.reason != reason:
+            print(f"[CDC] Binlog unavailable, using polling only: {reason}")
+        self.state = "polling"
+        self.reason = reason
+
+    def _stream_loop(self):
+        attempt = 0
+        while not self._stop.is_set():
+            reason = self.check_access()
+            if reason:
+                self._fall_back(reason)
+                self._stop.wait(self.retry_seconds)
+                continue
+
+            try:
+                self._stream_events()
+            except pymysql.err.OperationalError as e:
+                code = e.args[0] if e.args else None
+                if code in ACCESS_ERRORS:
+                    self._fall_back(f"replication access denied: {e}")
+                    self._stop.wait(self.retry_seconds)
+                    continue
+                if code == POSITION_PURGED:
+                    print("[CDC] Saved binlog position was purged, resuming from the end.")
+                    self._reset_position()
+                    continue
+                self.reason = f"{type(e).__name__}: {e}"
+            except Exception as e:
+                self.reason = f"{type(e).__name__}: {e}"
+            finally:
+                self._close_stream()
+
+            if self._stop.is_set():
+                return
+            # A stream that got going starts the backoff over.
+            attempt = 1 if self.state == "streaming" else attempt + 1
+            delay = random.uniform(0, min(60, 2**attempt))
+            self.state = "reconnecting"
+            print(f"[CDC] Stream interrupted ({self.reason}), reconnecting in {delay:.1f}s")
+            self._stop.wait(delay)
+
+    def _reset_position(self):
+        """Forget the saved position and report every table as changed.
+
+        The events in between are lost, so the refresh stages of all
+        followed tables run once to catch up.
+        """
+        with self._lock:
+            self._committed = None
+            for table in TABLES:
+                self._pending.setdefault(table, {"changed": set(), "deleted": set()})
+            self._pending_since = self._pending_since or time.monotonic()
+        self.position = None
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        self._wake.set()
+
+    def _stream_events(self):
+        host, port = self.monitor.address()
+        if self.position is not None:
+            log_file, log_pos = self.position
+        else:
+            # Start at the end; the initial refresh covers what came before.
+            status = self.monitor.get_binlog_status()
+            log_file, log_pos = status["File"], status["Position"]
+        self._stream = stream = BinLogStreamReader(
+            connection_settings={
+                "host": host,
+                "port": port,
+                "user": DB_CONFIG["username"],
+                "passwd": DB_CONFIG["password"],
+                "charset": "utf8mb4",
+            },
+            server_id=self.server_id,
+            only_schemas=[DB_CONFIG["database"]],
+            only_tables=list(self.tables),
+            only_events=[WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent, XidEvent],
+            blocking=True,
+            resume_stream=True,
+            log_file=log_file,
+            log_pos=log_pos,
+            slave_heartbeat=self.heartbeat,
+        )
+        self.state = "streaming"
+        self.reason = None
+        print(f"[CDC] Streaming binlog from {log_file}:{log_pos}")
+
+        for event in stream:
+            if self._stop.is_set():
+                return
+            if isinstance(event, XidEvent):
+                # Only resume at transaction boundaries.
+                with self._lock:
+                    self._committed = (stream.log_file, stream.log_pos)
+                continue
+            self._collect(event)
+
+    def _collect(self, event):
+        table = self.tables.get(event.table)
+        if table is None:
+            return
+        key = "deleted" if isinstance(event, DeleteRowsEvent) else "changed"
+        with self._lock:
+            pending = self._pending.setdefault(table, {"changed": set(), "deleted": set()})
+            for row in event.rows:
+                row_id = _row_id(row)
+                if row_id is not None:
+                    pending[key].add(row_id)
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            self.events += len(event.rows)
+            self.last_event_at = datetime.now()
+            self.lag_seconds = max(time.time() - event.timestamp, 0)
+        self._wake.set()
+
+    def _dispatch_loop(self):
+        failures = 0
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+
+            # Wait for a quiet period, bounded by max_delay.
+            while not self._stop.is_set():
+                with self._lock:
+                    since = self._pending_since
+                if since is None or time.monotonic() - since >= self.max_delay:
+                    break
+                if not self._wake.wait(self.debounce):
+                    break
+                self._wake.clear()
+
+            if self._stop.is_set():
+                return
+            if self._dispatch():
+                failures = 0
+                continue
+
+            failures += 1
+            delay = random.uniform(0, min(60, 2**failures))
+            print(f"[CDC] Retrying the binlog changes in {delay:.1f}s")
+            self._stop.wait(delay)
+            self._wake.set()
+
+    def _dispatch(self):
+        """Hand the pending changes to on_change, then save the position.
+
+        The position only moves once on_change succeeded. On failure the
+        changes go back to the pending set, merged with whatever arrived
+        meanwhile, and False is returned so the caller retries them; a
+        restart in between resumes from the last applied position.
+        """
+        with self._lock:
+            pending, self._pending, self._pending_since = self._pending, {}, None
+            position = self._committed
+        if not pending:
+            return True
+
+        changes = {
+            table: {
+                "changed": sorted(ids["changed"] - ids["deleted"]),
+                "deleted": sorted(ids["deleted"]),
+            }
+            for table, ids in pending.items()
+        }
+        try:
+            self.on_change(changes)
+        except Exception as e:
+            print(f"[CDC] Error applying binlog changes: {e}")
+            with self._lock:
+                for table, ids in pending.items():
+                    merged = self._pending.setdefault(
+                        table, {"changed": set(), "deleted": set()}
+                    )
+                    merged["changed"] |= ids["changed"]
+                    merged["deleted"] |= ids["deleted"]
+                self._pending_since = self._pending_since or time.monotonic()
+            return False
+
+        self.batches += 1
+        if position is not None and position != self.position:
+            try:
+                self._save_position(position)
+            except Exception as e:
+                print(f"[CDC] Could not save binlog position: {e}")
+        return True
+
+    def status(self):
+        with self._lock:
+            return {
+                "cdc_state": self.state,
+                "cdc_reason": self.reason,
+                "cdc_events": self.events,
+                "cdc_batches": self.batches,
+                "cdc_last_event_at": (
+                    self.last_event_at.strftime("%d/%m/%Y %H:%M:%S")
+                    if self.last_event_at
+                    else None
+                ),
+                "cdc_lag_seconds": (
+                    round(self.lag_seconds, 1) if self.lag_seconds is not None else None
+                ),
+                "cdc_position": (
+                    f"{self.position[0]}:{self.position[1]}" if self.position else None
+                ),
+            }
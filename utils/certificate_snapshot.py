@@ -0,0 +1,373 @@
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+NULL = -(2**63)
+
+# Columns stored as 64-bit integers; None is stored as NULL.
+INT_COLUMNS = ("id", "student_id", "course_id")
+TIME_COLUMNS = ("created_at", "updated_at")
+
+
+def to_epoch(value):
+    """Convert a naive datetime to integer seconds, None to NULL"""
+    if value is None:
+        return NULL
+    return int((value - EPOCH).total_seconds())
+
+
+def from_epoch(value):
+    if value == NULL:
+        return None
+    return EPOCH + timedelta(seconds=value)
+
+
+def _int(value):
+    return NULL if value is None else value
+
+
+def _value(value):
+    return None if value == NULL else value
+
+
+class CertificateRow:
+    """Read-only view of one certificate in a snapshot.
+
+    Exposes the same names as the certificates query, as attributes (for
+    templates) and through `row["name"]` / `row.get("name")`.
+    """
+
+    __slots__ = ("_snapshot", "_index")
+
+    def __init__(self, snapshot, index):
+        self._snapshot = snapshot
+        self._index = index
+
+    @property
+    def id(self):
+        return self._snapshot._id[self._index]
+
+    @property
+    def student_id(self):
+        return _value(self._snapshot._student_id[self._index])
+
+    @property
+    def course_id(self):
+        return _value(self._snapshot._course_id[self._index])
+
+    @property
+    def student_name(self):
+        return self._snapshot._student_name[self._index]
+
+    @property
+    def course_name(self):
+        snapshot = self._snapshot
+        return snapshot._course_names[snapshot._course_code[self._index]]
+
+    @property
+    def status(self):
+        snapshot = self._snapshot
+        return snapshot._statuses[snapshot._status_code[self._index]]
+
+    @property
+    def created_at(self):
+        return from_epoch(self._snapshot._created_at[self._index])
+
+    @property
+    def updated_at(self):
+        return from_epoch(self._snapshot._updated_at[self._index])
+
+    FIELDS = (
+        "id",
+        "student_id",
+        "course_id",
+        "student_name",
+        "course_name",
+        "status",
+        "created_at",
+        "updated_at",
+    )
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __eq__(self, other):
+        if isinstance(other, CertificateRow):
+            return self.to_dict() == other.to_dict()
+        return NotImplemented
+
+    def __repr__(self):
+        return f"CertificateRow({self.to_dict()!r})"
+
+
+class CertificateView:
+    """Ordered selection of rows from a snapshot, supporting len/slicing/filter"""
+
+    __slots__ = ("_snapshot", "_positions")
+
+    def __init__(self, snapshot, positions):
+        self._snapshot = snapshot
+        self._positions = positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __iter__(self):
+        snapshot = self._snapshot
+        for index in self._positions:
+            yield CertificateRow(snapshot, index)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [CertificateRow(self._snapshot, i) for i in self._positions[item]]
+        return CertificateRow(self._snapshot, self._positions[item])
+
+    def get(self, cert_id):
+        """Row with the given id from the underlying snapshot, or None"""
+        return self._snapshot.get(cert_id)
+
+    def filter(
+        self, status=None, course_name=None, created_from=None, created_to=None
+    ):
+        """Return a view of the rows matching every given condition.
+
+        created_from is inclusive and created_to exclusive (datetimes).
+        """
+        snapshot = self._snapshot
+        checks = []
+        if status is not None:
+            code = snapshot._status_index.get(status)
+            if code is None:
+                return CertificateView(snapshot, array("q"))
+            checks.append((snapshot._status_code, code.__eq__))
+        if course_name is not None:
+            code = snapshot._course_index.get(course_name)
+            if code is None:
+                return CertificateView(snapshot, array("q"))
+            checks.append((snapshot._course_code, code.__eq__))
+        if created_from is not None:
+            low = to_epoch(created_from)
+            checks.append((snapshot._created_at, low.__le__))
+        if created_to is not None:
+            high = to_epoch(created_to)
+            checks.append((snapshot._created_at, high.__gt__))
+
+        positions = array(
+            "q",
+            (
+                i
+                for i in self._positions
+                if all(test(column[i]) for column, test in checks)
+            ),
+        )
+        return CertificateView(snapshot, positions)
+
+    def to_list(self):
+        return [row.to_dict() for row in self]
+
+
+class CertificateSnapshot:
+    """Columnar, id-ordered store of certificates.
+
+    Ids, student/course ids and timestamps live in `array` columns (epoch
+    seconds instead of datetime objects). Course names and statuses are
+    interned into small tables and stored as integer codes. Rows are kept
+    sorted by id, so lookups are a binary search and the usual case of new
+    ids being appended does not shift existing rows.
+    """
+
+    def __init__(self):
+        self._id = array("q")
+        self._student_id = array("q")
+        self._course_id = array("q")
+        self._created_at = array("q")
+        self._updated_at = array("q")
+        self._student_name = []
+        self._course_code = array("I")
+        self._status_code = array("H")
+        self._course_names = []
+        self._course_index = {}
+        self._statuses = []
+        self._status_index = {}
+        self._ordered = None
+
+    @classmethod
+    def from_rows(cls, rows):
+        snapshot = cls()
+        for row in sorted(rows, key=lambda row: row["id"]):
+            snapshot.upsert(row)
+        return snapshot
+
+    def __len__(self):
+        return len(self._id)
+
+    def __contains__(self, cert_id):
+        return self._find(cert_id) is not None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_ordered"] = None
+        return state
+
+    def copy(self):
+        """Independent copy, so changes do not affect views already handed out"""
+        other = CertificateSnapshot()
+        for name, value in self.__dict__.items():
+            if isinstance(value, (array, list)):
+                setattr(other, name, value[:])
+            elif isinstance(value, dict):
+                setattr(other, name, dict(value))
+        return other
+
+    def ids(self):
+        return self._id
+
+    def max_id(self):
+        return self._id[-1] if self._id else 0
+
+    def _find(self, cert_id):
+        index = bisect_left(self._id, cert_id)
+        if index < len(self._id) and self._id[index] == cert_id:
+            return index
+        return None
+
+    def get(self, cert_id):
+        """Return the row with the given id, or None"""
+        index = self._find(cert_id)
+        return CertificateRow(self, index) if index is not None else None
+
+    def _code(self, value, table, index):
+        code = index.get(value)
+        if code is None:
+            code = len(table)
+            table.append(value)
+            index[value] = code
+        return code
+
+    def _encode(self, row):
+        return (
+            _int(row["student_id"]),
+            _int(row["course_id"]),
+            to_epoch(row["created_at"]),
+            to_epoch(row.get("updated_at")),
+            sys.intern(row["student_name"]) if row["student_name"] else None,
+            self._code(row["course_name"], self._course_names, self._course_index),
+            self._code(row["status"], self._statuses, self._status_index),
+        )
+
+    def _decode(self, index):
+        return (
+            self._student_id[index],
+            self._course_id[index],
+            self._created_at[index],
+            self._updated_at[index],
+            self._student_name[index],
+            self._course_code[index],
+            self._status_code[index],
+        )
+
+    def upsert(self, row):
+        """Insert or update a row dict, returning True if anything changed"""
+        values = self._encode(row)
+        cert_id = row["id"]
+        index = bisect_left(self._id, cert_id)
+
+        if index < len(self._id) and self._id[index] == cert_id:
+            if self._decode(index) == values:
+                return False
+            (
+                self._student_id[index],
+                self._course_id[index],
+                self._created_at[index],
+                self._updated_at[index],
+                self._student_name[index],
+                self._course_code[index],
+                self._status_code[index],
+            ) = values
+        else:
+            self._id.insert(index, cert_id)
+            self._student_id.insert(index, values[0])
+            self._course_id.insert(index, values[1])
+            self._created_at.insert(index, values[2])
+            self._updated_at.insert(index, values[3])
+            self._student_name.insert(index, values[4])
+            self._course_code.insert(index, values[5])
+            self._status_code.insert(index, values[6])
+
+        self._ordered = None
+        return True
+
+    def remove(self, cert_id):
+        """Delete the row with the given id, returning True if it existed"""
+        index = self._find(cert_id)
+        if index is None:
+            return False
+        for column in (
+            self._id,
+            self._student_id,
+            self._course_id,
+            self._created_at,
+            self._updated_at,
+            self._student_name,
+            self._course_code,
+            self._status_code,
+        ):
+            del column[index]
+        self._ordered = None
+        return True
+
+    def status_day_counts(self, utc_offset=timedelta(0)):
+        """Counter of rows by (status, created_at date shifted by utc_offset)"""
+        shift = int(utc_offset.total_seconds())
+        days = Counter(
+            zip(
+                self._status_code,
+                (
+                    (created + shift) // 86400 if created != NULL else None
+                    for created in self._created_at
+                ),
+            )
+        )
+        epoch_day = EPOCH.date()
+        return Counter(
+            {
+                (self._statuses[code], epoch_day + timedelta(days=day)): count
+                for (code, day), count in days.items()
+                if day is not None
+            }
+        )
+
+    def same_row(self, other, cert_id):
+        """Compare one certificate between two snapshots"""
+        mine, theirs = self.get(cert_id), other.get(cert_id)
+        if mine is None or theirs is None:
+            return mine is theirs
+        return mine.to_dict() == theirs.to_dict()
+
+    def ordered(self):
+        """All rows ordered by (created_at, id), newest first"""
+        if self._ordered is None:
+            created, ids = self._created_at, self._id
+            self._ordered = CertificateView(
+                self,
+                array(
+                    "q",
+                    sorted(
+                        range(len(ids)),
+                        key=lambda i: (created[i], ids[i]),
+                        reverse=True,
+                    ),
+                ),
+            )
+        return self._ordered
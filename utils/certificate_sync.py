@@ -0,0 +1,240 @@
+import os
+import pickle
+import threading
+from datetime import datetime, timedelta
+
+from config.config import SYNC_CONFIG
+from utils.certificate_snapshot import CertificateSnapshot
+from utils.refresh_executor import raise_if_cancelled
+
+
+class CertificateSync:
+    """Keeps a local replica of the certificates table, keyed by id.
+
+    Each sync pulls only the rows whose (updated_at, id) is beyond the
+    persisted high-water mark and merges them into the replica. A full
+    resync reloads the table in id-ordered batches and only runs when
+    requested, when there is no replica yet, or when drift is detected.
+
+    The replica is a columnar CertificateSnapshot rather than one dict per
+    row, which keeps resident memory small on large tables.
+    """
+
+    def __init__(self, monitor, state_path=None):
+        self.monitor = monitor
+        self.state_path = state_path or SYNC_CONFIG["state_path"]
+        self.batch_size = SYNC_CONFIG["batch_size"]
+        self.overlap = timedelta(seconds=SYNC_CONFIG["overlap_seconds"])
+        self.drift_check_every = SYNC_CONFIG["drift_check_every"]
+
+        self.replica = CertificateSnapshot()
+        self.high_water_mark = None
+        self.cycles = 0
+        self.last_sync = None
+        self.last_mode = None
+        self._lock = threading.Lock()
+
+        self._load_state()
+
+    def _load_state(self):
+        """Load the replica and high-water mark persisted by a previous run"""
+        if not os.path.exists(self.state_path):
+            return
+
+        try:
+            with open(self.state_path, "rb") as f:
+                state = pickle.load(f)
+            replica = state["replica"]
+            if isinstance(replica, dict):
+                # State files written before the columnar snapshot.
+                replica = CertificateSnapshot.from_rows(replica.values())
+            self.replica = replica
+            self.high_water_mark = state["high_water_mark"]
+            print(f"[Sync] Loaded {len(self.replica)} certificates from state file.")
+        except Exception as e:
+            print(f"[Sync] Could not load state file, a full resync will run: {e}")
+            self.replica = CertificateSnapshot()
+            self.high_water_mark = None
+
+    def _save_state(self):
+        """Persist the replica and high-water mark atomically"""
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {"replica": self.replica, "high_water_mark": self.high_water_mark},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, self.state_path)
+
+    @property
+    def max_id(self):
+        return self.replica.max_id()
+
+    @staticmethod
+    def _advance(mark, row):
+        """Return the high-water mark moved forward to the given row"""
+        if row["updated_at"] is None:
+            return mark
+        row_mark = (row["updated_at"], row["id"])
+        if mark is None or row_mark > mark:
+            return row_mark
+        return mark
+
+    def _merge(self, replica, rows, mark):
+        """Merge fetched rows into a replica, returning the changed ids and mark"""
+        changed = []
+        for row in rows:
+            if replica.upsert(row):
+                changed.append(row["id"])
+            mark = self._advance(mark, row)
+        return changed, mark
+
+    def _full_resync(self):
+        """Reload the whole table in id-ordered batches"""
+        print("[Sync] Running full resync...")
+        replica = CertificateSnapshot()
+        previous = self.replica
+        # The mark is only kept with the replica it describes: a failed
+        # batch leaves both as they were.
+        mark = None
+        last_id = 0
+
+        while True:
+            rows = self.monitor.get_certificates_after_id(last_id, self.batch_size)
+            for row in rows:
+                replica.upsert(row)
+                mark = self._advance(mark, row)
+            if len(rows) < self.batch_size:
+                break
+            last_id = rows[-1]["id"]
+
+        changed = [
+            cert_id
+            for cert_id in replica.ids()
+            if not replica.same_row(previous, cert_id)
+        ]
+        removed = [cert_id for cert_id in previous.ids() if cert_id not in replica]
+
+        raise_if_cancelled()
+        self.replica = replica
+        self.high_water_mark = mark
+        print(f"[Sync] Full resync loaded {len(replica)} certificates.")
+        return changed, removed
+
+    def _incremental_sync(self, removed_ids=()):
+        """Pull rows changed since the high-water mark.
+
+        `removed_ids` are certificates known to be deleted (from the
+        binlog); polling alone only notices deletions as drift.
+        """
+        mark = self.high_water_mark
+        since, last_id = mark
+        # Re-read a small window behind the mark so rows committed late with
+        # an older updated_at are not missed. Merging is idempotent.
+        since = since - self.overlap
+        last_id = 0
+
+        # Views handed out by rows() may still be read by requests, so
+        # changes go to a copy that replaces the replica when complete.
+        replica = self.replica.copy()
+        removed = [cert_id for cert_id in removed_ids if replica.remove(cert_id)]
+        changed = []
+        while True:
+            rows = self.monitor.get_certificates_since(
+                since, last_id, self.batch_size
+            )
+            merged, mark = self._merge(replica, rows, mark)
+            changed.extend(merged)
+            if len(rows) < self.batch_size:
+                break
+            since, last_id = rows[-1]["updated_at"], rows[-1]["id"]
+
+        raise_if_cancelled()
+        if changed or removed:
+            self.replica = replica
+        self.high_water_mark = mark
+        return changed, removed
+
+    def _has_drift(self):
+        """Compare the remote row count and max id with the replica"""
+        fingerprint = self.monitor.get_certificates_fingerprint() or {}
+        total = fingerprint.get("total") or 0
+        max_id = fingerprint.get("max_id") or 0
+
+        if total != len(self.replica) or max_id != self.max_id:
+            print(
+                f"[Sync] Drift detected: remote {total} rows (max id {max_id}), "
+                f"local {len(self.replica)} rows (max id {self.max_id})."
+            )
+            return True
+        return False
+
+    def sync(self, full=False, removed_ids=(), check_drift=True):
+        """Synchronize the replica and return a summary of what changed"""
+        with self._lock:
+            if check_drift:
+                # Only polled syncs count towards the periodic drift check.
+                self.cycles += 1
+            removed = []
+            previous = self.replica
+
+            if full or not len(self.replica) or self.high_water_mark is None:
+                mode = "full"
+                changed, removed = self._full_resync()
+            else:
+                mode = "incremental"
+                changed, removed = self._incremental_sync(removed_ids)
+                if (
+                    check_drift
+                    and self.drift_check_every
+                    and self.cycles % self.drift_check_every == 0
+                ):
+                    if self._has_drift():
+                        mode = "full"
+                        more_changed, more_removed = self._full_resync()
+                        removed = list(set(removed) | set(more_removed))
+                        changed = list(set(changed) | set(more_changed))
+
+            if changed or removed or mode == "full":
+                self._save_state()
+
+            self.last_sync = datetime.now()
+            self.last_mode = mode
+            print(
+                f"[Sync] {mode.capitalize()} sync: {len(changed)} changed, "
+                f"{len(removed)} removed, {len(self.replica)} total."
+            )
+            return {
+                "mode": mode,
+                "changed": changed,
+                "removed": removed,
+                "total": len(self.replica),
+                "changes": self._changes(mode, previous, changed + removed),
+            }
+
+    def _changes(self, mode, previous, cert_ids):
+        """(old row, new row) pairs for an incremental sync.
+
+        None after a full resync, where consumers should rebuild from the
+        replica instead of walking a delta as large as the table.
+        """
+        if mode == "full":
+            return None
+        return [
+            (previous.get(cert_id), self.replica.get(cert_id))
+            for cert_id in dict.fromkeys(cert_ids)
+        ]
+
+    def rows(self):
+        """Return the replica ordered by created_at, newest first.
+
+        The result is a CertificateView: it supports len(), slicing and
+        filter(), and yields CertificateRow objects.
+        """
+        with self._lock:
+            return self.replica.ordered()
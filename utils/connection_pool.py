@@ -0,0 +1,96 @@
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available in time"""
+
+
+class ConnectionPool:
+    """Bounded pool of database connections.
+
+    Connections are created lazily through the `connect` callable, up to
+    `size` at a time. Callers wait up to `timeout` seconds for a free
+    connection once the pool is exhausted. Connections borrowed before the
+    last close_all() are closed when returned instead of being reused.
+    """
+
+    def __init__(self, connect, size=5, timeout=30):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._in_use = 0
+        self._generation = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """Borrow a connection, opening a new one if the pool has room.
+
+        `timeout` overrides the pool's wait for this call; 0 fails at once
+        when every connection is in use.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        deadline = time.monotonic() + timeout
+
+        with self._condition:
+            while True:
+                while self._idle:
+                    conn = self._idle.pop()
+                    if conn.open:
+                        self._in_use += 1
+                        return conn
+
+                if self._in_use < self.size:
+                    self._in_use += 1
+                    generation = self._generation
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"No database connection available after {timeout}s"
+                    )
+                self._condition.wait(remaining)
+
+        # Connect outside the lock so a slow handshake does not block others.
+        try:
+            conn = self.connect()
+            conn._pool_generation = generation
+            return conn
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, closing it if it is broken"""
+        with self._condition:
+            self._in_use -= 1
+            stale = getattr(conn, "_pool_generation", None) != self._generation
+            if discard or stale or not conn.open:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            else:
+                self._idle.append(conn)
+            self._condition.notify()
+
+    def close_all(self):
+        """Close every idle connection and retire the ones in use"""
+        with self._condition:
+            self._generation += 1
+            for conn in self._idle:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._idle = []
+
+    def stats(self):
+        """Return the number of idle and in-use connections"""
+        with self._condition:
+            return {"size": self.size, "idle": len(self._idle), "in_use": self._in_use}
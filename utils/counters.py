@@ -0,0 +1,193 @@
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from config.config import COUNTER_CONFIG
+from utils.mysql_monitor import LOCAL_UTC_OFFSET, daily_counts, day_range
+from utils.refresh_executor import raise_if_cancelled
+
+# Tables counted by id growth; deletions show up at reconciliation.
+COUNTED_TABLES = ("students", "team_members")
+
+
+def _local_day(created_at, utc_offset):
+    return (created_at + utc_offset).date()
+
+
+class CounterEngine:
+    """Dashboard counters kept up to date from deltas.
+
+    Certificate counters (total, per status and day, per local day) are
+    built once from the certificate replica and then adjusted with the
+    (old row, new row) pairs of each incremental sync, so new ids, status
+    changes and moved timestamps cost one update each. Students and team
+    members are counted by the rows added since the highest id seen.
+    Every `reconcile_every` cycles everything is recounted from scratch,
+    which also catches deleted students or team members.
+
+    Certificate syncs must go through sync_certificates(), so deltas are
+    applied in the same order the replica changed.
+    """
+
+    def __init__(self, monitor, certificate_sync):
+        self.monitor = monitor
+        self.certificate_sync = certificate_sync
+        self.reconcile_every = COUNTER_CONFIG["reconcile_every"]
+
+        self.total_certificates = 0
+        self.by_status_day = Counter()
+        self.by_local_day = Counter()
+        self.table_totals = {}
+        self.table_max_ids = {}
+        self.recent_templates = 0
+        self.cycles = 0
+        self.sync_cycles = 0
+        self.last_reconciled = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+        self.rebuild_certificates()
+
+    def rebuild_certificates(self):
+        """Recount the certificate counters from the whole replica"""
+        replica = self.certificate_sync.replica
+        by_status_day = replica.status_day_counts()
+        by_local_day = Counter()
+        for (_, day), count in replica.status_day_counts(LOCAL_UTC_OFFSET).items():
+            by_local_day[day] += count
+
+        with self._lock:
+            self.total_certificates = len(replica)
+            self.by_status_day = by_status_day
+            self.by_local_day = by_local_day
+
+    def _add(self, row, sign):
+        self.total_certificates += sign
+        if row.created_at is None:
+            return
+        self.by_status_day[(row.status, row.created_at.date())] += sign
+        self.by_local_day[_local_day(row.created_at, LOCAL_UTC_OFFSET)] += sign
+
+    def sync_certificates(self, full=False, removed_ids=(), check_drift=True):
+        """Sync the certificate replica and fold its changes into the counters.
+
+        Arguments are passed to CertificateSync.sync(); syncs without the
+        drift check (binlog-triggered ones) do not count towards
+        reconciliation either.
+        """
+        with self._sync_lock:
+            result = self.certificate_sync.sync(
+                full=full, removed_ids=removed_ids, check_drift=check_drift
+            )
+            if check_drift:
+                self.sync_cycles += 1
+            changes = result.get("changes")
+            if changes is None or (
+                check_drift
+                and self.reconcile_every
+                and self.sync_cycles % self.reconcile_every == 0
+            ):
+                self.rebuild_certificates()
+            else:
+                self._apply(changes)
+        return result
+
+    def _apply(self, changes):
+        """Subtract each old row and add each new one"""
+        with self._lock:
+            for old, new in changes:
+                if old is not None:
+                    self._add(old, -1)
+                if new is not None:
+                    self._add(new, +1)
+
+    def refresh_tables(self, hours=24):
+        """Update the student and team member counts, and recent templates.
+
+        Runs as a refresh stage. Every `reconcile_every` calls, the tables
+        are recounted in full.
+        """
+        # Refresh workers and manual full syncs may call this concurrently.
+        with self._lock:
+            self.cycles += 1
+            reconcile = not self.table_totals or bool(
+                self.reconcile_every and self.cycles % self.reconcile_every == 0
+            )
+            totals, max_ids = dict(self.table_totals), dict(self.table_max_ids)
+
+        for name in COUNTED_TABLES:
+            if reconcile:
+                result = self.monitor.get_table_total(name) or {}
+                totals[name] = result.get("total") or 0
+            else:
+                result = self.monitor.get_table_growth(name, max_ids.get(name, 0)) or {}
+                totals[name] = totals.get(name, 0) + (result.get("total") or 0)
+            max_ids[name] = result.get("max_id") or max_ids.get(name, 0)
+
+        recent_templates = self.monitor.get_recent_templates(hours)
+
+        raise_if_cancelled()
+        if reconcile:
+            self.last_reconciled = datetime.now()
+            print("[Counters] Reconciled table counters with full counts.")
+
+        with self._lock:
+            self.table_totals = totals
+            self.table_max_ids = max_ids
+            self.recent_templates = recent_templates
+        return {"reconciled": reconcile, **totals}
+
+    def refresh_templates(self, hours=24):
+        """Update only the recent templates count, for binlog-triggered refreshes"""
+        recent_templates = self.monitor.get_recent_templates(hours)
+        with self._lock:
+            self.recent_templates = recent_templates
+        return recent_templates
+
+    def total_counts(self, failed_tasks):
+        """Same keys as the total_counts query"""
+        with self._lock:
+            return {
+                "total_certificates": self.total_certificates,
+                "total_students": self.table_totals.get("students", 0),
+                "total_team_members": self.table_totals.get("team_members", 0),
+                "total_failed_tasks": failed_tasks,
+            }
+
+    def certificate_usage(self, days=30):
+        """Same rows as the certificate_usage query: per status and UTC day"""
+        first_day, _, _ = day_range(days, timedelta(0))
+        last_day = first_day + timedelta(days=days - 1)
+        with self._lock:
+            rows = [
+                {"status": status, "count": count, "date": day}
+                for (status, day), count in self.by_status_day.items()
+                if first_day <= day <= last_day and count
+            ]
+        rows.sort(key=lambda row: row["date"], reverse=True)
+        return rows
+
+    def certificates_by_day(self, days=7):
+        """Same rows as MySQLMonitor.get_certificates_by_day"""
+        first_day, _, _ = day_range(days, LOCAL_UTC_OFFSET)
+        with self._lock:
+            counts = dict(self.by_local_day)
+        return daily_counts(first_day, days, counts)
+
+    def recent_activity(self, hours=24):
+        """Same rows as the recent_activity query"""
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=hours)
+        certificates = 0
+        # Newest first, so only the recent rows are visited.
+        for row in self.certificate_sync.rows():
+            created_at = row.created_at
+            if created_at is None or created_at < cutoff:
+                break
+            certificates += 1
+
+        with self._lock:
+            templates = self.recent_templates
+        return [
+            {"tipo": "Certificados", "quantidade": certificates},
+            {"tipo": "Templates", "quantidade": templates},
+        ]
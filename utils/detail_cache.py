@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class DetailCache:
+    """Bounded LRU cache whose entries also expire after `ttl` seconds"""
+
+    def __init__(self, max_size=1000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        """Return the cached value, calling loader() on a miss.
+
+        Results carrying an "error" key are not cached.
+        """
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if not (isinstance(value, dict) and "error" in value):
+                self.set(key, value)
+        return value
+
+    def invalidate(self, keys):
+        """Drop the given keys"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Drop every entry whose value matches predicate(value)"""
+        with self._lock:
+            stale = [key for key, (value, _) in self._entries.items() if predicate(value)]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+
+CERTIFICATE_FIELDS = [
+    "id",
+    "student_id",
+    "course_id",
+    "student_name",
+    "course_name",
+    "status",
+    "created_at",
+    "updated_at",
+]
+
+FAILED_TASK_FIELDS = [
+    "id",
+    "student_name",
+    "course_name",
+    "has_certificate",
+    "cert_filename",
+    "attempts",
+    "updated_at",
+]
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _format_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(rows, fields, flush_every=500):
+    """Yield CSV text for rows, a header first and then chunks of lines"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([_format_value(row.get(field)) for field in fields])
+        if count % flush_every == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows, fields, flush_every=500):
+    """Yield newline-delimited JSON for rows, in chunks of lines"""
+    lines = []
+    for row in rows:
+        lines.append(
+            json.dumps(
+                {field: _format_value(row.get(field)) for field in fields},
+                ensure_ascii=False,
+                default=str,
+            )
+        )
+        if len(lines) >= flush_every:
+            yield "\n".join(lines) + "\n"
+            lines = []
+
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def iter_export(rows, fields, fmt):
+    """Serialize rows in the given format ("csv" or "ndjson")"""
+    if fmt == "csv":
+        return iter_csv(rows, fields)
+    return iter_ndjson(rows, fields)
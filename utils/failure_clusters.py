@@ -0,0 +1,106 @@
+import hashlib
+import re
+
+# Upper bounds of the attempts buckets; larger counts go to the last one.
+ATTEMPT_BUCKETS = ((1, "1"), (3, "2-3"), (9, "4-9"))
+LAST_ATTEMPT_BUCKET = "10+"
+
+# Log levels whose message can stand in for a missing payload error.
+ERROR_LEVELS = {"ERROR", "CRITICAL", "ALERT", "EMERGENCY"}
+
+# Longest signature kept, after normalization.
+MAX_SIGNATURE_LENGTH = 160
+
+NO_ERROR = "(sem erro registrado)"
+
+# Variable parts of error messages, replaced so that the same cause gives
+# the same signature: quoted values, paths, UUIDs/hashes and numbers.
+_VARIABLE_PARTS = [
+    (re.compile(r"'[^']*'|\"[^\"]*\""), "'?'"),
+    (re.compile(r"(?:[A-Za-z]:)?(?:/[\w.-]+){2,}"), "<path>"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.I), "<uuid>"),
+    (re.compile(r"\b[0-9a-f]{16,}\b", re.I), "<hash>"),
+    (re.compile(r"\d+"), "N"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def error_signature(message):
+    """The error message with its variable parts replaced"""
+    if not message:
+        return NO_ERROR
+    signature = message.strip().splitlines()[0]
+    for pattern, replacement in _VARIABLE_PARTS:
+        signature = pattern.sub(replacement, signature)
+    return signature[:MAX_SIGNATURE_LENGTH]
+
+
+def attempts_bucket(attempts):
+    attempts = attempts or 0
+    for limit, label in ATTEMPT_BUCKETS:
+        if attempts <= limit:
+            return label
+    return LAST_ATTEMPT_BUCKET
+
+
+def task_error(task, log_events=None):
+    """The task's error: from its payload, else its latest error log event"""
+    if task.get("error"):
+        return task["error"]
+    if log_events is not None:
+        for event in log_events(task["id"]):
+            if event["level"] in ERROR_LEVELS:
+                return event["message"]
+    return None
+
+
+def cluster_id(course_name, template_id, signature, attempts):
+    key = "\x1f".join(str(part) for part in (course_name, template_id, signature, attempts))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def task_cluster(task, log_events=None):
+    """(cluster id, key fields) of one failed task"""
+    fields = {
+        "course_name": task.get("course_name") or "N/A",
+        "template_id": task.get("template_id"),
+        "signature": error_signature(task_error(task, log_events)),
+        "attempts": attempts_bucket(task.get("attempts")),
+    }
+    return cluster_id(**fields), fields
+
+
+def cluster_failures(failed_tasks, log_events=None):
+    """Group failed tasks by course, template, error signature and attempts.
+
+    One pass over the tasks (already decoded by the failed_tasks stage).
+    Clusters are sorted by size; each keeps its task ids in the order of
+    `failed_tasks` (newest first) for drill-down.
+    """
+    clusters = {}
+    for task in failed_tasks:
+        key, fields = task_cluster(task, log_events)
+        cluster = clusters.get(key)
+        if cluster is None:
+            cluster = clusters[key] = {
+                "id": key,
+                **fields,
+                "example": task_error(task, log_events),
+                "count": 0,
+                "first_at": None,
+                "last_at": None,
+                "task_ids": [],
+            }
+        cluster["count"] += 1
+        cluster["task_ids"].append(task["id"])
+        updated_at = task.get("updated_at")
+        if updated_at is not None:
+            if cluster["first_at"] is None or updated_at < cluster["first_at"]:
+                cluster["first_at"] = updated_at
+            if cluster["last_at"] is None or updated_at > cluster["last_at"]:
+                cluster["last_at"] = updated_at
+
+    return sorted(
+        clusters.values(),
+        key=lambda cluster: (-cluster["count"], cluster["course_name"], cluster["id"]),
+    )
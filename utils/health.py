@@ -0,0 +1,96 @@
+import threading
+import time
+from datetime import datetime
+
+from config.config import HEALTH_CONFIG
+
+
+class HealthMonitor:
+    """Serves integrity check results from memory.
+
+    Results are computed by `refresh()`, which runs as a refresh stage on
+    the scheduler. Requests read the cached results together with their
+    age. A forced refresh from a request is allowed at most once every
+    `force_interval` seconds.
+    """
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self.max_age = HEALTH_CONFIG["max_age"]
+        self.force_interval = HEALTH_CONFIG["force_interval"]
+
+        self.integrity_checks = None
+        self.checked_at = None
+        self.error = None
+        self._checked_monotonic = None
+        self._last_forced = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self):
+        """Run the integrity checks and cache their results"""
+        with self._refresh_lock:
+            try:
+                results = self.monitor.check_data_integrity()
+            except Exception as e:
+                with self._lock:
+                    self.error = f"{type(e).__name__}: {e}"
+                raise
+
+            with self._lock:
+                self.integrity_checks = results
+                self.checked_at = datetime.now()
+                self._checked_monotonic = time.monotonic()
+                self.error = None
+            return results
+
+    def force_refresh(self):
+        """Refresh on request, unless one was forced too recently.
+
+        Returns (refreshed, retry_after_seconds, error): refreshed is False
+        when rate limited or when the checks failed, with the error message.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (
+                self._last_forced is not None
+                and now - self._last_forced < self.force_interval
+            ):
+                retry_after = int(self.force_interval - (now - self._last_forced)) + 1
+                return False, retry_after, None
+            self._last_forced = now
+
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"[Health] Forced integrity refresh failed: {e}")
+            return False, 0, f"{type(e).__name__}: {e}"
+        return True, 0, None
+
+    def status(self):
+        """Cached integrity results with their age and staleness"""
+        with self._lock:
+            if self.integrity_checks is None:
+                return {
+                    "status": "unknown",
+                    "integrity_checks": {},
+                    "checked_at": None,
+                    "age_seconds": None,
+                    "stale": True,
+                    "error": self.error,
+                }
+
+            age = time.monotonic() - self._checked_monotonic
+            healthy = all(v == 0 for v in self.integrity_checks.values())
+            return {
+                "status": "healthy" if healthy else "issues",
+                "integrity_checks": self.integrity_checks,
+                "checked_at": self.checked_at.strftime("%d/%m/%Y %H:%M:%S"),
+                "age_seconds": int(age),
+                "stale": age > self.max_age,
+                "error": self.error,
+            }
+
+    def liveness(self):
+        """Ping the tunnel and one database connection, nothing else"""
+        return self.monitor.ping()
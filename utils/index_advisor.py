@@ -0,0 +1,168 @@
+import re
+import threading
+from datetime import datetime
+
+from config.config import INDEX_ADVISOR_CONFIG
+from config.queries import MONITORING_QUERIES, RECOMMENDED_INDEXES
+
+# Queries that are not worth explaining: metadata lookups, SHOW statements
+# and writes.
+SKIPPED_QUERIES = {
+    "table_sizes",
+    "innodb_table_stats",
+    "index_columns",
+    "binlog_settings",
+    "binlog_status",
+    "requeue_tasks",
+    "approximate_counts.certificates",
+    "approximate_counts.failed_tasks",
+}
+
+# Queries that read whole tables by design (full lists, exports, checks).
+FULL_SCAN_QUERIES = {
+    "certificates",
+    "exports.certificates",
+    "exports.tasks",
+    "integrity_checks.certificados_sem_template",
+    "integrity_checks.templates_invalidos",
+}
+
+# Values used for named parameters when explaining a query.
+SAMPLE_PARAMS = {
+    "ids": (0,),
+    "limit": 10,
+    "hours": 24,
+    "last_id": 0,
+    "id": 0,
+}
+
+
+def _explainable_queries(queries=MONITORING_QUERIES, prefix=""):
+    """Yield (name, sql) for every SQL statement in MONITORING_QUERIES"""
+    for key, value in queries.items():
+        name = f"{prefix}{key}"
+        if name in SKIPPED_QUERIES:
+            continue
+        if isinstance(value, str):
+            yield name, value
+        elif isinstance(value, dict) and "query" in value:
+            yield name, value["query"].format(filters="")
+        elif isinstance(value, dict):
+            yield from _explainable_queries(value, f"{name}.")
+
+
+def _sample_params(sql):
+    """Parameters that let the query be explained, matching its placeholders"""
+    names = re.findall(r"%\((\w+)\)s", sql)
+    if names:
+        now = datetime.now().replace(microsecond=0)
+        return {name: SAMPLE_PARAMS.get(name, now) for name in names}
+    return (0,) * sql.count("%s") or None
+
+
+class IndexAdvisor:
+    """Warns about indexes the monitoring queries need but cannot use.
+
+    Two checks run once at startup: every table in RECOMMENDED_INDEXES must
+    have an index whose leading columns match, and EXPLAIN of every
+    monitoring query must not show a full scan of a large table (except
+    the queries that read whole tables by design).
+    """
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self.min_rows = INDEX_ADVISOR_CONFIG["min_rows"]
+        self.warnings = []
+        self.checked_at = None
+        self._lock = threading.Lock()
+
+    def check_indexes(self):
+        tables = tuple({index["table"] for index in RECOMMENDED_INDEXES})
+        with self.monitor._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["index_columns"], {"tables": tables})
+            rows = cursor.fetchall()
+
+        existing = {}
+        for row in rows:
+            key = (row["table_name"], row["index_name"])
+            existing.setdefault(key, []).append(row["column_name"].lower())
+
+        warnings = []
+        for index in RECOMMENDED_INDEXES:
+            columns = list(index["columns"])
+            found = any(
+                table == index["table"] and index_columns[: len(columns)] == columns
+                for (table, _), index_columns in existing.items()
+            )
+            if not found:
+                warnings.append(
+                    {
+                        "table": index["table"],
+                        "message": (
+                            f"missing index on ({', '.join(columns)}), "
+                            f"used by {index['queries']}"
+                        ),
+                    }
+                )
+        return warnings
+
+    def explain_queries(self):
+        warnings = []
+        with self.monitor._cursor() as cursor:
+            for name, sql in _explainable_queries():
+                try:
+                    cursor.execute(f"EXPLAIN {sql}", _sample_params(sql), name="explain")
+                    plan = cursor.fetchall()
+                except Exception as e:
+                    warnings.append({"query": name, "message": f"EXPLAIN failed: {e}"})
+                    continue
+
+                if name in FULL_SCAN_QUERIES:
+                    continue
+                for step in plan:
+                    table = step.get("table") or ""
+                    rows = step.get("rows") or 0
+                    # Derived tables and CTEs show up as <derivedN>, <unionN,M>.
+                    if step.get("type") == "ALL" and not table.startswith("<"):
+                        if rows >= self.min_rows:
+                            warnings.append(
+                                {
+                                    "query": name,
+                                    "message": (
+                                        f"full scan of {table} (~{rows} rows)"
+                                    ),
+                                }
+                            )
+        return warnings
+
+    def run(self):
+        """Run both checks and print a warning for each problem found"""
+        print("[Index] Checking indexes used by the monitoring queries...")
+        warnings = []
+        for check in (self.check_indexes, self.explain_queries):
+            try:
+                warnings.extend(check())
+            except Exception as e:
+                print(f"[Index] Check {check.__name__} failed: {e}")
+
+        for warning in warnings:
+            where = warning.get("query") or warning.get("table")
+            print(f"[Index] WARNING {where}: {warning['message']}")
+        if not warnings:
+            print("[Index] No index problems found.")
+
+        with self._lock:
+            self.warnings = warnings
+            self.checked_at = datetime.now()
+        return warnings
+
+    def status(self):
+        with self._lock:
+            return {
+                "index_warnings": list(self.warnings),
+                "index_checked_at": (
+                    self.checked_at.strftime("%d/%m/%Y %H:%M:%S")
+                    if self.checked_at
+                    else None
+                ),
+            }
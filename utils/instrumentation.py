@@ -0,0 +1,368 @@
+import inspect
+import math
+import threading
+import time
+
+import pymysql
+
+from config.queries import MONITORING_QUERIES
+
+# Latency histogram buckets, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _query_names(queries, prefix=""):
+    """Map each SQL string in MONITORING_QUERIES to its dotted name"""
+    names = {}
+    for key, value in queries.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, str):
+            names[value] = name
+        elif isinstance(value, dict):
+            names.update(_query_names(value, f"{name}."))
+    return names
+
+
+QUERY_NAMES = _query_names(MONITORING_QUERIES)
+
+
+class CountingConnection(pymysql.connections.Connection):
+    """pymysql connection that counts the bytes it reads from the server"""
+
+    bytes_received = 0
+
+    def _read_bytes(self, num_bytes):
+        data = super()._read_bytes(num_bytes)
+        self.bytes_received += len(data)
+        return data
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, cumulative count) pairs, ending with +Inf"""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+class QueryMetrics:
+    """Latency, rows, bytes and errors recorded per named query"""
+
+    def __init__(self):
+        self._queries = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, rows=0, bytes_received=0, error=None):
+        with self._lock:
+            entry = self._queries.get(name)
+            if entry is None:
+                entry = self._queries[name] = {
+                    "latency": Histogram(),
+                    "rows": 0,
+                    "bytes": 0,
+                }
+            entry["latency"].observe(seconds)
+            entry["rows"] += rows
+            entry["bytes"] += bytes_received
+            if error is not None:
+                key = (name, error)
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    def snapshot(self):
+        """Copy of the recorded figures, safe to read without the lock"""
+        with self._lock:
+            queries = {
+                name: {
+                    "buckets": entry["latency"].cumulative(),
+                    "sum": entry["latency"].sum,
+                    "count": entry["latency"].count,
+                    "rows": entry["rows"],
+                    "bytes": entry["bytes"],
+                }
+                for name, entry in self._queries.items()
+            }
+            return queries, dict(self._errors)
+
+    def summary(self):
+        """Calls, mean latency, rows and errors per query, for JSON output"""
+        queries, errors = self.snapshot()
+        error_totals = {}
+        for (name, _), count in errors.items():
+            error_totals[name] = error_totals.get(name, 0) + count
+        return {
+            name: {
+                "calls": entry["count"],
+                "mean_ms": (
+                    round(entry["sum"] / entry["count"] * 1000, 1)
+                    if entry["count"]
+                    else None
+                ),
+                "rows": entry["rows"],
+                "bytes": entry["bytes"],
+                "errors": error_totals.get(name, 0),
+            }
+            for name, entry in sorted(queries.items())
+        }
+
+
+class InstrumentedCursor:
+    """Wraps a pymysql cursor and records every query it runs.
+
+    A query is named after its MONITORING_QUERIES key, or the `name` passed
+    to execute(). Its latency covers execute() and every fetch until the
+    next execute() or close(), which matters for unbuffered cursors where
+    rows arrive while fetching.
+    """
+
+    def __init__(self, cursor, metrics):
+        self._cursor = cursor
+        self._metrics = metrics
+        self._pending = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _bytes(self):
+        return getattr(self._cursor.connection, "bytes_received", 0)
+
+    def _timed(self, func, *args):
+        pending = self._pending
+        started = time.perf_counter()
+        before = self._bytes()
+        try:
+            return func(*args)
+        except Exception as e:
+            if pending is not None:
+                pending["error"] = type(e).__name__
+            raise
+        finally:
+            if pending is not None:
+                pending["seconds"] += time.perf_counter() - started
+                pending["bytes"] += self._bytes() - before
+
+    def finish(self):
+        """Record the pending query, if any"""
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            self._metrics.observe(
+                pending["name"],
+                pending["seconds"],
+                rows=pending["rows"],
+                bytes_received=pending["bytes"],
+                error=pending["error"],
+            )
+
+    def execute(self, query, args=None, name=None):
+        self.finish()
+        self._pending = {
+            "name": name or QUERY_NAMES.get(query, "other"),
+            "seconds": 0.0,
+            "rows": 0,
+            "bytes": 0,
+            "error": None,
+        }
+        try:
+            return self._timed(self._cursor.execute, query, args)
+        except Exception:
+            self.finish()
+            raise
+
+    def _count(self, rows):
+        if self._pending is not None:
+            self._pending["rows"] += rows
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        self._count(1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(self._cursor.fetchmany, size)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._count(len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self.finish()
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncInstrumentedCursor(InstrumentedCursor):
+    """InstrumentedCursor for aiomysql/asyncmy cursors, whose I/O is awaited"""
+
+    async def _timed_async(self, func, *args):
+        pending = self._pending
+        started = time.perf_counter()
+        before = self._bytes()
+        try:
+            return await func(*args)
+        except Exception as e:
+            if pending is not None:
+                pending["error"] = type(e).__name__
+            raise
+        finally:
+            if pending is not None:
+                pending["seconds"] += time.perf_counter() - started
+                pending["bytes"] += self._bytes() - before
+
+    async def execute(self, query, args=None, name=None):
+        self.finish()
+        self._pending = {
+            "name": name or QUERY_NAMES.get(query, "other"),
+            "seconds": 0.0,
+            "rows": 0,
+            "bytes": 0,
+            "error": None,
+        }
+        try:
+            return await self._timed_async(self._cursor.execute, query, args)
+        except Exception:
+            self.finish()
+            raise
+
+    async def fetchone(self):
+        row = await self._timed_async(self._cursor.fetchone)
+        self._count(1 if row is not None else 0)
+        return row
+
+    async def fetchmany(self, size=None):
+        rows = await self._timed_async(self._cursor.fetchmany, size)
+        self._count(len(rows))
+        return rows
+
+    async def fetchall(self):
+        rows = await self._timed_async(self._cursor.fetchall)
+        self._count(len(rows))
+        return rows
+
+    async def close(self):
+        self.finish()
+        closed = self._cursor.close()
+        if inspect.isawaitable(closed):
+            await closed
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+def _escape(value):
+    return (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+def _labels(**labels):
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + pairs + "}" if pairs else ""
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class PrometheusWriter:
+    """Builds a Prometheus text exposition (format 0.0.4)"""
+
+    def __init__(self, prefix="certificates_monitor_"):
+        self.prefix = prefix
+        self.lines = []
+
+    def metric(self, name, kind, help_text, samples):
+        """Write one family; samples are (labels dict, value) pairs"""
+        name = self.prefix + name
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            if value is None:
+                continue
+            self.lines.append(f"{name}{_labels(**labels)} {_number(value)}")
+
+    def histogram(self, name, help_text, series):
+        """Write a histogram family; series are (labels, buckets, sum, count)"""
+        name = self.prefix + name
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for labels, buckets, total, count in series:
+            for bound, cumulative in buckets:
+                self.lines.append(
+                    f"{name}_bucket{_labels(**labels, le=_number(bound))} {cumulative}"
+                )
+            self.lines.append(f"{name}_sum{_labels(**labels)} {_number(total)}")
+            self.lines.append(f"{name}_count{_labels(**labels)} {count}")
+
+    def query_metrics(self, metrics):
+        queries, errors = metrics.snapshot()
+        self.histogram(
+            "query_duration_seconds",
+            "Time spent executing and fetching each named query.",
+            [
+                ({"query": name}, entry["buckets"], entry["sum"], entry["count"])
+                for name, entry in sorted(queries.items())
+            ],
+        )
+        self.metric(
+            "query_rows_total",
+            "counter",
+            "Rows returned by each named query.",
+            [({"query": name}, entry["rows"]) for name, entry in sorted(queries.items())],
+        )
+        self.metric(
+            "query_bytes_total",
+            "counter",
+            "Bytes read from the server for each named query.",
+            [({"query": name}, entry["bytes"]) for name, entry in sorted(queries.items())],
+        )
+        self.metric(
+            "query_errors_total",
+            "counter",
+            "Failed executions of each named query, by exception type.",
+            [
+                ({"query": name, "error": error}, count)
+                for (name, error), count in sorted(errors.items())
+            ],
+        )
+
+    def render(self):
+        return "\n".join(self.lines) + "\n"
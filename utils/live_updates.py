@@ -0,0 +1,134 @@
+import queue
+import threading
+
+# Fields of a new failed task sent to the browser.
+FAILED_TASK_FIELDS = ("id", "student_name", "course_name", "updated_at")
+
+
+def _changed_keys(old, new):
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+
+def dashboard_state(data):
+    """Everything the dashboard patches, sent when a browser (re)connects"""
+    return {
+        "total_counts": data.get("total_counts") or {},
+        "certificates_by_day": data.get("certificates_by_day") or [],
+        "integrity_checks": data.get("integrity_checks") or {},
+        "table_stats": data.get("table_stats") or [],
+        "last_update": data.get("last_update"),
+        "status": data.get("status"),
+    }
+
+
+def dashboard_diff(old, new):
+    """What changed on the dashboard between two refreshes.
+
+    Counters and integrity checks carry only the keys that changed, the
+    daily chart only the days that are new or changed, failed tasks the
+    new and resolved ids. Table stats are small and sent whole when any
+    row changed.
+    """
+    diff = {"last_update": new.get("last_update"), "status": new.get("status")}
+
+    counts = _changed_keys(old.get("total_counts") or {}, new.get("total_counts") or {})
+    if counts:
+        diff["total_counts"] = counts
+
+    old_days = {day["date_full"]: day["count"] for day in old.get("certificates_by_day") or []}
+    days = [
+        day
+        for day in new.get("certificates_by_day") or []
+        if old_days.get(day["date_full"]) != day["count"]
+    ]
+    if days:
+        diff["certificates_by_day"] = days
+
+    checks = _changed_keys(
+        old.get("integrity_checks") or {}, new.get("integrity_checks") or {}
+    )
+    if checks:
+        diff["integrity_checks"] = checks
+
+    if (old.get("table_stats") or []) != (new.get("table_stats") or []):
+        diff["table_stats"] = new.get("table_stats") or []
+
+    old_tasks = {task["id"] for task in old.get("failed_tasks") or []}
+    new_tasks = new.get("failed_tasks") or []
+    new_ids = {task["id"] for task in new_tasks}
+    added = [
+        {field: task.get(field) for field in FAILED_TASK_FIELDS}
+        for task in new_tasks
+        if task["id"] not in old_tasks
+    ]
+    resolved = sorted(old_tasks - new_ids)
+    # Until failed tasks are first loaded, every existing one would look new.
+    loaded = (old.get("section_generations") or {}).get("failed_tasks")
+    if (added or resolved) and loaded:
+        diff["failed_tasks"] = {"added": added, "resolved": resolved}
+
+    return diff
+
+
+class Broadcaster:
+    """Fans Server-Sent Events out to every connected browser.
+
+    Each event is formatted once and put on every subscriber's queue, so
+    the cost of a refresh does not grow with the number of open
+    dashboards beyond a queue put. A subscriber that falls `queue_size`
+    events behind is dropped; its EventSource reconnects and gets the
+    current state again.
+    """
+
+    def __init__(self, max_clients=100, queue_size=16):
+        self.max_clients = max_clients
+        self.queue_size = queue_size
+        self.published = 0
+        self.dropped = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Return a new subscriber queue, or None when at max_clients"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            subscriber = queue.Queue(maxsize=self.queue_size)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def clients(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event, data, event_id=None):
+        """Send one event, `data` being its already serialized JSON"""
+        message = format_event(event, data, event_id)
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += 1
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                self.unsubscribe(subscriber)
+                self.dropped += 1
+                # Make room for the None that tells the stream to close.
+                with subscriber.mutex:
+                    subscriber.queue.clear()
+                subscriber.put_nowait(None)
+
+
+def format_event(event, data, event_id=None):
+    """One SSE message; `data` must not contain newlines (compact JSON)"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
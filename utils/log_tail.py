@@ -0,0 +1,350 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import deque
+from datetime import datetime
+
+from config.config import LOG_TAIL_CONFIG
+from utils.ssh_client import open_ssh_client
+
+# Bytes at the start of a file that identify it across polls. A different
+# head means the path now points to a new file (rotated by rename).
+FINGERPRINT_BYTES = 1024
+
+# Stack trace lines kept per event.
+MAX_CONTEXT_LINES = 20
+
+# Start of a log entry, e.g. "[2025-01-31 12:00:00] production.ERROR: ..."
+# (Laravel/Monolog), "[2025-01-31 12:00:00][42] Processing: App\Jobs\X"
+# (queue worker) or "2025-01-31 12:00:00 App\Jobs\X .... FAIL".
+ENTRY_START = re.compile(
+    r"^\[?(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2})[^\]\s]*\]?\s*(?:\[\d+\]\s*)?(.*)$"
+)
+MONOLOG = re.compile(r"^(?P<channel>[\w-]+)\.(?P<level>[A-Z]+):\s?(?P<message>.*)$")
+LEVEL = re.compile(
+    r"\b(EMERGENCY|ALERT|CRITICAL|ERROR|WARNING|NOTICE|INFO|DEBUG)\b", re.IGNORECASE
+)
+# Queue worker job states and the level they are reported with.
+WORKER_STATES = {
+    "failed": "ERROR",
+    "fail": "ERROR",
+    "processing": "INFO",
+    "processed": "INFO",
+    "running": "INFO",
+    "done": "INFO",
+}
+WORKER_STATE = re.compile(r"\b(Failed|FAIL|Processing|Processed|RUNNING|DONE)\b")
+
+
+def parse_entry(line, task_id_pattern):
+    """Structured event for the first line of a log entry, None otherwise"""
+    match = ENTRY_START.match(line)
+    if not match:
+        return None
+    timestamp, rest = match.groups()
+
+    channel = None
+    monolog = MONOLOG.match(rest)
+    if monolog:
+        channel, level, message = monolog.group("channel", "level", "message")
+    else:
+        message = rest
+        state = WORKER_STATE.search(rest)
+        level = LEVEL.search(rest)
+        if state:
+            level = WORKER_STATES[state.group(1).lower()]
+        else:
+            level = level.group(1).upper() if level else "INFO"
+
+    return {
+        "time": timestamp.replace("T", " "),
+        "level": level,
+        "channel": channel,
+        "message": message,
+        "context": [],
+        "task_ids": sorted({int(i) for i in task_id_pattern.findall(line)}),
+    }
+
+
+class LogTailer:
+    """Follows worker/queue logs on the server over one SFTP session.
+
+    Each poll reads only the bytes appended since the last one, up to
+    `max_read_bytes` per file, starting from the saved offset. Rotation is
+    detected by the file's head (FINGERPRINT_BYTES) changing or the file
+    shrinking; after a rename, the rest of the old file is read from
+    `{path}.1` first. Offsets are saved so a restart resumes where it
+    stopped.
+
+    Lines are parsed into events (time, level, channel, message, stack
+    trace as context) and linked to tasks_queue ids found with
+    `task_id_pattern`. The last `max_events` events are kept in memory.
+    """
+
+    def __init__(self):
+        self.paths = LOG_TAIL_CONFIG["paths"]
+        self.enabled = bool(self.paths)
+        self.state_path = LOG_TAIL_CONFIG["state_path"]
+        self.max_read_bytes = LOG_TAIL_CONFIG["max_read_bytes"]
+        self.initial_bytes = LOG_TAIL_CONFIG["initial_bytes"]
+        self.task_id_pattern = re.compile(
+            LOG_TAIL_CONFIG["task_id_pattern"], re.IGNORECASE
+        )
+
+        self.events = deque(maxlen=LOG_TAIL_CONFIG["max_events"])
+        self.by_task = {}
+        self.files = {}
+        self.bytes_read = 0
+        self.events_parsed = 0
+        self.rotations = 0
+        self.last_poll = None
+        self.error = None
+        self.changed = False
+        self._client = None
+        self._sftp = None
+        self._last_event = {}
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+
+        self._load_state()
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path) as f:
+                self.files = json.load(f)
+        except Exception as e:
+            print(f"[Logs] Could not load log offsets, starting from the end: {e}")
+
+    def _save_state(self):
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.files, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _sftp_client(self):
+        """The SFTP session, reopened if its SSH transport dropped"""
+        transport = self._client.get_transport() if self._client else None
+        if self._sftp is None or transport is None or not transport.is_active():
+            self.close()
+            self._client = open_ssh_client()
+            self._sftp = self._client.open_sftp()
+            print("[Logs] SFTP session opened.")
+        return self._sftp
+
+    def close(self):
+        for resource in (self._sftp, self._client):
+            if resource is not None:
+                try:
+                    resource.close()
+                except Exception:
+                    pass
+        self._sftp = None
+        self._client = None
+
+    def poll(self):
+        """Read what was appended to every followed file since the last poll"""
+        if not self.enabled:
+            return 0
+        with self._poll_lock:
+            new_events = 0
+            try:
+                sftp = self._sftp_client()
+                for path in self.paths:
+                    new_events += self._poll_file(sftp, path)
+                self.error = None
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                print(f"[Logs] Error following logs: {self.error}")
+                self.close()
+            finally:
+                self.last_poll = datetime.now()
+                try:
+                    self._save_state()
+                except Exception as e:
+                    print(f"[Logs] Could not save log offsets: {e}")
+            return new_events
+
+    @staticmethod
+    def _fingerprint(sftp, path, size):
+        with sftp.open(path, "rb") as f:
+            return f.read(min(size, FINGERPRINT_BYTES))
+
+    def _poll_file(self, sftp, path):
+        try:
+            size = sftp.stat(path).st_size
+        except FileNotFoundError:
+            # Between a rotation and the creation of the new file.
+            return 0
+
+        head = self._fingerprint(sftp, path, size)
+        state = self.files.get(path)
+        new_events = 0
+
+        if state is None:
+            # First time: only the end of the file.
+            state = {"offset": max(size - self.initial_bytes, 0)}
+            if state["offset"]:
+                # Skip the partial line the offset falls into.
+                with sftp.open(path, "rb") as f:
+                    f.seek(state["offset"])
+                    partial = f.readline()
+                state["offset"] += len(partial)
+        else:
+            known = state.get("head_length", 0)
+            same_head = len(head) >= known and (
+                hashlib.sha1(head[:known]).hexdigest() == state.get("head")
+            )
+            if not same_head or size < state["offset"]:
+                self.rotations += 1
+                print(f"[Logs] {path} was rotated or truncated.")
+                if not same_head:
+                    new_events += self._drain_rotated(sftp, path, state)
+                self._last_event.pop(path, None)
+                state = {"offset": 0}
+
+        state["head"] = hashlib.sha1(head).hexdigest()
+        state["head_length"] = len(head)
+
+        if size > state["offset"]:
+            with sftp.open(path, "rb") as f:
+                f.seek(state["offset"])
+                data = f.read(min(size - state["offset"], self.max_read_bytes))
+            consumed, events = self._consume(path, data)
+            state["offset"] += consumed
+            new_events += events
+        state["size"] = size
+        self.files[path] = state
+        return new_events
+
+    def _drain_rotated(self, sftp, path, state):
+        """Read the unread end of a file renamed to `{path}.1`"""
+        rotated = f"{path}.1"
+        try:
+            size = sftp.stat(rotated).st_size
+            head = self._fingerprint(sftp, rotated, size)
+        except FileNotFoundError:
+            return 0
+        known = state.get("head_length", 0)
+        if hashlib.sha1(head[:known]).hexdigest() != state.get("head"):
+            return 0
+        if size <= state["offset"]:
+            return 0
+        with sftp.open(rotated, "rb") as f:
+            f.seek(state["offset"])
+            data = f.read(min(size - state["offset"], self.max_read_bytes))
+        # The file is complete, so a last line without newline is taken too.
+        if not data.endswith(b"\n"):
+            data += b"\n"
+        return self._consume(path, data)[1]
+
+    def _consume(self, path, data):
+        """Parse complete lines; returns (bytes consumed, new events)"""
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            if len(data) < self.max_read_bytes:
+                # Wait for the rest of the line.
+                return 0, 0
+            # A single line longer than a whole read: take it as is.
+            end = len(data)
+        self.bytes_read += end
+
+        events = 0
+        last = self._last_event.get(path)
+        for raw in data[:end].splitlines():
+            line = raw.decode("utf-8", errors="replace").rstrip()
+            if not line:
+                continue
+            event = parse_entry(line, self.task_id_pattern)
+            if event is not None:
+                event["file"] = path
+                self._add(event)
+                last = event
+                events += 1
+            elif last is not None:
+                self._extend(last, line)
+        self._last_event[path] = last
+        self.events_parsed += events
+        if events:
+            self.changed = True
+        return end, events
+
+    def _add(self, event):
+        with self._lock:
+            if len(self.events) == self.events.maxlen:
+                self._unlink(self.events[0])
+            self.events.append(event)
+            for task_id in event["task_ids"]:
+                self.by_task.setdefault(task_id, []).append(event)
+
+    def _unlink(self, event):
+        for task_id in event["task_ids"]:
+            linked = self.by_task.get(task_id)
+            if linked:
+                linked[:] = [e for e in linked if e is not event]
+                if not linked:
+                    del self.by_task[task_id]
+
+    def _extend(self, event, line):
+        """Attach a continuation line (e.g. a stack trace) to its event"""
+        with self._lock:
+            if len(event["context"]) < MAX_CONTEXT_LINES:
+                event["context"].append(line)
+            for task_id in {int(i) for i in self.task_id_pattern.findall(line)}:
+                if task_id not in event["task_ids"]:
+                    event["task_ids"].append(task_id)
+                    self.by_task.setdefault(task_id, []).append(event)
+        self.changed = True
+
+    def replace(self, events):
+        """Load events parsed elsewhere (web workers, from the refresher)"""
+        with self._lock:
+            self.events.clear()
+            self.by_task = {}
+            for event in events:
+                self.events.append(event)
+                for task_id in event["task_ids"]:
+                    self.by_task.setdefault(task_id, []).append(event)
+
+    def export(self):
+        """Copy of the kept events, and clears the changed flag"""
+        with self._lock:
+            self.changed = False
+            return [dict(event, context=list(event["context"])) for event in self.events]
+
+    def events_for(self, task_id, limit=20):
+        """Most recent events linked to a tasks_queue id, newest first"""
+        with self._lock:
+            linked = self.by_task.get(task_id) or []
+            return [
+                dict(event, context=list(event["context"]))
+                for event in reversed(linked[-limit:])
+            ]
+
+    def counts(self, task_ids):
+        """Number of events linked to each of the given task ids"""
+        with self._lock:
+            return {task_id: len(self.by_task.get(task_id) or ()) for task_id in task_ids}
+
+    def status(self):
+        return {
+            "log_tail_enabled": self.enabled,
+            "log_tail_error": self.error,
+            "log_tail_last_poll": (
+                self.last_poll.strftime("%d/%m/%Y %H:%M:%S") if self.last_poll else None
+            ),
+            "log_tail_bytes": self.bytes_read,
+            "log_tail_events": self.events_parsed,
+            "log_tail_rotations": self.rotations,
+            "log_tail_files": {
+                path: {"offset": state.get("offset"), "size": state.get("size")}
+                for path, state in self.files.items()
+                if path in self.paths
+            },
+        }
@@ -0,0 +1,240 @@
+import numbers
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from config.config import METRICS_CONFIG
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS samples (
+        ts INTEGER NOT NULL,
+        metric TEXT NOT NULL,
+        value REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS samples_metric_ts ON samples (metric, ts);
+
+    CREATE TABLE IF NOT EXISTS rollups (
+        resolution INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        metric TEXT NOT NULL,
+        min REAL NOT NULL,
+        max REAL NOT NULL,
+        sum REAL NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (resolution, metric, bucket)
+    );
+
+    CREATE TABLE IF NOT EXISTS daily (
+        day TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        value REAL NOT NULL,
+        PRIMARY KEY (metric, day)
+    );
+"""
+
+HOUR = 3600
+DAY = 86400
+
+
+class MetricsStore:
+    """Append-only local store for dashboard metrics.
+
+    Each refresh appends one raw sample per metric. Raw samples older than
+    `raw_retention_days` are rolled up into hourly buckets, and hourly
+    buckets older than `hourly_retention_days` into daily buckets, so reads
+    over long ranges stay small. Per-day values that the source already
+    aggregates (e.g. certificates created per day) live in `daily`.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or METRICS_CONFIG["path"]
+        self.raw_retention = METRICS_CONFIG["raw_retention_days"] * DAY
+        self.hourly_retention = METRICS_CONFIG["hourly_retention_days"] * DAY
+        self.daily_retention = METRICS_CONFIG["daily_retention_days"] * DAY
+        self._last_compaction = 0
+        self._write_lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def record(self, metrics, ts=None):
+        """Append one sample for each metric in a {name: value} dict"""
+        ts = int(ts or time.time())
+        rows = [
+            (ts, name, float(value))
+            for name, value in metrics.items()
+            if isinstance(value, numbers.Number)
+        ]
+
+        with self._write_lock, closing(self._connect()) as conn:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO samples (ts, metric, value) VALUES (?, ?, ?)", rows
+                )
+
+        if ts - self._last_compaction >= HOUR:
+            self.compact(now=ts)
+        return len(rows)
+
+    def record_daily(self, metric, values):
+        """Upsert per-day values given as {"YYYY-MM-DD": value}"""
+        with self._write_lock, closing(self._connect()) as conn:
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT INTO daily (day, metric, value) VALUES (?, ?, ?)
+                    ON CONFLICT (metric, day) DO UPDATE SET value = excluded.value
+                    """,
+                    [(day, metric, float(value)) for day, value in values.items()],
+                )
+
+    def compact(self, now=None):
+        """Roll raw samples into hourly buckets and hourly into daily"""
+        now = int(now or time.time())
+        raw_cutoff = now - self.raw_retention
+        hourly_cutoff = now - self.hourly_retention
+        daily_cutoff = now - self.daily_retention
+
+        with self._write_lock, closing(self._connect()) as conn:
+            with conn:
+                self._rollup_samples(conn, raw_cutoff)
+                self._rollup_hourly(conn, hourly_cutoff)
+                conn.execute(
+                    "DELETE FROM rollups WHERE resolution = ? AND bucket < ?",
+                    (DAY, daily_cutoff),
+                )
+        self._last_compaction = now
+
+    def _rollup_samples(self, conn, cutoff):
+        # Only whole hours are rolled up, so a bucket is never written twice.
+        cutoff -= cutoff % HOUR
+        conn.execute(
+            """
+            INSERT INTO rollups (resolution, bucket, metric, min, max, sum, count)
+            SELECT ?, ts - ts % ?, metric, MIN(value), MAX(value), SUM(value),
+                   COUNT(*)
+            FROM samples
+            WHERE ts < ?
+            GROUP BY ts - ts % ?, metric
+            ON CONFLICT (resolution, metric, bucket) DO UPDATE SET
+                min = MIN(min, excluded.min),
+                max = MAX(max, excluded.max),
+                sum = sum + excluded.sum,
+                count = count + excluded.count
+            """,
+            (HOUR, HOUR, cutoff, HOUR),
+        )
+        conn.execute("DELETE FROM samples WHERE ts < ?", (cutoff,))
+
+    def _rollup_hourly(self, conn, cutoff):
+        cutoff -= cutoff % DAY
+        conn.execute(
+            """
+            INSERT INTO rollups (resolution, bucket, metric, min, max, sum, count)
+            SELECT ?, bucket - bucket % ?, metric, MIN(min), MAX(max), SUM(sum),
+                   SUM(count)
+            FROM rollups
+            WHERE resolution = ? AND bucket < ?
+            GROUP BY bucket - bucket % ?, metric
+            ON CONFLICT (resolution, metric, bucket) DO UPDATE SET
+                min = MIN(min, excluded.min),
+                max = MAX(max, excluded.max),
+                sum = sum + excluded.sum,
+                count = count + excluded.count
+            """,
+            (DAY, DAY, HOUR, cutoff, DAY),
+        )
+        conn.execute(
+            "DELETE FROM rollups WHERE resolution = ? AND bucket < ?", (HOUR, cutoff)
+        )
+
+    def series(self, metric, days=7, now=None):
+        """Return [{"ts", "value", "min", "max"}] for the last `days` days"""
+        now = int(now or time.time())
+        since = now - days * DAY
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                SELECT bucket, sum * 1.0 / count, min, max
+                FROM rollups
+                WHERE metric = ? AND bucket >= ?
+                UNION ALL
+                SELECT ts, value, value, value
+                FROM samples
+                WHERE metric = ? AND ts >= ?
+                ORDER BY 1
+                """,
+                (metric, since, metric, since),
+            ).fetchall()
+
+        return [
+            {"ts": ts, "value": value, "min": low, "max": high}
+            for ts, value, low, high in rows
+        ]
+
+    def daily_series(self, metric, days=7, today=None):
+        """Return [{"date", "value"}] for the last `days` days"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                SELECT day, value FROM daily
+                WHERE metric = ? AND day >= date(COALESCE(?, 'now'), ?)
+                ORDER BY day
+                """,
+                (metric, today, f"-{days - 1} days"),
+            ).fetchall()
+
+        return [{"date": day, "value": value} for day, value in rows]
+
+    def metrics(self):
+        """List every metric name that has data"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                SELECT metric FROM samples
+                UNION SELECT metric FROM rollups
+                UNION SELECT metric FROM daily
+                ORDER BY 1
+                """
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+def snapshot_metrics(data, sections=None):
+    """Flatten the numeric parts of a monitoring snapshot into metric names.
+
+    When `sections` is given, only those sections are included.
+    """
+
+    def wanted(section):
+        return sections is None or section in sections
+
+    metrics = {}
+
+    if wanted("total_counts"):
+        for name, value in (data.get("total_counts") or {}).items():
+            metrics[f"total_counts.{name}"] = value
+
+    if wanted("failed_tasks"):
+        metrics["failed_tasks.count"] = len(data.get("failed_tasks") or [])
+
+    if wanted("table_stats"):
+        for table in data.get("table_stats") or []:
+            metrics[f"table_rows.{table['Tabela']}"] = table["Registros"]
+            metrics[f"table_size_mb.{table['Tabela']}"] = table["Tamanho (MB)"]
+
+    if wanted("integrity_checks"):
+        for name, value in (data.get("integrity_checks") or {}).items():
+            metrics[f"integrity.{name}"] = value
+
+    return {name: value for name, value in metrics.items() if value is not None}
@@ -1,429 +1,674 @@
 import json
 import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 
 import pymysql
 from dotenv import load_dotenv
 
-from config.config import DB_CONFIG
+from config.config import DB_CONFIG, PAYLOAD_CONFIG, POOL_CONFIG
 from config.queries import MONITORING_QUERIES
-from utils.ssh_client import SSHTunnel
+from utils.connection_pool import ConnectionPool, PoolTimeout
+from utils.instrumentation import CountingConnection, InstrumentedCursor, QueryMetrics
+from utils.pagination import decode_cursor, keyset_page
+from utils.payload_decoder import PayloadDecoder, PayloadError
+from utils.ssh_client import TunnelManager
+from utils.table_stats import TableStatsEngine
 
 load_dotenv()
 
 prefix = os.getenv("DB_PREFIX")
 
+# Number of task ids per payload lookup.
+PAYLOAD_BATCH_SIZE = 500
 
-class MySQLMonitor:
-    def __init__(self):
-        self.ssh_tunnel = None
-        self.connection = None
-
-    def _get_connection(self):
-        """Create or get a database connection"""
-        if (
-            not self.ssh_tunnel
-            or not self.ssh_tunnel.tunnel
-            or not self.ssh_tunnel.tunnel.is_active
-        ):
-            self.ssh_tunnel = SSHTunnel()
-            self.ssh_tunnel.__enter__()
-
-        if not self.connection or not self.connection.open:
-            self.connection = pymysql.connect(
-                host="127.0.0.1",
-                port=self.ssh_tunnel.tunnel.local_bind_port,
-                user=DB_CONFIG["username"],
-                password=DB_CONFIG["password"],
-                database=DB_CONFIG["database"],
-                charset="utf8mb4",
-                connect_timeout=10,
-            )
-            print("[DB] Database connection established!")
 
-        return self.connection
+# Day boundaries of the dashboard chart (Brasília time), matching the
+# CONVERT_TZ(created_at, '+00:00', '-03:00') in certificates_by_day.
+LOCAL_UTC_OFFSET = timedelta(hours=-3)
 
-    def close(self):
-        """Close connection and tunnel"""
-        print("[Monitor] Closing connections...")
-        if self.connection:
+
+def day_range(days, utc_offset):
+    """First local day and the UTC [start, end) range of the last `days` days.
+
+    Timestamps are stored in UTC, so the range is compared to created_at
+    as is, which lets MySQL use an index range scan.
+    """
+    today = (datetime.now(timezone.utc).replace(tzinfo=None) + utc_offset).date()
+    first_day = today - timedelta(days=days - 1)
+    start = datetime.combine(first_day, datetime.min.time()) - utc_offset
+    end = datetime.combine(today + timedelta(days=1), datetime.min.time()) - utc_offset
+    return first_day, start, end
+
+
+def daily_counts(first_day, days, counts):
+    """Chart rows for `days` days from first_day, with 0 for missing days"""
+    results = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        results.append(
+            {
+                "date": day.strftime("%d/%m"),
+                "date_full": day.strftime("%Y-%m-%d"),
+                "count": counts.get(day, 0),
+            }
+        )
+    return results
+
+
+def _format_datetime(value):
+    """Format a datetime in Brazilian format for the detail modals"""
+    return value.strftime("%d/%m/%Y %H:%M") if value else None
+
+
+class MonitorBase:
+    """What MySQLMonitor and AsyncMySQLMonitor share besides I/O.
+
+    The address of the database and the code turning query results into
+    the rows and details served by the dashboard.
+    """
+
+    def __init__(self, tunnel=None, query_metrics=None):
+        # Web workers pass the refresher's tunnel (SharedTunnel).
+        self.tunnel = tunnel or TunnelManager()
+        self.payload_decoder = PayloadDecoder(PAYLOAD_CONFIG["backend"])
+        self.query_metrics = query_metrics or QueryMetrics()
+
+    def _ensure_tunnel(self):
+        """Return the local port of the SSH tunnel, opening it if needed"""
+        return self.tunnel.local_port()
+
+    def address(self):
+        """(host, port) to reach the database: the tunnel, or the server directly"""
+        if DB_CONFIG["direct"]:
+            return DB_CONFIG["host"], DB_CONFIG["port"]
+        return "127.0.0.1", self._ensure_tunnel()
+
+    def _missing_payloads(self, tasks):
+        """Ids of the failed tasks whose payload fields are not cached"""
+        return [
+            task["id"]
+            for task in tasks
+            if self.payload_decoder.cached((task["id"], task["updated_at"])) is None
+        ]
+
+    def _failed_tasks(self, tasks, payloads, decoded):
+        """Failed task rows from their keys and the payloads fetched for them"""
+        processed_results = []
+        for task in tasks:
+            key = (task["id"], task["updated_at"])
+            fields = self.payload_decoder.cached(key)
+            if fields is None:
+                fields = self._decode_payload(task["id"], payloads.get(task["id"]))
+                self.payload_decoder.store(key, fields)
+            processed_results.append(self._failed_task_row(task, fields))
+
+        self.payload_decoder.retain((task["id"], task["updated_at"]) for task in tasks)
+
+        print(
+            f"[Queue] Found {len(tasks)} failed tasks "
+            f"({decoded} payloads decoded with {self.payload_decoder.backend})."
+        )
+
+        return processed_results
+
+    def _decode_payload(self, task_id, raw):
+        """Extract display fields from a task's JSON payload"""
+        try:
+            fields = self.payload_decoder.extract(raw)
+        except PayloadError as e:
+            # If JSON processing fails, flag the row instead of dropping it.
+            print(f"[Queue] Error processing payload for task {task_id}: {e}")
+            return {
+                "student_name": "Proccess Error",
+                "course_name": "Proccess Error",
+                "has_certificate": "N/A",
+                "cert_filename": "",
+                "template_id": None,
+                "error": f"Invalid payload: {e}",
+            }
+
+        fields["has_certificate"] = "Sim" if fields["cert_filename"] else "Não"
+        return fields
+
+    def _failed_task_row(self, task, fields):
+        return {
+            "id": task["id"],
+            "student_name": fields["student_name"],
+            "course_name": fields["course_name"],
+            "has_certificate": fields["has_certificate"],
+            "cert_filename": fields["cert_filename"],
+            "template_id": fields["template_id"],
+            "error": fields["error"],
+            "attempts": task["attempts"],
+            "updated_at": task["updated_at"],
+        }
+
+    def _process_failed_task(self, task):
+        """Build a failed task row from a tasks_queue row with its payload"""
+        return self._failed_task_row(
+            task, self._decode_payload(task["id"], task["payload"])
+        )
+
+    @staticmethod
+    def _page_query(queries, cursor, per_page, direction):
+        """(query, params, position) of one keyset page"""
+        position = decode_cursor(cursor)
+        if position is None:
+            direction = "first"
+        elif direction != "prev":
+            direction = "next"
+
+        params = {"limit": per_page + 1}
+        if position is not None:
+            params["key"], params["id"] = position
+        return queries[direction], params, direction, position
+
+    @staticmethod
+    def _export_query(name, date_from=None, date_to=None, status=None):
+        """(query, params) of an export; `date_to` is inclusive"""
+        export = MONITORING_QUERIES["exports"][name]
+        filters = []
+        params = []
+        if date_from:
+            filters.append(f"AND {export['date_column']} >= %s")
+            params.append(date_from)
+        if date_to:
+            filters.append(f"AND {export['date_column']} < %s + INTERVAL 1 DAY")
+            params.append(date_to)
+        if status:
+            filters.append(f"AND {export['status_column']} = %s")
+            params.append(status)
+        return export["query"].format(filters=" ".join(filters)), params
+
+    @staticmethod
+    def _approximate_count(result):
+        if not result:
+            return 0
+        # EXPLAIN reports its estimate in the "rows" column.
+        return int(result.get("count", result.get("rows")) or 0)
+
+    @staticmethod
+    def _integrity_value(result):
+        # Get the first value from the returned dictionary.
+        return list(result.values())[0] if result else 0
+
+    def _format_certificate(self, cert, alias=""):
+        """Format certificate columns, optionally read from aliased columns"""
+        result = {
+            "id": cert[f"{alias}id"],
+            "template_id": cert[f"{alias}template_id"],
+            "student_id": cert[f"{alias}student_id"],
+            "user_id": cert[f"{alias}user_id"],
+            "course_id": cert[f"{alias}course_id"],
+            "completed_on": _format_datetime(cert[f"{alias}completed_on"]),
+            "expiration": cert[f"{alias}expiration"],
+            "pdf_url": cert[f"{alias}pdf_url"],
+            "platform_data": cert[f"{alias}platform_data"],
+            "status": cert[f"{alias}status"],
+            "created_at": _format_datetime(cert[f"{alias}created_at"]),
+            "updated_at": _format_datetime(cert[f"{alias}updated_at"]),
+        }
+
+        # Parse platform_data if exists.
+        if result["platform_data"]:
             try:
-                self.connection.close()
+                result["platform_data"] = json.loads(result["platform_data"])
             except:
                 pass
-        if self.ssh_tunnel:
+
+        return result
+
+    def _failure_details(self, task):
+        """Failure details from the row of the failure_details query"""
+        if not task:
+            return {"error": "Task not found"}
+
+        # Parse payload.
+        payload = json.loads(task["payload"]) if task["payload"] else {}
+
+        result = {"certificate": None, "user_metadata": None, "payload": payload}
+
+        if task["certificate__id"] is not None:
+            result["certificate"] = self._format_certificate(task, "certificate__")
+
+        if task["user_metadata"]:
             try:
-                self.ssh_tunnel.__exit__(None, None, None)
+                result["user_metadata"] = json.loads(task["user_metadata"])
             except:
-                pass
+                result["user_metadata"] = task["user_metadata"]
+
+        return result
+
+    def _certificate_details(self, cert):
+        """Certificate details from the row of the certificate_details query"""
+        if not cert:
+            return {"error": "Certificate not found"}
+
+        result = {
+            "certificate": self._format_certificate(cert),
+            "student": None,
+            "course": None,
+        }
+
+        if cert["student__id"] is not None:
+            result["student"] = {
+                "id": cert["student__id"],
+                "name": cert["student__name"],
+                "email": cert["student__email"],
+                "cpf": cert["student__cpf"],
+                "phone": cert["student__phone"],
+                "position": cert["student__position"],
+                "sector": cert["student__sector"],
+                "created_at": _format_datetime(cert["student__created_at"]),
+            }
+
+        if cert["course__id"] is not None:
+            result["course"] = {
+                "id": cert["course__id"],
+                "title": cert["course__title"],
+                "slug": cert["course__slug"],
+                "status": cert["course__status"],
+            }
+
+        return result
+
+
+class MySQLMonitor(MonitorBase):
+    def __init__(self, tunnel=None):
+        super().__init__(tunnel)
+        self.pool = ConnectionPool(
+            self._connect, size=POOL_CONFIG["size"], timeout=POOL_CONFIG["timeout"]
+        )
+        # Connections through a replaced tunnel are useless.
+        self.tunnel.on_reconnect = self.pool.close_all
+        self.table_stats = TableStatsEngine(self)
+
+    def _connect(self):
+        """Open a new database connection through the tunnel"""
+        host, port = self.address()
+        connection = CountingConnection(
+            host=host,
+            port=port,
+            user=DB_CONFIG["username"],
+            password=DB_CONFIG["password"],
+            database=DB_CONFIG["database"],
+            charset="utf8mb4",
+            connect_timeout=10,
+            read_timeout=POOL_CONFIG["read_timeout"],
+            # Pooled connections are reused across refreshes; autocommit keeps
+            # each query from reading an old REPEATABLE READ snapshot.
+            autocommit=True,
+        )
+        print("[DB] Database connection established!")
+        return connection
+
+    @contextmanager
+    def _cursor(self, cursor_class=pymysql.cursors.DictCursor):
+        """Borrow a pooled connection and yield an instrumented cursor on it"""
+        conn = self.pool.acquire()
+        broken = False
+        try:
+            with InstrumentedCursor(
+                conn.cursor(cursor_class), self.query_metrics
+            ) as cursor:
+                yield cursor
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.pool.release(conn, discard=broken)
+
+    @contextmanager
+    def _transaction(self):
+        """Like _cursor(), with the block run in one transaction.
+
+        Committed when the block returns, rolled back if it raises.
+        """
+        conn = self.pool.acquire()
+        broken = False
+        try:
+            conn.begin()
+            with InstrumentedCursor(conn.cursor(), self.query_metrics) as cursor:
+                yield cursor
+            conn.commit()
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            broken = True
+            raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.release(conn, discard=broken)
+
+    def ping(self):
+        """Check that the tunnel is up and a pooled connection answers.
+
+        Never waits for the pool: when a refresh has borrowed every
+        connection the database is clearly reachable, so a busy pool
+        counts as alive instead of blocking the liveness probe.
+        """
+        tunnel_active = self.tunnel.is_active()
+        started = time.monotonic()
+        try:
+            conn = self.pool.acquire(timeout=0)
+        except PoolTimeout:
+            return {"tunnel": tunnel_active, "database": True, "pool_busy": True}
+        except Exception as e:
+            return {"tunnel": tunnel_active, "database": False, "error": str(e)}
+
+        broken = False
+        try:
+            conn.ping(reconnect=False)
+        except Exception as e:
+            broken = True
+            return {"tunnel": tunnel_active, "database": False, "error": str(e)}
+        finally:
+            self.pool.release(conn, discard=broken)
+
+        return {
+            "tunnel": True,
+            "database": True,
+            "latency_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+
+    def close(self):
+        """Close connections and tunnel"""
+        print("[Monitor] Closing connections...")
+        self.pool.close_all()
+        try:
+            self.tunnel.stop()
+        except:
+            pass
 
     def get_total_counts(self):
         """Get total counts"""
-        conn = self._get_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["total_counts"])
+            result = cursor.fetchone()
+
+        return result
+
+    def get_table_total(self, name):
+        """Row count and max id of a table listed in table_totals"""
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["table_totals"][name])
+            result = cursor.fetchone()
+        return result
 
-        cursor.execute(MONITORING_QUERIES["total_counts"])
-        result = cursor.fetchone()
+    def get_table_growth(self, name, last_id):
+        """Count and max id of the rows added to a table after last_id"""
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["table_growth"][name], {"last_id": last_id})
+            result = cursor.fetchone()
+        return result
 
-        cursor.close()
+    def get_recent_templates(self, hours=24):
+        """Number of certificate templates updated in the last hours"""
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["recent_templates"], {"hours": hours})
+            result = cursor.fetchone()
+        return result["count"] if result else 0
+
+    def get_binlog_settings(self):
+        """Binary log variables, keyed by lowercase name"""
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["binlog_settings"])
+            results = cursor.fetchall()
+        return {row["Variable_name"].lower(): str(row["Value"]) for row in results}
+
+    def get_binlog_status(self):
+        """Current binlog file and position; needs REPLICATION CLIENT"""
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["binlog_status"])
+            result = cursor.fetchone()
         return result
 
     def get_certificates_by_day(self, days=7):
-        """Get certificates grouped by day"""
-        conn = self._get_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-
-        cursor.execute(MONITORING_QUERIES["certificates_by_day"])
-        results = cursor.fetchall()
-
-        # Format dates to strings in Brazilian format.
-        formatted_results = []
-        for row in results:
-            formatted_results.append(
-                {
-                    "date": (
-                        row["date"].strftime("%d/%m")
-                        if hasattr(row["date"], "strftime")
-                        else str(row["date"])
-                    ),
-                    "date_full": (
-                        row["date"].strftime("%Y-%m-%d")
-                        if hasattr(row["date"], "strftime")
-                        else str(row["date"])
-                    ),
-                    "count": row["count"],
-                }
+        """Get certificates grouped by day, in Brasília time, oldest day first"""
+        first_day, start, end = day_range(days, LOCAL_UTC_OFFSET)
+        with self._cursor() as cursor:
+            cursor.execute(
+                MONITORING_QUERIES["certificates_by_day"], {"start": start, "end": end}
             )
+            counts = {row["date"]: row["count"] for row in cursor.fetchall()}
 
-        cursor.close()
-        return formatted_results
+        return daily_counts(first_day, days, counts)
 
     def get_table_stats(self):
-        """Get table statistics"""
-        conn = self._get_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-
-        # Fetch table information.
-        cursor.execute(MONITORING_QUERIES["table_sizes"])
-        tables_info = cursor.fetchall()
-
-        # For each table, count exact records.
-        results = []
-        for table in tables_info:
-            table_name = table["Tabela"]
-            cursor.execute(f"SELECT COUNT(*) as count FROM {table_name}")
-            count = cursor.fetchone()["count"]
+        """Get table statistics using the configured counting mode"""
+        return self.table_stats.collect()
 
-            results.append(
-                {
-                    "Tabela": table_name,
-                    "Registros": count,
-                    "Tamanho (MB)": table["Tamanho (MB)"],
-                }
-            )
+    def get_table_sizes(self):
+        """Get size and row estimate of every prefixed table"""
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["table_sizes"])
+            results = cursor.fetchall()
 
-        cursor.close()
         return results
 
+    def get_exact_count(self, table_name):
+        """Count the records of a table exactly"""
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) as count FROM `{table_name}`", name="exact_count"
+            )
+            count = cursor.fetchone()["count"]
+
+        return count
+
+    def get_innodb_row_estimates(self):
+        """Get row estimates from the persistent InnoDB statistics"""
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["innodb_table_stats"])
+            results = cursor.fetchall()
+
+        return {row["Tabela"]: row["Estimativa"] for row in results}
+
     def get_certificates(self):
         """Get all certificates"""
-        conn = self._get_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["certificates"])
+            results = cursor.fetchall()
 
-        cursor.execute(MONITORING_QUERIES["certificates"])
-        results = cursor.fetchall()
-
-        cursor.close()
         return results
 
-    def get_recent_certificates(self, days=7):
-        """Get recent certificates"""
-        conn = self._get_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-
-        cursor.execute(MONITORING_QUERIES["recent_certificates"])
-        results = cursor.fetchall()
+    def get_certificates_since(self, since, last_id=0, limit=5000):
+        """Get certificates changed after the (updated_at, id) high-water mark"""
+        with self._cursor() as cursor:
+            cursor.execute(
+                MONITORING_QUERIES["certificates_incremental"],
+                {"since": since, "last_id": last_id, "limit": limit},
+            )
+            results = cursor.fetchall()
 
-        cursor.close()
         return results
 
-    def get_failed_queue_tasks(self):
-        """Get failed tasks in the queue"""
-        conn = self._get_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
+    def get_certificates_after_id(self, last_id=0, limit=5000):
+        """Get a batch of certificates ordered by id, for full resyncs"""
+        with self._cursor() as cursor:
+            cursor.execute(
+                MONITORING_QUERIES["certificates_by_id"],
+                {"last_id": last_id, "limit": limit},
+            )
+            results = cursor.fetchall()
 
-        cursor.execute(MONITORING_QUERIES["failed_queue_tasks"])
-        results = cursor.fetchall()
+        return results
 
-        # Process JSON payload.
-        processed_results = []
-        for task in results:
-            try:
-                payload = json.loads(task["payload"])
-
-                # Extract information from JSON.
-                student_name = payload.get("signer", {}).get("user_name", "N/A")
-                course_name = payload.get("course", {}).get("course_title", "N/A")
-                cert_filename = payload.get("certificate", {}).get("filename", "")
-                has_certificate = "Sim" if cert_filename else "Não"
-
-                processed_results.append(
-                    {
-                        "id": task["id"],
-                        "student_name": student_name,
-                        "course_name": course_name,
-                        "has_certificate": has_certificate,
-                        "cert_filename": cert_filename,
-                        "payload": task["payload"],
-                        "attempts": task["attempts"],
-                        "updated_at": task["updated_at"],
-                    }
-                )
-            except (json.JSONDecodeError, KeyError) as e:
-                # If JSON processing fails, keep original data.
-                print(f"[Queue] Error processing payload for task {task['id']}: {e}")
-                processed_results.append(
-                    {
-                        "id": task["id"],
-                        "student_name": "Proccess Error",
-                        "course_name": "Proccess Error",
-                        "has_certificate": "N/A",
-                        "cert_filename": "",
-                        "payload": task["payload"],
-                        "attempts": task["attempts"],
-                        "updated_at": task["updated_at"],
-                    }
-                )
+    def get_certificates_fingerprint(self):
+        """Get row count and highest id of the certificates table"""
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["certificates_fingerprint"])
+            result = cursor.fetchone()
 
-        print(f"[Queue] Found {len(results)} failed tasks.")
+        return result
 
-        cursor.close()
-        return processed_results
+    def get_recent_certificates(self, days=7):
+        """Get recent certificates"""
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["recent_certificates"])
+            results = cursor.fetchall()
 
-    def get_certificate_usage(self):
-        conn = self._get_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        cursor.execute(MONITORING_QUERIES["certificate_usage"])
-        results = cursor.fetchall()
-        cursor.close()
         return results
 
-    def get_recent_activity(self, days=24):
-        conn = self._get_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        hours = days * 24
-        cursor.execute(MONITORING_QUERIES["recent_activity"], {"hours": hours})
-        results = cursor.fetchall()
-        cursor.close()
-        return results
+    def get_failed_queue_tasks(self):
+        """Get failed tasks in the queue.
+
+        Payloads are only transferred and decoded for tasks that are new or
+        whose updated_at changed since the last call; the others reuse the
+        fields cached by the payload decoder.
+        """
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["failed_queue_task_keys"])
+            results = cursor.fetchall()
+
+            missing = self._missing_payloads(results)
+            payloads = {}
+            for start in range(0, len(missing), PAYLOAD_BATCH_SIZE):
+                cursor.execute(
+                    MONITORING_QUERIES["queue_task_payloads"],
+                    {"ids": missing[start : start + PAYLOAD_BATCH_SIZE]},
+                )
+                payloads.update((row["id"], row["payload"]) for row in cursor.fetchall())
 
-    def check_data_integrity(self):
-        """Check data integrity"""
-        conn = self._get_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        return self._failed_tasks(results, payloads, len(missing))
 
-        integrity_checks = {}
+    def _fetch_page(self, queries, key_field, cursor=None, per_page=10, direction="next"):
+        """Fetch one keyset page using the first/next/prev query variants"""
+        query, params, direction, position = self._page_query(
+            queries, cursor, per_page, direction
+        )
 
-        for check_name, query in MONITORING_QUERIES["integrity_checks"].items():
-            cursor.execute(query)
-            result = cursor.fetchone()
+        with self._cursor() as db_cursor:
+            db_cursor.execute(query, params)
+            rows = db_cursor.fetchall()
 
-            # Get the first value from the returned dictionary.
-            if result:
-                integrity_checks[check_name] = list(result.values())[0]
-            else:
-                integrity_checks[check_name] = 0
+        return keyset_page(rows, per_page, key_field, direction, position is not None)
 
-        cursor.close()
-        return integrity_checks
+    def get_certificates_page(self, cursor=None, per_page=10, direction="next"):
+        """Get one page of certificates ordered by (created_at, id), newest first"""
+        return self._fetch_page(
+            MONITORING_QUERIES["certificates_page"],
+            "created_at",
+            cursor,
+            per_page,
+            direction,
+        )
 
-    def get_failure_details(self, task_id):
-        """Get detailed information about a failed task"""
-        conn = self._get_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
+    def requeue_tasks(self, task_ids, status, attempts):
+        """Reset failed tasks to `status` in one transaction; returns rows changed.
 
-        # Get task info.
-        cursor.execute(f"SELECT * FROM {prefix}tasks_queue WHERE id = %s", (task_id,))
-        task = cursor.fetchone()
+        Tasks that are no longer failed are left alone.
+        """
+        with self._transaction() as cursor:
+            cursor.execute(
+                MONITORING_QUERIES["requeue_tasks"],
+                {"ids": list(task_ids), "status": status, "attempts": attempts},
+            )
+            return cursor.rowcount
+
+    def get_failed_tasks_page(self, cursor=None, per_page=10, direction="next"):
+        """Get one page of failed tasks ordered by (updated_at, id), newest first"""
+        page = self._fetch_page(
+            MONITORING_QUERIES["failed_tasks_page"],
+            "updated_at",
+            cursor,
+            per_page,
+            direction,
+        )
+        page["items"] = [self._process_failed_task(task) for task in page["items"]]
+        return page
 
-        if not task:
-            cursor.close()
-            return {"error": "Task not found"}
+    def get_approximate_count(self, name):
+        """Get a fast row count estimate from table statistics or EXPLAIN"""
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["approximate_counts"][name])
+            result = cursor.fetchone()
 
-        # Parse payload.
-        payload = json.loads(task["payload"]) if task["payload"] else {}
+        return self._approximate_count(result)
 
-        # Extract user_id and course_id from payload.
-        user_id = payload.get("signer", {}).get("user_id")
-        course_id = payload.get("course", {}).get("course_id")
+    def iter_export(self, name, date_from=None, date_to=None, status=None, batch_size=1000):
+        """Stream rows of an export query through an unbuffered cursor.
 
-        result = {"certificate": None, "user_metadata": None, "payload": payload}
+        Rows are read from the server in batches as they are consumed, so
+        memory use does not grow with the size of the result. `date_to` is
+        inclusive.
+        """
+        query, params = self._export_query(name, date_from, date_to, status)
 
-        # Get certificate info.
-        if user_id and course_id:
-            cursor.execute(
-                f"""
-                SELECT * FROM {prefix}certificates
-                WHERE user_id = %s AND course_id = %s
-                ORDER BY created_at DESC LIMIT 1
-                """,
-                (user_id, course_id),
-            )
-            cert = cursor.fetchone()
-            if cert:
-                result["certificate"] = {
-                    "id": cert["id"],
-                    "template_id": cert["template_id"],
-                    "student_id": cert["student_id"],
-                    "user_id": cert["user_id"],
-                    "course_id": cert["course_id"],
-                    "completed_on": (
-                        cert["completed_on"].strftime("%d/%m/%Y %H:%M")
-                        if cert["completed_on"]
-                        else None
-                    ),
-                    "expiration": cert["expiration"],
-                    "pdf_url": cert["pdf_url"],
-                    "platform_data": cert["platform_data"],
-                    "status": cert["status"],
-                    "created_at": (
-                        cert["created_at"].strftime("%d/%m/%Y %H:%M")
-                        if cert["created_at"]
-                        else None
-                    ),
-                    "updated_at": (
-                        cert["updated_at"].strftime("%d/%m/%Y %H:%M")
-                        if cert["updated_at"]
-                        else None
-                    ),
-                }
-
-                # Parse platform_data if exists.
-                if cert["platform_data"]:
-                    try:
-                        result["certificate"]["platform_data"] = json.loads(
-                            cert["platform_data"]
-                        )
-                    except:
-                        result["certificate"]["platform_data"] = cert["platform_data"]
-
-            # Get user metadata.
+        conn = self.pool.acquire()
+        cursor = InstrumentedCursor(
+            conn.cursor(pymysql.cursors.SSDictCursor), self.query_metrics
+        )
+        finished = False
+        try:
+            # Slow HTTP clients stall the read; give the server time to wait.
+            cursor.execute("SET SESSION net_write_timeout = 600", name="session")
+            cursor.execute(query, params, name=f"exports.{name}")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+            finished = True
+        finally:
+            if finished:
+                cursor.close()
+            else:
+                cursor.finish()
+            # An abandoned unbuffered result would have to be drained before
+            # the connection could be reused, so drop the connection instead.
+            self.pool.release(conn, discard=not finished)
+
+    def iter_failed_tasks_export(self, **filters):
+        """Stream queue tasks with their payload fields extracted"""
+        for task in self.iter_export("tasks", **filters):
+            yield self._process_failed_task(task)
+
+    def get_certificate_usage(self, days=30):
+        _, start, end = day_range(days, timedelta(0))
+        with self._cursor() as cursor:
             cursor.execute(
-                f"""
-                SELECT meta_value FROM wp_usermeta
-                WHERE user_id = %s AND meta_key = %s
-                """,
-                (user_id, f"_ldcds_certificate_{course_id}"),
+                MONITORING_QUERIES["certificate_usage"], {"start": start, "end": end}
             )
-            metadata = cursor.fetchone()
-            if metadata and metadata["meta_value"]:
-                try:
-                    result["user_metadata"] = json.loads(metadata["meta_value"])
-                except:
-                    result["user_metadata"] = metadata["meta_value"]
-
-        cursor.close()
-        return result
+            results = cursor.fetchall()
+        return results
 
-    def get_certificate_details(self, cert_id):
-        """Get detailed information about a certificate"""
-        conn = self._get_connection()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-
-        # Get certificate info.
-        cursor.execute(
-            f"""
-            SELECT * FROM {prefix}certificates
-            WHERE id = %s
-            """,
-            (cert_id,),
-        )
-        cert = cursor.fetchone()
+    def get_recent_activity(self, days=24):
+        hours = days * 24
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["recent_activity"], {"hours": hours})
+            results = cursor.fetchall()
+        return results
 
-        if not cert:
-            cursor.close()
-            return {"error": "Certificate not found"}
+    def check_data_integrity(self):
+        """Check data integrity"""
+        with self._cursor() as cursor:
+            integrity_checks = {}
 
-        result = {"certificate": None, "student": None, "course": None}
-
-        # Format certificate data.
-        result["certificate"] = {
-            "id": cert["id"],
-            "template_id": cert["template_id"],
-            "student_id": cert["student_id"],
-            "user_id": cert["user_id"],
-            "course_id": cert["course_id"],
-            "completed_on": (
-                cert["completed_on"].strftime("%d/%m/%Y %H:%M")
-                if cert["completed_on"]
-                else None
-            ),
-            "expiration": cert["expiration"],
-            "pdf_url": cert["pdf_url"],
-            "platform_data": cert["platform_data"],
-            "status": cert["status"],
-            "created_at": (
-                cert["created_at"].strftime("%d/%m/%Y %H:%M")
-                if cert["created_at"]
-                else None
-            ),
-            "updated_at": (
-                cert["updated_at"].strftime("%d/%m/%Y %H:%M")
-                if cert["updated_at"]
-                else None
-            ),
-        }
+            for check_name, query in MONITORING_QUERIES["integrity_checks"].items():
+                cursor.execute(query)
+                integrity_checks[check_name] = self._integrity_value(cursor.fetchone())
 
-        # Parse platform_data if exists.
-        if cert["platform_data"]:
-            try:
-                result["certificate"]["platform_data"] = json.loads(
-                    cert["platform_data"]
-                )
-            except:
-                result["certificate"]["platform_data"] = cert["platform_data"]
-
-        # Get student info.
-        cursor.execute(
-            f"""
-            SELECT * FROM {prefix}students
-            WHERE id = %s
-            """,
-            (cert["student_id"],),
-        )
-        student = cursor.fetchone()
-        if student:
-            result["student"] = {
-                "id": student["id"],
-                "name": student["name"],
-                "email": student["email"],
-                "cpf": student["cpf"],
-                "phone": student["phone"],
-                "position": student["position"],
-                "sector": student["sector"],
-                "created_at": (
-                    student["created_at"].strftime("%d/%m/%Y %H:%M")
-                    if student["created_at"]
-                    else None
-                ),
-            }
+        return integrity_checks
 
-        # Get course info.
-        cursor.execute(
-            f"""
-            SELECT ID, post_title, post_name, post_status
-            FROM wp_posts
-            WHERE ID = %s AND post_type = 'sfwd-courses'
-            """,
-            (cert["course_id"],),
-        )
-        course = cursor.fetchone()
-        if course:
-            result["course"] = {
-                "id": course["ID"],
-                "title": course["post_title"],
-                "slug": course["post_name"],
-                "status": course["post_status"],
-            }
+    def get_failure_details(self, task_id):
+        """Get detailed information about a failed task.
 
-        cursor.close()
-        return result
+        The task, the student's latest certificate for the course and the
+        user metadata are fetched in a single joined query.
+        """
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["failure_details"], (task_id,))
+            task = cursor.fetchone()
+
+        return self._failure_details(task)
+
+    def get_certificate_details(self, cert_id):
+        """Get detailed information about a certificate, its student and course"""
+        with self._cursor() as cursor:
+            cursor.execute(MONITORING_QUERIES["certificate_details"], (cert_id,))
+            cert = cursor.fetchone()
+
+        return self._certificate_details(cert)
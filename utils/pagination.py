@@ -0,0 +1,47 @@
+import base64
+from datetime import datetime
+
+
+def encode_cursor(key, row_id):
+    """Encode a (timestamp, id) keyset position as an opaque URL-safe token"""
+    raw = f"{key.isoformat() if key else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Decode a token created by encode_cursor, returning (timestamp, id)"""
+    if not token:
+        return None
+
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        key, row_id = raw.rsplit("|", 1)
+        return (datetime.fromisoformat(key) if key else None, int(row_id))
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(rows, per_page, key_field, direction, has_cursor):
+    """Build a page from rows fetched with LIMIT per_page + 1.
+
+    Rows fetched for a "prev" page come in ascending order and are
+    reversed so every page is returned newest first.
+    """
+    has_more = len(rows) > per_page
+    items = list(rows[:per_page])
+
+    if direction == "prev":
+        items.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = has_cursor, has_more
+
+    first, last = (items[0], items[-1]) if items else (None, None)
+    return {
+        "items": items,
+        "has_prev": has_prev and first is not None,
+        "has_next": has_next and last is not None,
+        "prev_cursor": encode_cursor(first[key_field], first["id"]) if first else None,
+        "next_cursor": encode_cursor(last[key_field], last["id"]) if last else None,
+    }
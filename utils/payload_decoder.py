@@ -0,0 +1,147 @@
+import json
+import threading
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class PayloadError(ValueError):
+    """Raised when a task payload cannot be decoded"""
+
+
+# Payload keys that may hold the task's error, in order of preference.
+ERROR_KEYS = ("error", "error_message", "exception", "last_error")
+# Longest error text kept per task.
+MAX_ERROR_LENGTH = 300
+
+
+def _error_text(values):
+    """First non-empty error among `values`; dicts give their message"""
+    for value in values:
+        if isinstance(value, dict):
+            value = value.get("message") or value.get("error")
+        if value:
+            return str(value)[:MAX_ERROR_LENGTH]
+    return None
+
+
+if msgspec is not None:
+
+    class _Signer(msgspec.Struct):
+        user_name: object = "N/A"
+
+    class _Course(msgspec.Struct):
+        course_title: object = "N/A"
+
+    class _Certificate(msgspec.Struct):
+        filename: object = ""
+        template_id: object = None
+
+    class _Payload(msgspec.Struct):
+        signer: _Signer = msgspec.field(default_factory=_Signer)
+        course: _Course = msgspec.field(default_factory=_Course)
+        certificate: _Certificate = msgspec.field(default_factory=_Certificate)
+        error: object = None
+        error_message: object = None
+        exception: object = None
+        last_error: object = None
+
+    _msgspec_decoder = msgspec.json.Decoder(_Payload)
+
+
+def _extract_dict(payload):
+    return {
+        "student_name": payload.get("signer", {}).get("user_name", "N/A"),
+        "course_name": payload.get("course", {}).get("course_title", "N/A"),
+        "cert_filename": payload.get("certificate", {}).get("filename", ""),
+        "template_id": payload.get("certificate", {}).get("template_id"),
+        "error": _error_text(payload.get(key) for key in ERROR_KEYS),
+    }
+
+
+def _extract_msgspec(raw):
+    try:
+        payload = _msgspec_decoder.decode(raw)
+    except msgspec.ValidationError:
+        # Valid JSON with an unexpected shape; let the generic path decide.
+        return _extract_dict(json.loads(raw))
+    except msgspec.DecodeError as e:
+        raise ValueError(str(e)) from e
+    return {
+        "student_name": payload.signer.user_name,
+        "course_name": payload.course.course_title,
+        "cert_filename": payload.certificate.filename,
+        "template_id": payload.certificate.template_id,
+        "error": _error_text(getattr(payload, key) for key in ERROR_KEYS),
+    }
+
+
+def _extract_orjson(raw):
+    return _extract_dict(orjson.loads(raw))
+
+
+def _extract_json(raw):
+    return _extract_dict(json.loads(raw))
+
+
+BACKENDS = {"json": _extract_json}
+if orjson is not None:
+    BACKENDS["orjson"] = _extract_orjson
+if msgspec is not None:
+    BACKENDS["msgspec"] = _extract_msgspec
+
+
+class PayloadDecoder:
+    """Extracts the display fields from failed task payloads.
+
+    Only signer.user_name, course.course_title, certificate.filename,
+    certificate.template_id and the error (ERROR_KEYS) are read. msgspec
+    decodes just those fields when installed, otherwise orjson or the
+    standard library parse the whole document. Results are cached by
+    (task id, updated_at), so a task is parsed again only when it changes.
+    """
+
+    def __init__(self, backend=None):
+        if backend is None:
+            backend = next(b for b in ("msgspec", "orjson", "json") if b in BACKENDS)
+        if backend not in BACKENDS:
+            raise ValueError(f"Payload backend '{backend}' is not installed")
+        self.backend = backend
+        self._extract = BACKENDS[backend]
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def extract(self, raw):
+        """Decode one payload, raising PayloadError when it is invalid"""
+        if not raw:
+            raise PayloadError("Empty payload")
+        try:
+            return self._extract(raw)
+        except (ValueError, TypeError, AttributeError) as e:
+            # json and orjson decode errors subclass ValueError.
+            raise PayloadError(str(e)) from e
+
+    def cached(self, key):
+        """Return previously extracted fields for a (task id, updated_at) key"""
+        with self._lock:
+            return self._cache.get(key)
+
+    def store(self, key, fields):
+        with self._lock:
+            self._cache[key] = fields
+
+    def retain(self, keys):
+        """Forget every cached entry not in keys, e.g. tasks no longer failed"""
+        keys = set(keys)
+        with self._lock:
+            self._cache = {k: v for k, v in self._cache.items() if k in keys}
+
+    def __len__(self):
+        return len(self._cache)
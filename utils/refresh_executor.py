@@ -0,0 +1,108 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from config.config import REFRESH_CONFIG
+
+# Cancellation flag of the stage running in the current thread.
+_stage = threading.local()
+
+
+class StageCancelled(Exception):
+    """Raised by a stage that timed out before committing its changes"""
+
+
+def cancelled():
+    """True when the refresh stage running in this thread has timed out"""
+    event = getattr(_stage, "cancelled", None)
+    return event is not None and event.is_set()
+
+
+def raise_if_cancelled():
+    """Stop a timed-out stage before it changes shared state.
+
+    Stages call this right before committing (e.g. swapping the
+    certificate replica). Outside a refresh stage it does nothing.
+    """
+    if cancelled():
+        raise StageCancelled("The stage timed out before committing")
+
+
+class RefreshStage:
+    """A named unit of refresh work with its own timeout"""
+
+    def __init__(self, name, func, timeout=None):
+        self.name = name
+        self.func = func
+        self.timeout = timeout or REFRESH_CONFIG["stage_timeout"]
+
+
+class ParallelRefresh:
+    """Runs independent refresh stages concurrently.
+
+    Each stage gets its own timeout, measured from the moment the batch is
+    submitted. A stage that fails or times out is reported in `errors` and
+    does not affect the results of the others.
+
+    A timeout does not stop the stage: its thread keeps running, and only
+    its result is discarded. The stage is flagged as cancelled, so it stops
+    at its next raise_if_cancelled() instead of changing shared state after
+    the refresh published, and it is not started again while still running.
+    """
+
+    def __init__(self, max_workers=None):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or REFRESH_CONFIG["max_workers"],
+            thread_name_prefix="refresh",
+        )
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def run(self, stages):
+        """Run the stages and return (results, errors, durations) dicts"""
+        started = time.monotonic()
+        results, errors, durations = {}, {}, {}
+
+        futures = {}
+        with self._lock:
+            for stage in stages:
+                running = self._running.get(stage.name)
+                if running is not None and not running.done():
+                    errors[stage.name] = "Still running after timing out earlier"
+                    print(f"[Refresh] {stage.name} SKIPPED - still running")
+                    continue
+                cancel = threading.Event()
+                future = self.executor.submit(self._timed, stage, cancel)
+                self._running[stage.name] = future
+                futures[stage.name] = (stage, future, cancel)
+
+        for name, (stage, future, cancel) in futures.items():
+            remaining = max(stage.timeout - (time.monotonic() - started), 0)
+            try:
+                results[name], durations[name] = future.result(timeout=remaining)
+                print(f"[Refresh] {name} OK ({durations[name]:.2f}s)")
+            except FutureTimeoutError:
+                cancel.set()
+                errors[name] = f"Timed out after {stage.timeout}s"
+                print(f"[Refresh] {name} TIMEOUT after {stage.timeout}s")
+            except Exception as e:
+                errors[name] = f"{type(e).__name__}: {e}"
+                print(f"[Refresh] {name} FAILED - {errors[name]}")
+
+        return results, errors, durations
+
+    def _timed(self, stage, cancel):
+        _stage.cancelled = cancel
+        started = time.monotonic()
+        try:
+            result = stage.func()
+        except StageCancelled:
+            print(f"[Refresh] {stage.name} stopped after its timeout, nothing changed")
+            raise
+        finally:
+            _stage.cancelled = None
+        return result, time.monotonic() - started
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,208 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from config.config import REQUEUE_CONFIG
+from utils.failure_clusters import task_cluster
+
+# Tasks listed by id in a preview.
+SAMPLE_SIZE = 10
+
+
+def parse_filters(args):
+    """Requeue filters from request arguments; raises ValueError if invalid.
+
+    course and error match case-insensitive substrings (error in the
+    task's payload error or its log events), cluster is a failure cluster id,
+    min_attempts/max_attempts are inclusive and from/to (YYYY-MM-DD) bound
+    updated_at, `to` included.
+    """
+    filters = {
+        "course": (args.get("course") or "").strip() or None,
+        "error": (args.get("error") or "").strip() or None,
+        "cluster": (args.get("cluster") or "").strip() or None,
+    }
+    for name in ("min_attempts", "max_attempts"):
+        value = args.get(name)
+        filters[name] = int(value) if value not in (None, "") else None
+    for arg, key in (("from", "date_from"), ("to", "date_to")):
+        value = args.get(arg)
+        filters[key] = datetime.strptime(value, "%Y-%m-%d") if value else None
+    return filters
+
+
+def _error_matches(task, error, log_events):
+    """Whether `error` (lowercase) is in the payload error or a log event"""
+    if error in (task.get("error") or "").lower():
+        return True
+    events = log_events(task["id"]) if log_events else []
+    return any(
+        error in event["message"].lower()
+        or any(error in line.lower() for line in event["context"])
+        for event in events
+    )
+
+
+def select_tasks(failed_tasks, filters, log_events=None):
+    """Failed tasks matching every filter, in the given order.
+
+    The error filter matches the error recorded in the task's payload
+    and, when `log_events(task_id)` is given, the task's log events too.
+    """
+    course = filters["course"].lower() if filters["course"] else None
+    error = filters["error"].lower() if filters["error"] else None
+    date_to = filters["date_to"] + timedelta(days=1) if filters["date_to"] else None
+
+    selected = []
+    for task in failed_tasks:
+        if course and course not in (task.get("course_name") or "").lower():
+            continue
+        attempts = task.get("attempts") or 0
+        if filters["min_attempts"] is not None and attempts < filters["min_attempts"]:
+            continue
+        if filters["max_attempts"] is not None and attempts > filters["max_attempts"]:
+            continue
+        updated_at = task.get("updated_at")
+        if filters["date_from"] and (updated_at is None or updated_at < filters["date_from"]):
+            continue
+        if date_to and (updated_at is None or updated_at >= date_to):
+            continue
+        if filters["cluster"] and task_cluster(task, log_events)[0] != filters["cluster"]:
+            continue
+        if error and not _error_matches(task, error, log_events):
+            continue
+        selected.append(task)
+    return selected
+
+
+def selection_digest(task_ids):
+    """Short hash of a selection, to check it did not change after the preview"""
+    data = ",".join(str(task_id) for task_id in sorted(task_ids))
+    return hashlib.sha1(data.encode("ascii")).hexdigest()[:16]
+
+
+def preview(selected, max_tasks):
+    """Summary shown before requeueing"""
+    courses = Counter(task.get("course_name") or "N/A" for task in selected)
+    return {
+        "count": len(selected),
+        "digest": selection_digest(task["id"] for task in selected),
+        "max_tasks": max_tasks,
+        "too_many": len(selected) > max_tasks,
+        "courses": [
+            {"course_name": name, "count": count} for name, count in courses.most_common(10)
+        ],
+        "sample": [task["id"] for task in selected[:SAMPLE_SIZE]],
+    }
+
+
+class Requeuer:
+    """Puts failed tasks back in the queue in small, throttled transactions.
+
+    Ids are updated `batch_size` at a time, each batch in its own
+    transaction, so locks are held briefly and a failure leaves the
+    committed batches in place. Between batches it pauses for
+    `throttle_seconds`, or as long as the batch took if that is longer, to
+    keep the load on the primary bounded.
+
+    Only one requeue runs at a time per process. Web workers each have
+    their own, so two requeues can overlap across workers; that only adds
+    load, since a task is reset only while it is still failed.
+    """
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self.batch_size = REQUEUE_CONFIG["batch_size"]
+        self.throttle = REQUEUE_CONFIG["throttle_seconds"]
+        self.max_tasks = REQUEUE_CONFIG["max_tasks"]
+        self.status = REQUEUE_CONFIG["status"]
+        self.attempts = REQUEUE_CONFIG["attempts"]
+        self._running = threading.Lock()
+
+    def run(self, task_ids):
+        """Requeue the tasks; returns a RequeueProgress of the batches.
+
+        Raises RuntimeError if another requeue is running.
+        """
+        if not self._running.acquire(blocking=False):
+            raise RuntimeError("A requeue is already running")
+        return RequeueProgress(self._run(list(task_ids)), self._running)
+
+    def _run(self, task_ids):
+        total = len(task_ids)
+        updated = 0
+        batches = (total + self.batch_size - 1) // self.batch_size
+        print(f"[Requeue] Requeueing {total} failed tasks in {batches} batches.")
+        for number, start in enumerate(range(0, total, self.batch_size), 1):
+            batch = task_ids[start : start + self.batch_size]
+            started = time.monotonic()
+            try:
+                changed = self.monitor.requeue_tasks(batch, self.status, self.attempts)
+            except Exception as e:
+                print(f"[Requeue] Batch {number}/{batches} failed: {e}")
+                yield {
+                    "done": True,
+                    "error": str(e),
+                    "updated": updated,
+                    "processed": start,
+                    "total": total,
+                }
+                return
+            elapsed = time.monotonic() - started
+            updated += changed
+            yield {
+                "batch": number,
+                "batches": batches,
+                "updated": updated,
+                "processed": start + len(batch),
+                "total": total,
+                "ids": batch,
+            }
+            if number < batches:
+                time.sleep(max(self.throttle, elapsed))
+
+        print(f"[Requeue] Done: {updated} of {total} tasks requeued.")
+        yield {
+            "done": True,
+            "updated": updated,
+            # No longer failed when their batch ran.
+            "skipped": total - updated,
+            "processed": total,
+            "total": total,
+        }
+
+
+class RequeueProgress:
+    """Progress of one requeue, holding the Requeuer's lock until it ends.
+
+    The lock is released when the last batch ran, when iterating raises,
+    or on close(), which WSGI servers call on the response even if it was
+    never iterated (e.g. the client disconnected first).
+    """
+
+    def __init__(self, steps, lock):
+        self._steps = steps
+        self._lock = lock
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._steps)
+        except BaseException:
+            # StopIteration included: the requeue is over.
+            self.close()
+            raise
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._steps.close()
+        finally:
+            self._lock.release()
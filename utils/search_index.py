@@ -0,0 +1,271 @@
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from functools import lru_cache
+
+from utils.certificate_snapshot import to_epoch
+
+# Fields whose words are indexed, and matched by free-text queries.
+TEXT_FIELDS = ("student_name", "course_name")
+
+# Most results returned by one search.
+MAX_LIMIT = 100
+
+# When at least 1/DENSE_MATCHES of the rows match, pages are taken by
+# walking the rows newest first instead of sorting the matches.
+DENSE_MATCHES = 16
+
+_WORD = re.compile(r"\w+")
+# Accents left as separate marks by NFKD (the Latin ones Portuguese uses).
+_COMBINING = re.compile("[\u0300-\u036f]")
+
+
+def normalize(text):
+    """Lowercase text without accents: "João Conceição" -> "joao conceicao" """
+    text = text or ""
+    if not text.isascii():
+        text = _COMBINING.sub("", unicodedata.normalize("NFKD", text))
+    return text.lower()
+
+
+# Names repeat (courses especially), so their words are cached.
+@lru_cache(maxsize=65536)
+def words(text):
+    """Normalized words of a text, in order and without repeats"""
+    return tuple(dict.fromkeys(_WORD.findall(normalize(text))))
+
+
+class _TermIndex:
+    """Inverted index of one field: word -> certificate ids.
+
+    The words are also kept sorted, so a query word matches every indexed
+    word it is a prefix of with a binary search.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.terms = []
+
+    def load(self, cert_id, terms):
+        """Add without keeping the words sorted; sort_terms() must follow"""
+        postings = self.postings
+        for term in terms:
+            ids = postings.get(term)
+            if ids is None:
+                ids = postings[term] = set()
+            ids.add(cert_id)
+
+    def sort_terms(self):
+        self.terms = sorted(self.postings)
+
+    def add(self, cert_id, terms):
+        for term in terms:
+            ids = self.postings.get(term)
+            if ids is None:
+                ids = self.postings[term] = set()
+                insort(self.terms, term)
+            ids.add(cert_id)
+
+    def discard(self, cert_id, terms):
+        for term in terms:
+            ids = self.postings.get(term)
+            if ids is None:
+                continue
+            ids.discard(cert_id)
+            if not ids:
+                del self.postings[term]
+                del self.terms[bisect_left(self.terms, term)]
+
+    def prefix(self, word):
+        """Ids of the rows with a word starting with `word`"""
+        terms = self.terms
+        index = bisect_left(terms, word)
+        matches = []
+        while index < len(terms) and terms[index].startswith(word):
+            matches.append(self.postings[terms[index]])
+            index += 1
+        if len(matches) == 1:
+            return matches[0]
+        return set().union(*matches)
+
+
+class CertificateSearchIndex:
+    """In-memory search over the certificates replica.
+
+    Student and course names are split into accent-insensitive words, each
+    mapped to the certificate ids containing it; statuses map to their ids,
+    and each id keeps its (created_at, id) sort key, also kept in one sorted
+    list so date ranges are a binary search. A query intersects the ids of
+    its words (each word matching as a prefix, smallest set first), so
+    lookups depend on the number of matches, not on the table size.
+
+    The index follows the replica like CounterEngine: rebuild() from every
+    row, then apply() with the (old row, new row) pairs of each incremental
+    sync.
+    """
+
+    def __init__(self):
+        self.fields = {field: _TermIndex() for field in TEXT_FIELDS}
+        self.by_status = {}
+        self.sort_keys = {}
+        self.ordered = []
+        self.documents = {}
+        self.generation = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def rebuild(self, rows, generation=None):
+        """Index every row from scratch"""
+        fields = {field: _TermIndex() for field in TEXT_FIELDS}
+        by_status, sort_keys, documents = {}, {}, {}
+        for row in rows:
+            cert_id = row.id
+            document = self._document(row)
+            documents[cert_id] = document
+            sort_keys[cert_id] = (to_epoch(row.created_at), cert_id)
+            by_status.setdefault(document[0], set()).add(cert_id)
+            for field, terms in zip(TEXT_FIELDS, document[1:]):
+                fields[field].load(cert_id, terms)
+        for index in fields.values():
+            index.sort_terms()
+        ordered = sorted(sort_keys.values())
+
+        with self._lock:
+            self.fields = fields
+            self.by_status = by_status
+            self.sort_keys = sort_keys
+            self.ordered = ordered
+            self.documents = documents
+            self.generation = generation
+        print(f"[Search] Indexed {len(documents)} certificates.")
+
+    @staticmethod
+    def _document(row):
+        """(status, student name words, course name words) of a row"""
+        return (row.status,) + tuple(words(row[field]) for field in TEXT_FIELDS)
+
+    def apply(self, changes):
+        """Update the index with (old row, new row) pairs; None for missing"""
+        with self._lock:
+            for old, new in changes:
+                if old is not None:
+                    self._remove(old.id)
+                if new is not None:
+                    self._add(new)
+
+    def _remove(self, cert_id):
+        document = self.documents.pop(cert_id, None)
+        if document is None:
+            return
+        key = self.sort_keys.pop(cert_id)
+        del self.ordered[bisect_left(self.ordered, key)]
+        status_ids = self.by_status.get(document[0])
+        if status_ids is not None:
+            status_ids.discard(cert_id)
+            if not status_ids:
+                del self.by_status[document[0]]
+        for field, terms in zip(TEXT_FIELDS, document[1:]):
+            self.fields[field].discard(cert_id, terms)
+
+    def _add(self, row):
+        document = self._document(row)
+        self.documents[row.id] = document
+        key = self.sort_keys[row.id] = (to_epoch(row.created_at), row.id)
+        insort(self.ordered, key)
+        self.by_status.setdefault(row.status, set()).add(row.id)
+        for field, terms in zip(TEXT_FIELDS, document[1:]):
+            self.fields[field].add(row.id, terms)
+
+    def search(
+        self,
+        query=None,
+        course=None,
+        status=None,
+        created_from=None,
+        created_to=None,
+        limit=20,
+        offset=0,
+    ):
+        """Ids of matching certificates, newest first, and the match count.
+
+        Every word of `query` must start a word of the student or course
+        name; every word of `course` must start a word of the course name.
+        created_from is inclusive and created_to exclusive (datetimes).
+        """
+        limit = max(min(limit, MAX_LIMIT), 1)
+        offset = max(offset, 0)
+        # (epoch,) sorts before every (epoch, id) key of that second.
+        low_key = (to_epoch(created_from),) if created_from is not None else None
+        high_key = (to_epoch(created_to),) if created_to is not None else None
+        dated = low_key is not None or high_key is not None
+
+        with self._lock:
+            candidates = self._candidates(query, course, status)
+            ordered = self.ordered
+            low = bisect_left(ordered, low_key) if low_key is not None else 0
+            high = bisect_left(ordered, high_key) if high_key is not None else len(ordered)
+            high = max(high, low)
+
+            if candidates is None:
+                # Only dates: the range itself, already in order.
+                end = max(high - offset, low)
+                keys = ordered[max(end - limit, low) : end]
+                return [cert_id for _, cert_id in reversed(keys)], high - low
+
+            if dated and high - low < len(candidates):
+                # Fewer rows in the date range than matches: walk the range.
+                matches = [
+                    cert_id for _, cert_id in ordered[low:high] if cert_id in candidates
+                ]
+                matches.reverse()
+                return matches[offset : offset + limit], len(matches)
+
+            if not dated and len(candidates) * DENSE_MATCHES >= len(ordered):
+                # Many matches: the newest rows soon fill the page.
+                page = []
+                for index in range(len(ordered) - 1, -1, -1):
+                    cert_id = ordered[index][1]
+                    if cert_id in candidates:
+                        page.append(cert_id)
+                        if len(page) == offset + limit:
+                            break
+                return page[offset:], len(candidates)
+
+            sort_keys = self.sort_keys
+            if dated:
+                candidates = [
+                    cert_id
+                    for cert_id in candidates
+                    if (low_key is None or sort_keys[cert_id] >= low_key)
+                    and (high_key is None or sort_keys[cert_id] < high_key)
+                ]
+            page = heapq.nlargest(offset + limit, candidates, key=sort_keys.__getitem__)
+            return page[offset:], len(candidates)
+
+    def _candidates(self, query, course, status):
+        """Intersection of the ids of each condition, None without conditions"""
+        sets = []
+        if status:
+            sets.append(self.by_status.get(status, set()))
+        for word in words(query):
+            matches = [self.fields[field].prefix(word) for field in TEXT_FIELDS]
+            matches = [ids for ids in matches if ids]
+            sets.append(matches[0] if len(matches) == 1 else set().union(*matches))
+        for word in words(course):
+            sets.append(self.fields["course_name"].prefix(word))
+        if not sets:
+            return None
+        if len(sets) == 1:
+            return sets[0]
+        # Start from the smallest set so the intersection stays small.
+        sets.sort(key=len)
+        result = set(sets[0])
+        for ids in sets[1:]:
+            result &= ids
+            if not result:
+                break
+        return result
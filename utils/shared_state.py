@@ -0,0 +1,328 @@
+import glob
+import json
+import os
+import pickle
+import threading
+import time
+
+from utils.snapshot import MonitoringSnapshot, SnapshotStore
+
+META_FILE = "meta.pkl"
+STATUS_FILE = "status.json"
+
+
+def _write_atomic(path, data):
+    """Write bytes to path so readers see the old or the new file, never half"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SharedSnapshotStore(SnapshotStore):
+    """SnapshotStore shared by the processes of one host through files.
+
+    The refresher (`writer=True`) publishes as usual and then writes the
+    snapshot under `path`: one pickle per section and section generation
+    (`{name}.{generation}.pkl`), written only when the section changed,
+    and `meta.pkl`, replaced last, naming the generation of each section.
+    Section files of the last two generations are kept, so a reader that
+    just loaded the previous meta still finds its sections.
+
+    Web workers (`writer=False`) only read: a background thread checks
+    `meta.pkl` every `poll_interval` seconds and loads the sections whose
+    generation changed, reusing the others. `on_change(previous, new)` is
+    called after each new generation is swapped in. The thread is started
+    on first use by each process, so it also runs in forked workers.
+
+    A restarted refresher resumes from the shared snapshot, so generations
+    keep increasing and the dashboard is not empty until the first refresh.
+    """
+
+    def __init__(self, initial, path, writer, poll_interval=1.0, on_change=None):
+        super().__init__(initial)
+        self.path = path
+        self.writer = writer
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+        self._meta_mtime = None
+        self._watcher_pid = None
+        self._watcher_lock = threading.Lock()
+        self._error = None
+
+        os.makedirs(path, exist_ok=True)
+        if writer:
+            try:
+                self._current = self._load(initial) or initial
+            except Exception as e:
+                print(f"[Shared] Could not load the shared snapshot: {e}")
+
+    @property
+    def current(self):
+        if not self.writer and self._watcher_pid != os.getpid():
+            self._start_watcher()
+        return self._current
+
+    @current.setter
+    def current(self, snapshot):
+        self._current = snapshot
+
+    def publish(self, build):
+        if not self.writer:
+            raise RuntimeError("Web workers read the shared snapshot, they cannot publish")
+        previous, snapshot = super().publish(build)
+        try:
+            self._write(previous, snapshot)
+        except Exception as e:
+            print(f"[Shared] Error writing the shared snapshot: {e}")
+        return previous, snapshot
+
+    def _section_path(self, name, generation):
+        return os.path.join(self.path, f"{name}.{generation}.pkl")
+
+    def _write(self, previous, snapshot):
+        files = {
+            name: snapshot.section_generations.get(name, 0) for name in snapshot.sections
+        }
+        for name, generation in files.items():
+            section_path = self._section_path(name, generation)
+            if not os.path.exists(section_path):
+                _write_atomic(
+                    section_path,
+                    pickle.dumps(
+                        snapshot.sections[name], protocol=pickle.HIGHEST_PROTOCOL
+                    ),
+                )
+
+        meta = {
+            "epoch": snapshot.epoch,
+            "generation": snapshot.generation,
+            "published_at": snapshot.published_at,
+            "meta": snapshot.base_meta(),
+            "section_generations": dict(snapshot.section_generations),
+            # Generation of the file of every section; 0 for defaults.
+            "files": files,
+        }
+        _write_atomic(
+            os.path.join(self.path, META_FILE),
+            pickle.dumps(meta, protocol=pickle.HIGHEST_PROTOCOL),
+        )
+
+        keep = {
+            os.path.basename(self._section_path(name, generations.get(name, 0)))
+            for generations in (previous.section_generations, snapshot.section_generations)
+            for name in snapshot.sections
+        }
+        for section_path in glob.glob(os.path.join(self.path, "*.*.pkl")):
+            if os.path.basename(section_path) not in keep:
+                try:
+                    os.remove(section_path)
+                except OSError:
+                    pass
+
+    def _load(self, current):
+        """Snapshot from the shared files, or None if it is not newer"""
+        meta_path = os.path.join(self.path, META_FILE)
+        try:
+            mtime = os.stat(meta_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime == self._meta_mtime:
+            return None
+        with open(meta_path, "rb") as f:
+            meta = pickle.load(f)
+        same_epoch = meta.get("epoch") == current.epoch
+        if same_epoch and meta["generation"] == current.generation:
+            self._meta_mtime = mtime
+            return None
+
+        # Another epoch or an older generation means the shared files were
+        # reset: reload all.
+        reuse = same_epoch and meta["generation"] > current.generation
+        sections = {}
+        for name, generation in meta["files"].items():
+            if (
+                reuse
+                and name in current.sections
+                and current.section_generations.get(name, 0) == generation
+            ):
+                sections[name] = current.sections[name]
+                continue
+            with open(self._section_path(name, generation), "rb") as f:
+                sections[name] = pickle.load(f)
+
+        self._meta_mtime = mtime
+        return MonitoringSnapshot(
+            meta["generation"],
+            sections,
+            meta["meta"],
+            meta["section_generations"],
+            current.dumps,
+            published_at=meta["published_at"],
+            epoch=meta.get("epoch"),
+        )
+
+    def _start_watcher(self):
+        with self._watcher_lock:
+            if self._watcher_pid == os.getpid():
+                return
+            # Locks and threads do not survive a fork; start over.
+            self._lock = threading.Lock()
+            self._meta_mtime = None
+            self._watcher_pid = os.getpid()
+            self.poll()
+            threading.Thread(target=self._watch, name="shared-snapshot", daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            self.poll()
+
+    def poll(self):
+        """Swap in the shared snapshot if the refresher published a new one"""
+        try:
+            with self._lock:
+                previous = self._current
+                snapshot = self._load(previous)
+                if snapshot is None:
+                    return
+                self._current = snapshot
+        except Exception as e:
+            # E.g. a section pruned after meta was read; the next poll retries.
+            if str(e) != self._error:
+                print(f"[Shared] Could not load the shared snapshot: {e}")
+            self._error = str(e)
+            return
+        self._error = None
+        if self.on_change:
+            self.on_change(previous, snapshot)
+
+
+class SharedPickle:
+    """One value pickled by the refresher, cached by readers until it changes"""
+
+    def __init__(self, path, name):
+        self.path = os.path.join(path, f"{name}.pickle")
+        self._mtime = None
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, value):
+        _write_atomic(self.path, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def read_changed(self):
+        """(True, value) if the file changed since the last call, else (False, None)"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False, None
+        if mtime == self._mtime:
+            return False, None
+        with open(self.path, "rb") as f:
+            value = pickle.load(f)
+        self._mtime = mtime
+        return True, value
+
+
+class SharedStatus:
+    """Small JSON status written by the refresher for the web workers.
+
+    Holds what only the refresher knows (integrity check age, index
+    warnings, binlog state, SSH tunnel) and the local port of its tunnel.
+    Readers cache the parsed file until it changes.
+    """
+
+    def __init__(self, path, max_age):
+        self.path = os.path.join(path, STATUS_FILE)
+        self.max_age = max_age
+        self._cache = (None, {})
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, services, tunnel, tunnel_port):
+        data = {
+            "services": services,
+            "tunnel": tunnel,
+            "tunnel_port": tunnel_port,
+            "written_at": time.time(),
+        }
+        _write_atomic(self.path, json.dumps(data, default=str).encode("utf-8"))
+
+    def read(self):
+        """Last status written, {} if there is none"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        cached_mtime, data = self._cache
+        if mtime != cached_mtime:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return data
+            self._cache = (mtime, data)
+        return data
+
+    def fresh(self):
+        """The status, or {} when the refresher stopped writing it"""
+        data = self.read()
+        if not data or time.time() - data["written_at"] > self.max_age:
+            return {}
+        return data
+
+    def services(self):
+        services = dict(self.read().get("services") or {})
+        if not self.fresh():
+            services["refresher"] = "stale"
+        return services
+
+
+class SharedTunnel:
+    """Stands in for TunnelManager in web workers.
+
+    Web workers do not open SSH tunnels of their own: they connect to the
+    local port of the refresher's tunnel, read from the shared status.
+    `on_reconnect` is called when that port changes, i.e. the refresher
+    replaced its tunnel.
+    """
+
+    def __init__(self, shared_status, on_reconnect=None):
+        self.shared_status = shared_status
+        self.on_reconnect = on_reconnect
+        self._port = None
+        self._lock = threading.Lock()
+
+    def is_active(self):
+        tunnel = self.shared_status.fresh().get("tunnel") or {}
+        return bool(tunnel.get("active"))
+
+    def local_port(self):
+        status = self.shared_status.fresh()
+        port = status.get("tunnel_port")
+        if not port:
+            raise ConnectionError(
+                "The refresher's SSH tunnel is not available (is APP_ROLE=refresher running?)"
+            )
+        with self._lock:
+            changed = self._port is not None and self._port != port
+            self._port = port
+        if changed and self.on_reconnect:
+            self.on_reconnect()
+        return port
+
+    def metrics(self):
+        tunnel = self.shared_status.fresh().get("tunnel")
+        if tunnel:
+            return tunnel
+        return {
+            "state": "unknown",
+            "active": False,
+            "reconnects": 0,
+            "failures": 0,
+            "uptime_seconds": 0,
+            "connected_at": None,
+            "connect_seconds": None,
+            "last_error": "no recent status from the refresher",
+        }
+
+    def stop(self):
+        """The tunnel belongs to the refresher"""
@@ -0,0 +1,162 @@
+import secrets
+import threading
+from datetime import datetime
+from types import MappingProxyType
+
+from utils.stats_api import StatsSnapshot
+
+
+class MonitoringSnapshot:
+    """One immutable, versioned copy of the monitoring data.
+
+    A refresh never changes a published snapshot: it builds the next
+    generation from the current one, where refreshed sections replace
+    theirs and sections whose stage failed keep their last good value.
+    SnapshotStore then swaps the reference, so request threads read
+    `store.current` once and see one consistent generation without
+    taking a lock. Section values are shared between generations and are
+    replaced, never mutated in place.
+
+    Generations count from 0 again when a process starts without a shared
+    snapshot, so each such start picks a random `epoch` that the following
+    generations carry. `version` ("{epoch}-{generation}") names one
+    snapshot across restarts, for ETags and live update ids.
+
+    `stats` is the serialized form served by /api/stats.
+    """
+
+    def __init__(
+        self,
+        generation,
+        sections,
+        meta,
+        section_generations,
+        dumps,
+        published_at=None,
+        epoch=None,
+    ):
+        self.generation = generation
+        self.epoch = epoch or secrets.token_hex(4)
+        self.version = f"{self.epoch}-{generation}"
+        self.published_at = published_at or datetime.now()
+        self.sections = MappingProxyType(dict(sections))
+        self.section_generations = MappingProxyType(dict(section_generations))
+        self.meta = MappingProxyType(
+            {
+                **meta,
+                "generation": generation,
+                "section_generations": dict(section_generations),
+            }
+        )
+        self.data = MappingProxyType({**self.sections, **self.meta})
+        self.dumps = dumps
+        self.stats = StatsSnapshot(self.data, generation, self.published_at, dumps)
+
+    @classmethod
+    def initial(cls, sections, dumps):
+        """Generation 0, before any refresh"""
+        return cls(0, sections, {"last_update": "Never", "status": "error"}, {}, dumps)
+
+    def base_meta(self):
+        """Meta without the keys derived from the generation"""
+        return {
+            name: value
+            for name, value in self.meta.items()
+            if name not in ("generation", "section_generations")
+        }
+
+    def get(self, name, default=None):
+        return self.data.get(name, default)
+
+    def __getitem__(self, name):
+        return self.data[name]
+
+    def next(self, results, errors, durations, defaults, partial=False):
+        """The generation that follows a refresh.
+
+        Each section named in `defaults` comes from `results`, else from
+        this snapshot, else from its default. With `partial` (only some
+        stages ran), the errors and durations of the other stages are kept.
+        """
+        generation = self.generation + 1
+        sections = {
+            name: results.get(name, self.sections.get(name, default))
+            for name, default in defaults.items()
+        }
+        section_generations = dict(self.section_generations)
+        section_generations.update(
+            (name, generation) for name in defaults if name in results
+        )
+
+        if partial:
+            errors = {
+                **{
+                    name: error
+                    for name, error in self.meta.get("stage_errors", {}).items()
+                    if name not in results
+                },
+                **errors,
+            }
+            durations = {**self.meta.get("stage_durations", {}), **durations}
+
+        if not errors:
+            status = "ok"
+        elif results:
+            status = "partial"
+        else:
+            status = "error"
+
+        meta = {
+            "last_update": (
+                datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+                if results
+                else self.meta.get("last_update", "Never")
+            ),
+            "status": status,
+            "stage_errors": errors,
+            "stage_durations": durations,
+        }
+        if errors:
+            meta["error_message"] = "; ".join(
+                f"{name}: {error}" for name, error in errors.items()
+            )
+        return MonitoringSnapshot(
+            generation,
+            sections,
+            meta,
+            section_generations,
+            self.dumps,
+            epoch=self.epoch,
+        )
+
+    def replace(self, **sections):
+        """The next generation with some sections replaced"""
+        generation = self.generation + 1
+        return MonitoringSnapshot(
+            generation,
+            {**self.sections, **sections},
+            self.base_meta(),
+            {**self.section_generations, **dict.fromkeys(sections, generation)},
+            self.dumps,
+            epoch=self.epoch,
+        )
+
+
+class SnapshotStore:
+    """Holds the current MonitoringSnapshot.
+
+    Publishing is serialized so each generation is built from the one
+    before it; reading `current` is a single attribute access.
+    """
+
+    def __init__(self, initial):
+        self.current = initial
+        self._lock = threading.Lock()
+
+    def publish(self, build):
+        """Swap in build(current) and return (previous, new)"""
+        with self._lock:
+            previous = self.current
+            snapshot = build(previous)
+            self.current = snapshot
+        return previous, snapshot
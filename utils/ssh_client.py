@@ -1,13 +1,27 @@
+import random
+import shlex
+import socket
+import threading
 import time
+from datetime import datetime
+
+import paramiko
 import pymysql
 import sshtunnel
 
-from config.config import DB_CONFIG, SSH_CONFIG
+from config.config import DB_CONFIG, SSH_CONFIG, TUNNEL_CONFIG
 
 
 class SSHTunnel:
-    def __init__(self):
+    def __init__(self, keepalive=None, ready_timeout=None):
         self.tunnel = None
+        self.ssh = None
+        self.keepalive = (
+            TUNNEL_CONFIG["keepalive"] if keepalive is None else keepalive
+        )
+        self.ready_timeout = (
+            TUNNEL_CONFIG["ready_timeout"] if ready_timeout is None else ready_timeout
+        )
 
     def __enter__(self):
         print(f"[SSH] Connecting to {SSH_CONFIG['hostname']}:{SSH_CONFIG['port']}")
@@ -20,45 +34,43 @@ class SSHTunnel:
             allow_agent=False,
             host_pkey_directories=[],
             remote_bind_address=("127.0.0.1", 3306),
+            set_keepalive=self.keepalive,
         )
 
         self.tunnel.start()
-        time.sleep(2)
 
-        if self.tunnel.is_active:
+        if self.wait_ready(self.ready_timeout):
             print(f"[SSH] Tunnel active! Local port: {self.tunnel.local_bind_port}")
         else:
             print("[SSH] ERROR: Tunnel is not active!")
+            self.tunnel.stop()
             raise Exception("SSH Tunnel is not active!")
 
         return self.tunnel
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.tunnel:
-            print("[SSH] Closing tunnel...")
-            self.tunnel.stop()
-
-
-    def get_db_connection():
-        print("[DB] Starting database connection...")
-
-        with SSHTunnel() as tunnel:
-            print(f"[DB] Connecting to localhost:{tunnel.local_bind_port}")
-            print(f"[DB] Database: {DB_CONFIG['database']}")
-            print(f"[DB] User: {DB_CONFIG['username']}")
-
-            connection = pymysql.connect(
-                host=DB_CONFIG["host"],
-                port=tunnel.local_bind_port,
-                user=DB_CONFIG["username"],
-                password=DB_CONFIG["password"],
-                database=DB_CONFIG["database"],
-                charset="utf8mb4",
-                connect_timeout=10,
-            )
+    def is_ready(self):
+        """Check the SSH transport and that the local port accepts connections"""
+        if not self.tunnel or not self.tunnel.is_active:
+            return False
+        try:
+            with socket.create_connection(
+                ("127.0.0.1", self.tunnel.local_bind_port), timeout=1
+            ):
+                return True
+        except OSError:
+            return False
 
-            print("[DB] Connection established successfully!")
-            return connection
+    def wait_ready(self, timeout):
+        """Poll until the tunnel is ready, instead of sleeping a fixed time"""
+        deadline = time.monotonic() + timeout
+        delay = 0.02
+        while True:
+            if self.is_ready():
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
 
     def read_log_file(self, log_path, lines=200, filter_text=None):
         """
@@ -73,12 +85,18 @@ class SSHTunnel:
             List of log lines
         """
         try:
+            if self.ssh is None:
+                self.ssh = open_ssh_client(self.keepalive)
+
+            path = shlex.quote(log_path)
             if filter_text:
                 # Command to filter and get the last N lines.
-                command = f"grep '{filter_text}' {log_path} | tail -n {lines}"
+                command = (
+                    f"grep -- {shlex.quote(filter_text)} {path} | tail -n {int(lines)}"
+                )
             else:
                 # Just the last N lines.
-                command = f"tail -n {lines} {log_path}"
+                command = f"tail -n {int(lines)} {path}"
 
             stdin, stdout, stderr = self.ssh.exec_command(command)
             output = stdout.read().decode('utf-8')
@@ -97,7 +115,239 @@ class SSHTunnel:
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Close connections"""
         if self.tunnel:
+            print("[SSH] Closing tunnel...")
             self.tunnel.stop()
         if self.ssh:
             self.ssh.close()
+            self.ssh = None
         print("[SSH] Connection closed.")
+
+
+def open_ssh_client(keepalive=None):
+    """Open a paramiko SSH session to the server, for SFTP and commands"""
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    client.connect(
+        SSH_CONFIG["hostname"],
+        port=SSH_CONFIG["port"],
+        username=SSH_CONFIG["username"],
+        password=SSH_CONFIG["password"],
+        allow_agent=False,
+        look_for_keys=False,
+        timeout=10,
+    )
+    keepalive = TUNNEL_CONFIG["keepalive"] if keepalive is None else keepalive
+    client.get_transport().set_keepalive(int(keepalive))
+    return client
+
+
+class TunnelManager:
+    """Keeps one SSH tunnel up for the lifetime of the application.
+
+    The tunnel is opened on first use. A background thread checks it every
+    `health_interval` seconds and reopens it as soon as it drops, so the
+    next query does not have to discover the failure. Reconnects retry
+    with exponential backoff and full jitter, up to `max_attempts` times.
+    `on_reconnect` is called once a replacement tunnel is up, e.g. to
+    retire pooled connections that went through the old one.
+    """
+
+    def __init__(self, on_reconnect=None):
+        self.on_reconnect = on_reconnect
+        self.ready_timeout = TUNNEL_CONFIG["ready_timeout"]
+        self.keepalive = TUNNEL_CONFIG["keepalive"]
+        self.health_interval = TUNNEL_CONFIG["health_interval"]
+        self.backoff_base = TUNNEL_CONFIG["backoff_base"]
+        self.backoff_max = TUNNEL_CONFIG["backoff_max"]
+        self.max_attempts = TUNNEL_CONFIG["max_attempts"]
+
+        self.ssh_tunnel = None
+        self.state = "down"
+        self.reconnects = 0
+        self.failures = 0
+        self.last_error = None
+        self.connected_at = None
+        self.connect_seconds = None
+        self._connected_monotonic = None
+        self._had_tunnel = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread = None
+
+    def is_active(self):
+        ssh_tunnel = self.ssh_tunnel
+        return bool(ssh_tunnel and ssh_tunnel.tunnel and ssh_tunnel.tunnel.is_active)
+
+    def local_port(self):
+        """Return the local port of a live tunnel, opening one if needed"""
+        ssh_tunnel = self.ssh_tunnel
+        if ssh_tunnel and ssh_tunnel.tunnel and ssh_tunnel.tunnel.is_active:
+            return ssh_tunnel.tunnel.local_bind_port
+        return self._reconnect(ssh_tunnel).tunnel.local_bind_port
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff, in seconds"""
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        )
+
+    def _close_tunnel(self):
+        if self.ssh_tunnel:
+            try:
+                self.ssh_tunnel.__exit__(None, None, None)
+            except Exception as e:
+                print(f"[SSH] Error closing tunnel: {e}")
+            self.ssh_tunnel = None
+
+    def _reconnect(self, stale):
+        """Replace the `stale` tunnel (or open the first one) and return it.
+
+        Each attempt holds the lock; the backoff between attempts does not,
+        so stop() and metrics readers are never held up by a retry. A caller
+        that finds the tunnel already replaced by someone else reuses it.
+        """
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            with self._lock:
+                current = self.ssh_tunnel
+                if current is not None and current is not stale and self.is_active():
+                    return current
+                if error is not None and self._stop.is_set():
+                    self.state = "down"
+                    raise error
+                try:
+                    return self._open()
+                except Exception as e:
+                    error = e
+                    if attempt == self.max_attempts:
+                        self.state = "down"
+                        raise
+
+            delay = self._backoff(attempt)
+            print(
+                f"[SSH] Attempt {attempt}/{self.max_attempts} failed ({error}), "
+                f"retrying in {delay:.1f}s"
+            )
+            self._stop.wait(delay)
+
+    def _open(self):
+        """Make one connection attempt; the caller holds the lock.
+
+        Every tunnel that comes up after an earlier one counts as a
+        reconnect, also when failed attempts left no tunnel in between.
+        """
+        self._close_tunnel()
+        self.state = "reconnecting" if self._had_tunnel else "connecting"
+        started = time.monotonic()
+        ssh_tunnel = SSHTunnel(self.keepalive, self.ready_timeout)
+        try:
+            ssh_tunnel.__enter__()
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            raise
+
+        self.ssh_tunnel = ssh_tunnel
+        self.state = "up"
+        self.connected_at = datetime.now()
+        self.connect_seconds = round(time.monotonic() - started, 3)
+        self._connected_monotonic = time.monotonic()
+        if self._had_tunnel:
+            self.reconnects += 1
+            if self.on_reconnect:
+                self.on_reconnect()
+        self._had_tunnel = True
+        self._start_health_thread()
+        return ssh_tunnel
+
+    def _start_health_thread(self):
+        if self._health_thread and self._health_thread.is_alive():
+            return
+        self._health_thread = threading.Thread(
+            target=self._health_loop, name="tunnel-health", daemon=True
+        )
+        self._health_thread.start()
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            ssh_tunnel = self.ssh_tunnel
+            if ssh_tunnel is not None and ssh_tunnel.is_ready():
+                continue
+
+            if self._stop.is_set():
+                return
+            print("[SSH] Tunnel health check failed, reconnecting...")
+            try:
+                self._reconnect(ssh_tunnel)
+            except Exception as e:
+                print(f"[SSH] Reconnect failed: {e}")
+
+    def stop(self):
+        """Stop the health thread and close the tunnel"""
+        self._stop.set()
+        with self._lock:
+            self._close_tunnel()
+            self.state = "down"
+            self._connected_monotonic = None
+
+    def metrics(self):
+        """Tunnel state, reconnect count and uptime of the current tunnel"""
+        connected = self._connected_monotonic
+        active = self.is_active()
+        state = self.state
+        if state == "up" and not active:
+            # Dropped, and the health check has not noticed yet.
+            state = "down"
+        return {
+            "state": state,
+            "active": active,
+            "reconnects": self.reconnects,
+            "failures": self.failures,
+            "uptime_seconds": (
+                round(time.monotonic() - connected, 1)
+                if active and connected is not None
+                else 0
+            ),
+            "connected_at": self.connected_at,
+            "connect_seconds": self.connect_seconds,
+            "last_error": self.last_error,
+        }
+
+
+_shared_tunnel = None
+_shared_tunnel_lock = threading.Lock()
+
+
+def get_db_connection():
+    """Open a database connection through a shared, managed tunnel.
+
+    With DB_DIRECT the server is reached at DB_HOST:DB_PORT instead.
+    """
+    global _shared_tunnel
+    print("[DB] Starting database connection...")
+
+    if DB_CONFIG["direct"]:
+        host, port = DB_CONFIG["host"], DB_CONFIG["port"]
+    else:
+        with _shared_tunnel_lock:
+            if _shared_tunnel is None:
+                _shared_tunnel = TunnelManager()
+        # The tunnel forwards a local port, whatever DB_HOST says.
+        host, port = "127.0.0.1", _shared_tunnel.local_port()
+
+    print(f"[DB] Connecting to {host}:{port}")
+    print(f"[DB] Database: {DB_CONFIG['database']}")
+    print(f"[DB] User: {DB_CONFIG['username']}")
+
+    connection = pymysql.connect(
+        host=host,
+        port=port,
+        user=DB_CONFIG["username"],
+        password=DB_CONFIG["password"],
+        database=DB_CONFIG["database"],
+        charset="utf8mb4",
+        connect_timeout=10,
+    )
+
+    print("[DB] Connection established successfully!")
+    return connection
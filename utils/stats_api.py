@@ -0,0 +1,190 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import timezone
+from email.utils import format_datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Sections left out unless requested by name (or with sections=all).
+HEAVY_SECTIONS = {"certificates"}
+
+# Fields never served by the stats API; failure details and the failures
+# page have them.
+DROPPED_FIELDS = {"failed_tasks": {"payload"}, "failure_clusters": {"task_ids"}}
+
+# Bodies smaller than this are not worth compressing.
+MIN_COMPRESS_SIZE = 1024
+
+# ETag suffix of each content coding, so every representation has its own.
+ENCODING_SUFFIXES = {"gzip": "-gz", "zstd": "-zst"}
+
+
+def _plain(value):
+    """Turn snapshot views (e.g. CertificateView) into plain lists"""
+    to_list = getattr(value, "to_list", None)
+    return to_list() if to_list is not None else value
+
+
+def _slim(name, value):
+    dropped = DROPPED_FIELDS.get(name)
+    if dropped and isinstance(value, list):
+        return [
+            {k: v for k, v in item.items() if k not in dropped}
+            if isinstance(item, dict)
+            else item
+            for item in value
+        ]
+    return value
+
+
+def _select_fields(value, fields):
+    """Keep only the given keys of a dict or of each dict in a list"""
+    if isinstance(value, dict):
+        return {k: v for k, v in value.items() if k in fields}
+    if isinstance(value, list):
+        return [
+            {k: v for k, v in item.items() if k in fields}
+            if isinstance(item, dict)
+            else item
+            for item in value
+        ]
+    return value
+
+
+class StatsSnapshot:
+    """Serialized form of one refresh's monitoring data.
+
+    Each section is serialized to JSON once: light sections when the
+    snapshot is built, heavy ones the first time they are requested, so
+    the large certificates list stays columnar until someone asks for it.
+    Responses for a set of sections are assembled from those fragments,
+    and compressed bodies are memoized per (sections, fields, encoding)
+    until the next refresh replaces the snapshot.
+
+    ETags are a digest of the uncompressed body plus the content coding,
+    so they follow the content even across restarts (where generations
+    start over) and differ between the gzip, zstd and identity bodies.
+    """
+
+    def __init__(self, data, generation, updated_at, dumps, cache_size=32):
+        self.generation = generation
+        self.updated_at = updated_at.astimezone(timezone.utc).replace(microsecond=0)
+        self.last_modified = format_datetime(self.updated_at, usegmt=True)
+        self.dumps = dumps
+        self.sections = dict(data)
+        self.fragments = {
+            name: self._serialize(name)
+            for name in self.sections
+            if name not in HEAVY_SECTIONS
+        }
+        self.default_sections = tuple(
+            name for name in self.sections if name not in HEAVY_SECTIONS
+        )
+        self._bodies = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def _section(self, name):
+        return _slim(name, _plain(self.sections[name]))
+
+    def _serialize(self, name):
+        return self.dumps(self._section(name)).encode("utf-8")
+
+    def _fragment(self, name):
+        fragment = self.fragments.get(name)
+        if fragment is None:
+            fragment = self._serialize(name)
+            with self._lock:
+                self.fragments[name] = fragment
+        return fragment
+
+    def resolve_sections(self, requested):
+        """Turn a ?sections= value into known section names"""
+        if not requested:
+            return self.default_sections
+        if requested == "all":
+            return tuple(self.sections)
+        names = [name.strip() for name in requested.split(",") if name.strip()]
+        return tuple(name for name in names if name in self.sections)
+
+    def body(self, sections, fields=None, encoding=None):
+        """Return the (possibly compressed) JSON body, its encoding and ETag"""
+        key = (sections, fields, encoding)
+        with self._lock:
+            if key in self._bodies:
+                self._bodies.move_to_end(key)
+                return self._bodies[key]
+
+        raw = self._render(sections, fields)
+        compressed, used = compress(raw, encoding)
+        digest = hashlib.sha1(raw).hexdigest()[:16]
+        body = (compressed, used, f'"{digest}{ENCODING_SUFFIXES.get(used, "")}"')
+
+        with self._lock:
+            self._bodies[key] = body
+            if len(self._bodies) > self._cache_size:
+                self._bodies.popitem(last=False)
+        return body
+
+    def _render(self, sections, fields):
+        selected = parse_fields(fields)
+        parts = []
+        for name in sections:
+            section_fields = selected.get(name) or selected.get("*")
+            if section_fields:
+                fragment = self.dumps(
+                    _select_fields(self._section(name), section_fields)
+                ).encode("utf-8")
+            else:
+                fragment = self._fragment(name)
+            parts.append(self.dumps(name).encode("utf-8") + b":" + fragment)
+        return b"{" + b",".join(parts) + b"}"
+
+
+def parse_fields(fields):
+    """Group ?fields= entries by section.
+
+    "failed_tasks.id" applies to one section; a bare "id" applies to every
+    section without its own list.
+    """
+    selected = {}
+    for field in fields or ():
+        section, _, name = field.rpartition(".")
+        selected.setdefault(section or "*", set()).add(name)
+    return selected
+
+
+def choose_encoding(accept_encoding):
+    """Pick zstd (when available) or gzip from an Accept-Encoding header"""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0
+        if quality > 0:
+            accepted.add(name.strip().lower())
+
+    if zstandard is not None and "zstd" in accepted:
+        return "zstd"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(raw, encoding):
+    """Compress a body, returning (bytes, encoding actually used)"""
+    if encoding is None or len(raw) < MIN_COMPRESS_SIZE:
+        return raw, None
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(raw), "zstd"
+    return gzip.compress(raw, compresslevel=6), "gzip"
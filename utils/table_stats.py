@@ -0,0 +1,151 @@
+import threading
+import time
+
+from config.config import TABLE_STATS_CONFIG
+
+MODES = ("exact", "estimate", "hybrid")
+
+# Labels shown in the dashboard's "Origem" column.
+SOURCE_EXACT = "Exato"
+SOURCE_CACHED = "Exato (cache)"
+SOURCE_INNODB = "Estimado (InnoDB)"
+SOURCE_INFORMATION_SCHEMA = "Estimado (information_schema)"
+
+
+class TableStatsEngine:
+    """Collects row counts for the prefixed tables.
+
+    Modes:
+        exact: SELECT COUNT(*) on every table, every time.
+        estimate: row estimates from mysql.innodb_table_stats, falling back
+            to information_schema.tables.
+        hybrid: exact counts cached for `ttl` seconds. Tables without a fresh
+            count show the estimate while a background thread recounts
+            stale tables one at a time.
+    """
+
+    def __init__(self, monitor, mode=None, ttl=None, refresh_delay=None):
+        self.monitor = monitor
+        self.mode = mode or TABLE_STATS_CONFIG["mode"]
+        if self.mode not in MODES:
+            print(f"[TableStats] Unknown mode '{self.mode}', using hybrid.")
+            self.mode = "hybrid"
+        self.ttl = ttl if ttl is not None else TABLE_STATS_CONFIG["ttl"]
+        self.refresh_delay = (
+            refresh_delay
+            if refresh_delay is not None
+            else TABLE_STATS_CONFIG["refresh_delay"]
+        )
+
+        self._exact_cache = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker = None
+
+    def collect(self):
+        """Return one row per table with its count, size and source"""
+        tables = self.monitor.get_table_sizes()
+
+        if self.mode == "exact":
+            return [
+                self._row(table, self._count_now(table["Tabela"]), SOURCE_EXACT)
+                for table in tables
+            ]
+
+        estimates = self._estimates(tables)
+
+        if self.mode == "estimate":
+            return [
+                self._row(table, *estimates[table["Tabela"]]) for table in tables
+            ]
+
+        results = []
+        stale = []
+        now = time.monotonic()
+        with self._lock:
+            for table in tables:
+                name = table["Tabela"]
+                cached = self._exact_cache.get(name)
+                if cached and now - cached[1] < self.ttl:
+                    results.append(self._row(table, cached[0], SOURCE_CACHED))
+                else:
+                    results.append(self._row(table, *estimates[name]))
+                    stale.append(name)
+
+        if stale:
+            self._schedule(stale)
+        return results
+
+    def _row(self, table, count, source):
+        return {
+            "Tabela": table["Tabela"],
+            "Registros": count if count is not None else 0,
+            "Tamanho (MB)": table["Tamanho (MB)"],
+            "Origem": source,
+        }
+
+    def _count_now(self, table_name):
+        count = self.monitor.get_exact_count(table_name)
+        with self._lock:
+            self._exact_cache[table_name] = (count, time.monotonic())
+        return count
+
+    def _estimates(self, tables):
+        """Map each table to (estimate, source).
+
+        Persistent InnoDB statistics are preferred; tables missing from them
+        (or servers where they are not readable) use information_schema.
+        """
+        try:
+            innodb = self.monitor.get_innodb_row_estimates()
+        except Exception as e:
+            print(f"[TableStats] innodb_table_stats unavailable: {e}")
+            innodb = {}
+
+        estimates = {}
+        for table in tables:
+            name = table["Tabela"]
+            if innodb.get(name) is not None:
+                estimates[name] = (innodb[name], SOURCE_INNODB)
+            else:
+                estimates[name] = (table.get("Estimativa"), SOURCE_INFORMATION_SCHEMA)
+        return estimates
+
+    def _schedule(self, table_names):
+        """Queue stale tables for a background recount"""
+        with self._lock:
+            for name in table_names:
+                if name not in self._pending:
+                    self._pending.append(name)
+
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._refresh_loop, name="table-stats", daemon=True
+                )
+                self._worker.start()
+        self._wakeup.set()
+
+    def _refresh_loop(self):
+        """Recount queued tables one at a time, pausing between them"""
+        while True:
+            self._wakeup.clear()
+            with self._lock:
+                name = self._pending.pop(0) if self._pending else None
+
+            if name is None:
+                if self._wakeup.wait(timeout=60):
+                    continue
+                with self._lock:
+                    if self._pending:
+                        continue
+                    self._worker = None
+                    return
+
+            try:
+                count = self._count_now(name)
+                print(f"[TableStats] Recounted {name}: {count} rows.")
+            except Exception as e:
+                print(f"[TableStats] Error counting {name}: {e}")
+
+            time.sleep(self.refresh_delay)
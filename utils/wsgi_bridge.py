@@ -0,0 +1,99 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from asgiref.sync import AsyncToSync, sync_to_async
+from asgiref.wsgi import WsgiToAsgiInstance
+
+
+class ClientDisconnected(OSError):
+    """Raised in the WSGI thread when the client went away mid-response"""
+
+
+class ThreadedWsgiToAsgi:
+    """Serves a WSGI app over ASGI, one pool thread per request.
+
+    asgiref's WsgiToAsgi runs every request on one shared thread
+    (thread_sensitive=True), so a single long response such as an open
+    /api/stream holds up every other route. Here requests run on a pool
+    of `max_threads` threads; a streaming response keeps its thread until
+    the client disconnects, at which point the response iterable is
+    closed so Flask's call_on_close callbacks run.
+    """
+
+    def __init__(self, wsgi_application, max_threads):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(max_threads, thread_name_prefix="wsgi")
+
+    async def __call__(self, scope, receive, send):
+        await _ThreadedWsgiInstance(self.wsgi_application, self.executor)(
+            scope, receive, send
+        )
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _ThreadedWsgiInstance(WsgiToAsgiInstance):
+    """One request; reuses asgiref's environ and start_response handling"""
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+        self.disconnected = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            raise ValueError("WSGI wrapper received a non-HTTP scope")
+        self.scope = scope
+        with SpooledTemporaryFile(max_size=65536) as body:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body.write(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+            body.seek(0)
+
+            self.sync_send = AsyncToSync(send)
+            watcher = asyncio.ensure_future(self._watch_disconnect(receive))
+            try:
+                await sync_to_async(
+                    self._run, thread_sensitive=False, executor=self.executor
+                )(body)
+            finally:
+                watcher.cancel()
+
+    async def _watch_disconnect(self, receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        self.disconnected = True
+
+    def _send(self, message):
+        if self.disconnected:
+            raise ClientDisconnected("Client disconnected")
+        self.sync_send(message)
+
+    def _run(self, body):
+        response = self.wsgi_application(
+            self.build_environ(self.scope, body), self.start_response
+        )
+        try:
+            for output in response:
+                if not self.response_started:
+                    self.response_started = True
+                    self._send(self.response_start)
+                self._send(
+                    {"type": "http.response.body", "body": output, "more_body": True}
+                )
+            if not self.response_started:
+                self.response_started = True
+                self._send(self.response_start)
+            self._send({"type": "http.response.body"})
+        except ClientDisconnected:
+            pass
+        finally:
+            close = getattr(response, "close", None)
+            if close is not None:
+                close()
@@ -0,0 +1,14 @@
+"""WSGI entry point for web workers, e.g.:
+
+    gunicorn -w 4 -k gthread --threads 8 -b 0.0.0.0:5001 wsgi:app
+
+Workers serve the snapshot published by the refresher, started separately
+with `APP_ROLE=refresher python app.py`, and do not query the database
+on a schedule nor open SSH tunnels of their own.
+"""
+
+import os
+
+os.environ.setdefault("APP_ROLE", "web")
+
+from app import app  # noqa: E402